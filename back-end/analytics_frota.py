@@ -0,0 +1,250 @@
+# back-end/analytics_frota.py
+"""
+Previsão de manutenção por quilometragem para frotas (NumPy).
+
+Um único SELECT traz o histórico em colunas: para cada OS não cancelada com
+km_entrada, uma linha por serviço e por peça lançados (veículo, item, km, data).
+A partir daí tudo é feito com operações vetorizadas sobre os arrays, sem laço
+por veículo:
+
+- grupo = (veículo, item); ocorrências na mesma quilometragem contam uma vez;
+- intervalos em km e em dias entre ocorrências consecutivas do grupo;
+- intervalo típico = mediana do grupo; sem intervalos próprios (item feito uma
+  vez só), usa a mediana da frota para o mesmo item;
+- próxima manutenção = último km + intervalo típico, comparada ao km_atual;
+- outliers: intervalos com z-score robusto (mediana/MAD) acima de Z_OUTLIER.
+"""
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import literal, select, union_all
+
+from models import OS, ItemServico, ItemPeca, Veiculo, Servico, Peca, StatusOS
+
+TIPO_SERVICO, TIPO_PECA = 1, 2
+NOMES_TIPO = {TIPO_SERVICO: "servico", TIPO_PECA: "peca"}
+KM_ALERTA = 1000            # "proximo" quando faltar até isso (ou 10% do intervalo)
+Z_OUTLIER = 3.5
+MIN_INTERVALOS_OUTLIER = 3  # com menos que isso não dá para chamar nada de fora do padrão
+SITUACOES = ("vencido", "proximo", "ok", "sem_historico")
+_UM_DIA = np.timedelta64(1, "D")
+
+
+def _historico(db, cliente_id=None):
+    def parte(tipo, modelo, coluna_ref):
+        q = (
+            select(
+                OS.id_veiculo,
+                literal(tipo).label("tipo"),
+                coluna_ref.label("ref"),
+                OS.km_entrada,
+                OS.data_abertura,
+                Veiculo.km_atual,
+            )
+            .join(modelo, modelo.id_os == OS.id_os)
+            .join(Veiculo, Veiculo.id_veiculo == OS.id_veiculo)
+            .where(OS.status != StatusOS.cancelado, OS.km_entrada.is_not(None))
+        )
+        if cliente_id:
+            q = q.where(Veiculo.id_cliente == cliente_id)
+        return q
+
+    todas = union_all(
+        parte(TIPO_SERVICO, ItemServico, ItemServico.id_servico),
+        parte(TIPO_PECA, ItemPeca, ItemPeca.id_peca),
+    ).subquery()
+    linhas = db.execute(
+        select(todas).order_by(todas.c.id_veiculo, todas.c.tipo, todas.c.ref,
+                               todas.c.km_entrada, todas.c.data_abertura)
+    ).all()
+    if not linhas:
+        return None
+    v, t, r, km, data, km_atual = zip(*linhas)
+    return (
+        np.array(v, dtype=np.int64),
+        np.array(t, dtype=np.int64),
+        np.array(r, dtype=np.int64),
+        np.array(km, dtype=np.float64),
+        np.array(data, dtype="datetime64[s]"),
+        np.array([np.nan if k is None else k for k in km_atual], dtype=np.float64),
+    )
+
+
+def _mediana_por_grupo(grupos, valores, n_grupos):
+    """Mediana de `valores` por grupo (0..n_grupos-1); NaN para grupos vazios."""
+    ordem = np.lexsort((valores, grupos))
+    v = valores[ordem]
+    contagem = np.bincount(grupos, minlength=n_grupos)
+    inicio = np.concatenate(([0], np.cumsum(contagem)[:-1]))
+    mediana = np.full(n_grupos, np.nan)
+    tem = contagem > 0
+    baixo = inicio[tem] + (contagem[tem] - 1) // 2
+    alto = inicio[tem] + contagem[tem] // 2
+    mediana[tem] = (v[baixo] + v[alto]) / 2
+    return mediana, contagem
+
+
+def _nulo(x):
+    return None if x is None or (isinstance(x, float) and np.isnan(x)) else x
+
+
+def calcular_previsoes(db, cliente_id=None):
+    """Arrays por grupo (veículo, item) + intervalos marcados como outlier."""
+    hist = _historico(db, cliente_id)
+    if hist is None:
+        return None
+    v, t, r, km, data, km_atual = hist
+
+    # mesma quilometragem no mesmo grupo (ex.: duas linhas na mesma OS) conta uma vez
+    mesma_chave = (v[1:] == v[:-1]) & (t[1:] == t[:-1]) & (r[1:] == r[:-1])
+    manter = np.concatenate(([True], ~(mesma_chave & (km[1:] == km[:-1]))))
+    v, t, r, km, data, km_atual = (a[manter] for a in (v, t, r, km, data, km_atual))
+
+    nova = np.concatenate(([True], (v[1:] != v[:-1]) | (t[1:] != t[:-1]) | (r[1:] != r[:-1])))
+    gid = np.cumsum(nova) - 1
+    n_grupos = int(gid[-1]) + 1
+    fim = np.concatenate((np.flatnonzero(nova)[1:] - 1, [len(v) - 1]))  # última ocorrência do grupo
+
+    # intervalos entre ocorrências consecutivas do mesmo grupo
+    par = ~nova[1:]
+    ig = gid[1:][par]
+    int_km = (km[1:] - km[:-1])[par]
+    int_dias = ((data[1:] - data[:-1]) / _UM_DIA)[par]
+    km_ini = km[:-1][par]
+
+    med_km, n_int = _mediana_por_grupo(ig, int_km, n_grupos)
+    med_dias, _ = _mediana_por_grupo(ig, int_dias, n_grupos)
+
+    # mediana da frota por item, para grupos com uma ocorrência só
+    item_int = t[1:][par] * 10**9 + r[1:][par]
+    itens, inv = np.unique(item_int, return_inverse=True)
+    frota_km, _ = _mediana_por_grupo(inv, int_km, len(itens))
+    frota_dias, _ = _mediana_por_grupo(inv, int_dias, len(itens))
+    item_g = t[fim] * 10**9 + r[fim]
+    if len(itens):
+        pos = np.clip(np.searchsorted(itens, item_g), 0, len(itens) - 1)
+        tem_frota = itens[pos] == item_g
+        frota_km, frota_dias = frota_km[pos], frota_dias[pos]
+    else:
+        tem_frota = np.zeros(n_grupos, dtype=bool)
+        frota_km = frota_dias = np.full(n_grupos, np.nan)
+    proprio = n_int > 0
+    intervalo_km = np.where(proprio, med_km, np.where(tem_frota, frota_km, np.nan))
+    intervalo_dias = np.where(proprio, med_dias, np.where(tem_frota, frota_dias, np.nan))
+
+    ultimo_km = km[fim]
+    ultima_data = data[fim]
+    km_hoje = np.fmax(km_atual[fim], ultimo_km)
+    proximo_km = ultimo_km + intervalo_km
+    restante = proximo_km - km_hoje
+    situacao = np.select(
+        [np.isnan(intervalo_km), restante <= 0, restante <= np.fmax(KM_ALERTA, 0.1 * intervalo_km)],
+        ["sem_historico", "vencido", "proximo"],
+        "ok",
+    )
+    dias_ok = np.isfinite(intervalo_dias) & (intervalo_dias > 0)
+    proxima_data = np.where(
+        dias_ok,
+        ultima_data + np.round(np.where(dias_ok, intervalo_dias, 0)).astype("timedelta64[D]"),
+        np.datetime64("NaT"),
+    )
+
+    # outliers: z robusto = 0.6745 * |x - mediana| / MAD, por grupo
+    desvio = np.abs(int_km - med_km[ig])
+    mad, _ = _mediana_por_grupo(ig, desvio, n_grupos)
+    mad_i = mad[ig]
+    fora = np.where(mad_i > 0, 0.6745 * desvio / np.where(mad_i > 0, mad_i, 1) > Z_OUTLIER,
+                    desvio > 0.5 * med_km[ig])
+    fora &= n_int[ig] >= MIN_INTERVALOS_OUTLIER
+
+    grupos = {
+        "id_veiculo": v[fim], "tipo": t[fim], "ref": r[fim],
+        "ocorrencias": np.bincount(gid, minlength=n_grupos),
+        "intervalos": n_int, "base": np.where(proprio, "veiculo", np.where(tem_frota, "frota", "")),
+        "ultimo_km": ultimo_km, "ultima_data": ultima_data, "km_atual": km_hoje,
+        "intervalo_km": intervalo_km, "intervalo_dias": intervalo_dias,
+        "proximo_km": proximo_km, "km_restante": restante, "proxima_data": proxima_data,
+        "situacao": situacao,
+    }
+    outliers = {
+        "grupo": ig[fora], "km_inicio": km_ini[fora], "km_fim": km_ini[fora] + int_km[fora],
+        "intervalo_km": int_km[fora], "mediana_km": med_km[ig][fora],
+    }
+    return grupos, outliers
+
+
+def dados_previsao_manutencao(db, cliente_id=None, situacao=None, limite=500):
+    calculo = calcular_previsoes(db, cliente_id)
+    resposta = {
+        "gerado_em": datetime.now().isoformat(),
+        "id_cliente": cliente_id,
+        "veiculos": 0,
+        "resumo": {s: 0 for s in SITUACOES},
+        "previsoes": [],
+        "outliers": [],
+    }
+    if calculo is None:
+        return resposta
+    g, o = calculo
+
+    resposta["veiculos"] = int(len(np.unique(g["id_veiculo"])))
+    nomes, contagem = np.unique(g["situacao"], return_counts=True)
+    resposta["resumo"].update(dict(zip(nomes.tolist(), contagem.tolist())))
+
+    # mais urgentes primeiro; sem histórico por último
+    ordem = np.argsort(np.where(np.isnan(g["km_restante"]), np.inf, g["km_restante"]), kind="stable")
+    if situacao:
+        ordem = ordem[g["situacao"][ordem] == situacao]
+    ordem = ordem[:limite]
+
+    # descrições e placas só dos registros que vão na resposta
+    ids_veic = set(g["id_veiculo"][ordem].tolist()) | set(g["id_veiculo"][o["grupo"]].tolist())
+    placas = dict(db.execute(select(Veiculo.id_veiculo, Veiculo.placa).where(Veiculo.id_veiculo.in_(ids_veic))).all())
+    refs = np.concatenate((ordem, o["grupo"]))
+    tipos, ids = g["tipo"][refs], g["ref"][refs]
+    desc = {
+        TIPO_SERVICO: dict(db.execute(select(Servico.id_servico, Servico.descricao)
+                                      .where(Servico.id_servico.in_(set(ids[tipos == TIPO_SERVICO].tolist())))).all()),
+        TIPO_PECA: dict(db.execute(select(Peca.id_peca, Peca.descricao)
+                                   .where(Peca.id_peca.in_(set(ids[tipos == TIPO_PECA].tolist())))).all()),
+    }
+
+    def item(i):
+        tipo, ref, veic = int(g["tipo"][i]), int(g["ref"][i]), int(g["id_veiculo"][i])
+        return {
+            "id_veiculo": veic,
+            "placa": placas.get(veic),
+            "tipo": NOMES_TIPO[tipo],
+            "id_item": ref,
+            "descricao": desc[tipo].get(ref),
+        }
+
+    colunas = {c: g[c][ordem].tolist() for c in (
+        "ocorrencias", "intervalos", "base", "ultimo_km", "km_atual", "intervalo_km",
+        "intervalo_dias", "proximo_km", "km_restante", "situacao",
+    )}
+    ultima = np.datetime_as_string(g["ultima_data"][ordem], unit="s").tolist()
+    proxima = np.datetime_as_string(g["proxima_data"][ordem], unit="D").tolist()
+    for n, i in enumerate(ordem.tolist()):
+        linha = item(i)
+        linha.update({c: _nulo(colunas[c][n]) for c in colunas})
+        linha["base"] = linha["base"] or None
+        for c in ("ultimo_km", "km_atual", "intervalo_km", "proximo_km", "km_restante"):
+            if linha[c] is not None:
+                linha[c] = round(linha[c])
+        if linha["intervalo_dias"] is not None:
+            linha["intervalo_dias"] = round(linha["intervalo_dias"], 1)
+        linha["ultima_data"] = ultima[n]
+        linha["proxima_data"] = None if proxima[n] == "NaT" else proxima[n]
+        resposta["previsoes"].append(linha)
+
+    for n, i in enumerate(o["grupo"].tolist()):
+        linha = item(i)
+        linha.update({
+            "km_inicio": round(float(o["km_inicio"][n])),
+            "km_fim": round(float(o["km_fim"][n])),
+            "intervalo_km": round(float(o["intervalo_km"][n])),
+            "mediana_km": round(float(o["mediana_km"][n])),
+        })
+        resposta["outliers"].append(linha)
+    return resposta
@@ -1,622 +1,143 @@
-# --- IMPORTS ESSENCIAIS (adicione no topo do app.py) ---
-import os, sys
-from datetime import datetime
-
-# garante que dá pra importar database.py / models.py quando rodar fora do Docker
-sys.path.append(os.path.dirname(__file__))
-
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from sqlalchemy import func, and_
-
-from database import Base, engine, SessionLocal
-from sqlalchemy.exc import OperationalError
-from models import (
-    Cliente, Veiculo, Funcionario, Servico, Peca,
-    OS, ItemPeca, ItemServico, Pagamento,
-    Agendamento, StatusAgendamento, StatusOS, OrigemPeca,
-    Fornecedor, MovimentoEstoque  # <<< ADICIONADOS
-)
-
-app = Flask(__name__)
-CORS(app)
-
-def db_sess():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-# -------- Listagens simples --------
-@app.get("/api/pecas")
-def listar_pecas():
-    db = next(db_sess())
-    rows = db.query(Peca).order_by(Peca.descricao).all()
-    return jsonify([{
-        "id_peca": p.id_peca, "sku": p.sku, "descricao": p.descricao,
-        "origem": p.origem.value, "estoque_atual": p.estoque_atual
-    } for p in rows])
-
-@app.get("/api/funcionarios")
-def listar_funcionarios():
-    db = next(db_sess())
-    rows = db.query(Funcionario).order_by(Funcionario.nome).all()
-    return jsonify([{"id_funcionario": f.id_funcionario, "nome": f.nome, "funcao": f.funcao} for f in rows])
-
-@app.get("/api/clientes")
-def listar_clientes():
-    db = next(db_sess())
-    rows = db.query(Cliente).order_by(Cliente.nome_razao).all()
-    return jsonify([{
-        "id_cliente": c.id_cliente,
-        "nome_razao": c.nome_razao,
-        "cpf_cnpj": c.cpf_cnpj,
-        "telefone": c.telefone,
-        "email": c.email
-    } for c in rows])
-
-@app.get("/api/veiculos")
-def listar_veiculos():
-    db = next(db_sess())
-    rows = db.query(Veiculo).order_by(Veiculo.placa).all()
-    return jsonify([{
-        "id_veiculo": v.id_veiculo, "placa": v.placa, "marca": v.marca, "modelo": v.modelo,
-        "cliente": {"id": v.cliente.id_cliente, "nome": v.cliente.nome_razao}
-    } for v in rows])
-
-@app.post("/api/veiculos")
-def criar_veiculo():
-    db = next(db_sess())
-    data = request.get_json(force=True)
-
-    placa = (data.get("placa") or "").strip().upper()
-    id_cliente = data.get("id_cliente")
-
-    if not placa or not id_cliente:
-        return jsonify({"erro": "placa e id_cliente são obrigatórios"}), 400
-
-    # Verifica se cliente existe
-    cliente = db.query(Cliente).get(id_cliente)
-    if not cliente:
-        return jsonify({"erro": "cliente não encontrado"}), 404
-
-    # Garante placa única
-    ja_existe = db.query(Veiculo).filter_by(placa=placa).first()
-    if ja_existe:
-        return jsonify({"erro": "já existe veículo com essa placa"}), 409
-
-    v = Veiculo(
-        placa=placa,
-        chassi=(data.get("chassi") or "").strip(),
-        km_atual=data.get("km_atual") or 0,
-        marca=(data.get("marca") or "").strip(),
-        modelo=(data.get("modelo") or "").strip(),
-        id_cliente=id_cliente,
-    )
-    db.add(v)
-    db.commit()
-    db.refresh(v)
-
-    return jsonify({
-        "id_veiculo": v.id_veiculo,
-        "placa": v.placa,
-        "marca": v.marca,
-        "modelo": v.modelo,
-        "km_atual": v.km_atual,
-        "cliente": {
-            "id": v.cliente.id_cliente,
-            "nome": v.cliente.nome_razao
-        }
-    }), 201
-
-
-@app.get("/api/servicos")
-def listar_servicos():
-    db = next(db_sess())
-    rows = db.query(Servico).order_by(Servico.descricao).all()
-    return jsonify([{"id_servico": s.id_servico, "descricao": s.descricao, "preco_padrao": str(s.preco_padrao or 0)} for s in rows])
-
-# -------- (3.1) Peças danificadas por veículo + origem --------
-# GET /api/relatorios/pecas-danificadas?veiculo_id=123
-@app.get("/api/relatorios/pecas-danificadas")
-def pecas_danificadas_por_veiculo():
-    veiculo_id = request.args.get("veiculo_id", type=int)
-    if not veiculo_id:
-        return jsonify({"erro": "informe veiculo_id"}), 400
-    db = next(db_sess())
-
-    # Busca dados do veículo e cliente
-    veiculo = db.get(Veiculo, veiculo_id)
-    if not veiculo:
-        return jsonify({"erro": "veículo não encontrado"}), 404
-    
-    cliente = db.get(Cliente, veiculo.id_cliente) if veiculo.id_cliente else None
-
-    # Une OS -> ItemPeca -> Peca; agrupa por peça/origem e soma qtd
-    q = (
-        db.query(
-            Peca.id_peca, Peca.descricao, Peca.origem, func.sum(ItemPeca.qtd).label("qtd_total")
-        )
-        .join(ItemPeca, ItemPeca.id_peca == Peca.id_peca)
-        .join(OS, OS.id_os == ItemPeca.id_os)
-        .filter(OS.id_veiculo == veiculo_id)
-        .group_by(Peca.id_peca, Peca.descricao, Peca.origem)
-        .order_by(Peca.descricao)
-    )
-    data = [{
-        "id_peca": r.id_peca,
-        "descricao": r.descricao,
-        "origem": r.origem.value,
-        "qtd_total": int(r.qtd_total)
-    } for r in q.all()]
-
-    return jsonify({
-        "veiculo_id": veiculo_id,
-        "veiculo": {
-            "placa": veiculo.placa,
-            "marca": veiculo.marca,
-            "modelo": veiculo.modelo
-        },
-        "cliente": {
-            "nome_razao": cliente.nome_razao if cliente else None,
-            "cpf_cnpj": cliente.cpf_cnpj if cliente else None,
-            "telefone": cliente.telefone if cliente else None,
-            "email": cliente.email if cliente else None
-        } if cliente else None,
-        "pecas_para_troca": data
-    })
-
-# -------- (3.2) Agendar serviço (evita conflito de horário) --------
-# GET /api/agendamentos
-@app.get("/api/agendamentos")
-def listar_agendamentos():
-    db = next(db_sess())
-    ags = (
-        db.query(Agendamento)
-        .order_by(Agendamento.data_hora.desc())
-        .all()
-    )
-
-    resp = []
-    for a in ags:
-        resp.append({
-            "id_agendamento": a.id_agendamento,
-            "data_hora": a.data_hora.isoformat() if a.data_hora else None,
-            "status": a.status.value,
-            "cliente": a.cliente.nome_razao if a.cliente else "",
-            "veiculo": f"{a.veiculo.placa} — {a.veiculo.marca} {a.veiculo.modelo}" if a.veiculo else "",
-            "servico": a.servico.descricao if a.servico else "",
-        })
-    return jsonify(resp)
-
-
-# POST /api/agendamentos
-@app.post("/api/agendamentos")
-def criar_agendamento():
-    db = next(db_sess())
-    payload = request.get_json(force=True) or {}
-
-    try:
-        id_cliente = int(payload["id_cliente"])
-        id_veiculo = int(payload["id_veiculo"])
-        id_servico = int(payload["id_servico"])
-        data_str   = payload["data_hora"]
-
-        # Normaliza datetime-local do HTML (YYYY-MM-DDTHH:MM)
-        if isinstance(data_str, str):
-            if len(data_str) == 16:            # 2025-12-22T18:30
-                data_str += ":00"
-            data_hora = datetime.fromisoformat(data_str)
-        else:
-            data_hora = data_str
-
-    except Exception:
-        return jsonify({
-            "erro": "JSON inválido. Campos obrigatórios: id_cliente, id_veiculo, id_servico, data_hora ISO"
-        }), 400
-
-    # Confere se o veículo pertence ao cliente
-    veic = db.query(Veiculo).get(id_veiculo)
-    if not veic or veic.id_cliente != id_cliente:
-        return jsonify({"erro": "veículo não pertence ao cliente informado"}), 400
-
-    # Conflito de horário (mesmo veículo, mesma data/hora, ignorando cancelados)
-    conflito = db.query(Agendamento).filter(
-        Agendamento.id_veiculo == id_veiculo,
-        Agendamento.data_hora == data_hora,
-        Agendamento.status != StatusAgendamento.cancelado
-    ).first()
-
-    if conflito:
-        return jsonify({"erro": "conflito de horário para este veículo"}), 409
-
-    novo = Agendamento(
-        id_cliente=id_cliente,
-        id_veiculo=id_veiculo,
-        id_servico=id_servico,
-        data_hora=data_hora
-    )
-    db.add(novo)
-    db.commit()
-    db.refresh(novo)
-
-    return jsonify({
-        "id_agendamento": novo.id_agendamento,
-        "status": novo.status.value
-    }), 201
-
-@app.get("/api/clientes/<int:id_cliente>/veiculos")
-def listar_veiculos_de_cliente(id_cliente):
-    db = next(db_sess())
-
-    # garante que o cliente existe
-    cliente = db.query(Cliente).get(id_cliente)
-    if not cliente:
-        return jsonify({"erro": "cliente não encontrado"}), 404
-
-    veiculos = (
-        db.query(Veiculo)
-        .filter(Veiculo.id_cliente == id_cliente)
-        .order_by(Veiculo.placa)
-        .all()
-    )
-
-    return jsonify([
-        {
-            "id": v.id_veiculo,
-            "placa": v.placa,
-            "marca": v.marca,
-            "modelo": v.modelo,
-        }
-        for v in veiculos
-    ])
-
-
-
-def criar_agendamento():
-    db = next(db_sess())
-    payload = request.get_json(force=True) or {}
-
-    try:
-        # Campos obrigatórios
-        id_cliente = int(payload["id_cliente"])
-        id_veiculo = int(payload["id_veiculo"])
-        id_servico = int(payload["id_servico"])
-        data_str   = payload["data_hora"]
-
-        # Normaliza datetime-local do HTML (YYYY-MM-DDTHH:MM ou com segundos)
-        if isinstance(data_str, str):
-            if len(data_str) == 16:        # 2025-12-22T18:30
-                data_str = data_str + ":00"
-            data_hora = datetime.fromisoformat(data_str)
-        else:
-            data_hora = data_str
-
-    except Exception:
-        return jsonify({
-            "erro": "JSON inválido. Campos obrigatórios: id_cliente, id_veiculo, id_servico, data_hora ISO"
-        }), 400
-
-    # Confere se veículo realmente pertence a esse cliente (coerência extra)
-    veic = db.query(Veiculo).get(id_veiculo)
-    if not veic or veic.id_cliente != id_cliente:
-        return jsonify({"erro": "veículo não pertence ao cliente informado"}), 400
-
-    # Conflito simples: mesmo veículo no mesmo horário (ignorando cancelados)
-    conflito = db.query(Agendamento).filter(
-        Agendamento.id_veiculo == id_veiculo,
-        Agendamento.data_hora == data_hora,
-        Agendamento.status != StatusAgendamento.cancelado
-    ).first()
-
-    if conflito:
-        return jsonify({"erro": "conflito de horário para este veículo"}), 409
-
-    # Cria de fato o agendamento
-    novo = Agendamento(
-        id_cliente=id_cliente,
-        id_veiculo=id_veiculo,
-        id_servico=id_servico,
-        data_hora=data_hora
-    )
-    db.add(novo)
-    db.commit()
-    db.refresh(novo)
-
-    return jsonify({
-        "id_agendamento": novo.id_agendamento,
-        "status": novo.status.value
-    }), 201
-
-# -------- (3.3) Histórico de manutenção por veículo --------
-
-@app.get("/api/relatorios/historico-veiculo")
-@app.get("/api/relatorios/historico-veiculo-completo")
-def relatorio_veiculo_completo():
-    veiculo_id = request.args.get("veiculo_id", type=int)
-    if not veiculo_id:
-        return jsonify({"erro": "informe veiculo_id"}), 400
-
-    db = next(db_sess())
-
-    veic = db.get(Veiculo, veiculo_id)
-    if not veic:
-        return jsonify({"erro": "veículo não encontrado"}), 404
-
-    cliente = veic.cliente
-
-    ordens = (
-        db.query(OS)
-        .filter(OS.id_veiculo == veiculo_id)
-        .order_by(OS.id_os.desc())
-        .all()
-    )
-
-    lista_os = []
-    for os in ordens:
-        lista_os.append({
-            "id_os": os.id_os,
-            "status": os.status.value,
-            "problema_relatado": os.problema_relatado,
-            "km_entrada": os.km_entrada,
-            "responsavel": os.responsavel.nome,
-            "servicos": [
-                {
-                    "descricao": item.servico.descricao,
-                    "qtd": item.qtd,
-                    "valor_unit": str(item.valor_unit or 0)
-                }
-                for item in os.itens_servico
-            ],
-            "pecas": [
-                {
-                    "descricao": item.peca.descricao,
-                    "origem": item.peca.origem.value,
-                    "qtd": item.qtd,
-                    "valor_unit": str(item.valor_unit or 0)
-                }
-                for item in os.itens_peca
-            ],
-            "pagamentos": [
-                {
-                    "data": p.data.isoformat(),
-                    "forma": p.forma,
-                    "valor": str(p.valor)
-                }
-                for p in os.pagamentos
-            ]
-        })
-
-    return jsonify({
-        "veiculo": {
-            "placa": veic.placa,
-            "marca": veic.marca,
-            "modelo": veic.modelo,
-        },
-        "cliente": {
-            "nome": cliente.nome_razao,
-            "cpf_cnpj": cliente.cpf_cnpj,
-            "telefone": cliente.telefone,
-            "email": cliente.email
-        },
-        "ordens": lista_os
-    })
-
-@app.get('/api/reports/customer-lifetime-value')
-def report_customer_lifetime_value():
-    db = next(db_sess())
-
-    # Optional filter: return only a single customer if requested
-    cliente_id = request.args.get('id_cliente', type=int)
-
-    # Aggregate payments per cliente via a focused subquery (Veiculo -> OS -> Pagamento).
-    # This avoids accidental row duplication caused by joining multiple 1-to-many relationships
-    # in a single query and keeps the aggregation scan tight.
-    pagos_por_cliente = (
-        db.query(
-            Veiculo.id_cliente.label('id_cliente'),
-            func.sum(Pagamento.valor).label('total_pago')
-        )
-        .join(OS, OS.id_veiculo == Veiculo.id_veiculo)
-        .join(Pagamento, Pagamento.id_os == OS.id_os)
-        .group_by(Veiculo.id_cliente)
-        .subquery()
-    )
-
-    q = (
-        db.query(
-            Cliente.id_cliente,
-            Cliente.nome_razao,
-            func.coalesce(pagos_por_cliente.c.total_pago, 0).label('total_pago')
-        )
-        .outerjoin(pagos_por_cliente, pagos_por_cliente.c.id_cliente == Cliente.id_cliente)
-    )
-
-    if cliente_id:
-        q = q.filter(Cliente.id_cliente == cliente_id)
-
-    q = q.order_by(func.coalesce(pagos_por_cliente.c.total_pago, 0).desc())
-
-    rows = q.all()
-    return jsonify([{
-        'id_cliente': r.id_cliente,
-        'nome_razao': r.nome_razao,
-        'total_pago': str(r.total_pago)
-    } for r in rows])
-
-
-@app.get('/api/reports/top-services-by-revenue')
-def report_top_services_by_revenue():
-    db = next(db_sess())
-    q = (
-        db.query(
-            Servico.id_servico,
-            Servico.descricao,
-            func.coalesce(func.sum(ItemServico.valor_unit * ItemServico.qtd), 0).label('receita')
-        )
-        .join(ItemServico, ItemServico.id_servico == Servico.id_servico)
-        .group_by(Servico.id_servico, Servico.descricao)
-        .order_by(func.coalesce(func.sum(ItemServico.valor_unit * ItemServico.qtd), 0).desc())
-    )
-    rows = q.all()
-    return jsonify([{
-        'id_servico': r.id_servico,
-        'descricao': r.descricao,
-        'receita': str(r.receita)
-    } for r in rows])
-
-
-@app.get('/api/reports/parts-usage-frequency')
-def report_parts_usage_frequency():
-    db = next(db_sess())
-    q = (
-        db.query(
-            Peca.id_peca,
-            Peca.sku,
-            Peca.descricao,
-            func.coalesce(func.sum(ItemPeca.qtd), 0).label('total_qtd'),
-            func.count(func.distinct(ItemPeca.id_os)).label('vezes_usada')
-        )
-        .outerjoin(ItemPeca, ItemPeca.id_peca == Peca.id_peca)
-        .group_by(Peca.id_peca, Peca.sku, Peca.descricao)
-        .order_by(func.coalesce(func.sum(ItemPeca.qtd), 0).desc())
-    )
-    rows = q.all()
-    return jsonify([{
-        'id_peca': r.id_peca,
-        'sku': r.sku,
-        'descricao': r.descricao,
-        'total_qtd': int(r.total_qtd) if r.total_qtd is not None else 0,
-        'vezes_usada': int(r.vezes_usada) if r.vezes_usada is not None else 0
-    } for r in rows])
-
-# Listar fornecedores
-@app.get("/api/fornecedores")
-def listar_fornecedores():
-    db = next(db_sess())
-    rows = db.query(Fornecedor).order_by(Fornecedor.nome_razao).all()
-    return jsonify([{
-        "id_fornecedor": f.id_fornecedor,
-        "nome_razao": f.nome_razao,
-        "cpf_cnpj": f.cpf_cnpj
-    } for f in rows])
-
-# Listar movimentos de estoque (com filtros opcionais)
-# /api/movimentos-estoque?os_id=1&id_peca=3
-@app.get("/api/movimentos-estoque")
-def listar_movimentos():
-    db = next(db_sess())
-    q = db.query(MovimentoEstoque).order_by(MovimentoEstoque.data.desc())
-    os_id = request.args.get("os_id", type=int)
-    peca_id = request.args.get("id_peca", type=int)
-    if os_id:
-        q = q.filter(MovimentoEstoque.id_os == os_id)
-    if peca_id:
-        q = q.filter(MovimentoEstoque.id_peca == peca_id)
-    rows = q.all()
-    return jsonify([{
-        "id_movimento": m.id_movimento,
-        "data": m.data.isoformat(),
-        "tipo": m.tipo.value,
-        "origem": m.origem,
-        "qtd": m.qtd,
-        "custo_unitario": str(m.custo_unitario) if m.custo_unitario is not None else None,
-        "id_os": m.id_os,
-        "peca": {
-            "id_peca": m.peca.id_peca,
-            "descricao": m.peca.descricao
-        }
-    } for m in rows])
-
-@app.post("/api/clientes")
-def criar_cliente():
-    db = next(db_sess())
-    dados = request.get_json()
-    cli = Cliente(
-        nome_razao=dados["nome_razao"],
-        cpf_cnpj=dados["cpf_cnpj"],
-        telefone=dados["telefone"],
-        email=dados.get("email")
-    )
-    db.add(cli)
-    db.commit()
-    db.refresh(cli)
-    return jsonify({"id_cliente": cli.id_cliente}), 201
-
-@app.post("/api/funcionarios")
-def criar_funcionario():
-    db = next(db_sess())
-    d = request.get_json()
-    f = Funcionario(nome=d["nome"], funcao=d.get("funcao"))
-    db.add(f); db.commit(); db.refresh(f)
-    return jsonify({"id_funcionario": f.id_funcionario}), 201
-
-@app.post("/api/servicos")
-def criar_servico():
-    db = next(db_sess())
-    d = request.get_json()
-    s = Servico(descricao=d["descricao"], preco_padrao=d.get("preco_padrao"))
-    db.add(s); db.commit(); db.refresh(s)
-    return jsonify({"id_servico": s.id_servico}), 201
-
-@app.post("/api/pecas")
-def criar_peca():
-    db = next(db_sess())
-    d = request.get_json()
-    p = Peca(
-        sku=d["sku"], descricao=d["descricao"],
-        origem=d["origem"], estoque_atual=d.get("estoque_atual", 0)
-    )
-    db.add(p); db.commit(); db.refresh(p)
-    return jsonify({"id_peca": p.id_peca}), 201
-
-@app.post("/api/fornecedores")
-def criar_fornecedor():
-    db = next(db_sess())
-    d = request.get_json()
-    f = Fornecedor(nome_razao=d["nome_razao"], cpf_cnpj=d.get("cpf_cnpj"))
-    db.add(f); db.commit(); db.refresh(f)
-    return jsonify({"id_fornecedor": f.id_fornecedor}), 201
+# back-end/app.py
+"""
+Fábrica do app Flask.
+
+    create_app()                                # cadastros + relatórios
+    create_app(blueprints=("cadastros",))       # worker só de cadastros/OS
+    create_app(blueprints=("relatorios",))      # worker só de relatórios/exportação/jobs
+
+Sem argumento, os blueprints vêm de "app": {"blueprints": [...]} no
+local_config.json (padrão: todos). /api/health e /api/debug são sempre
+registrados.
+
+Importar este módulo só carrega o Flask: rotas, modelos e o resto entram em
+create_app, e o engine só é criado na primeira conexão (database.get_engine).
+Com gunicorn --preload os workers fazem fork sem pool de conexões nem threads
+(LISTEN, manutenção de partições) herdados do processo pai.
+
+    gunicorn -w 4 --threads 16 'app:create_app()'     # ou -k gevent
+    gunicorn -w 4 --threads 16 'app:create_app(blueprints=("cadastros",))'
+    python app.py
+
+Cada aba aberta mantém um GET /api/eventos (SSE) em andamento: com o worker
+sync padrão (uma thread) quatro abas parariam a API. Use --threads ou
+-k gevent; eventos.py recusa (503) acima de "max_assinantes" por processo,
+que deve ficar abaixo de --threads para sobrar thread para o resto da API.
+
+`app` (gunicorn app:app, flask run) é criado no primeiro acesso.
+Tempo de import / criação do app: python bench_import.py
+"""
+import weakref
+from importlib import import_module
+
+from flask import Flask, g, has_request_context
+
+BLUEPRINTS = {
+    "cadastros": "rotas_cadastros",
+    "relatorios": "rotas_relatorios",
+}
+
+# apps vivos -> o que cada um precisa em cada engine novo; o gancho de
+# database.ao_criar_engine é um só por processo (_instrumentar) e um app
+# descartado sai daqui quando o coletor de lixo o recolhe
+_apps = weakref.WeakKeyDictionary()
+
+
+def create_app(config=None, blueprints=None):
+    """Monta um app Flask com os blueprints pedidos; `config` substitui o local_config.json."""
+    from flask_cors import CORS
+    from sqlalchemy import event
+
+    import database
+    import consultas_lentas
+    import eventos
+    import lembretes
+    import limites
+    import oficinas
+    import particionamento
+    import perfil
+    import rotas_operacao
+    import totais_os  # noqa: F401 - registra a manutenção dos totais da OS no flush
+
+    config = database.get_config() if config is None else config
+    if blueprints is None:
+        blueprints = (config.get("app") or {}).get("blueprints") or tuple(BLUEPRINTS)
+    desconhecidos = [b for b in blueprints if b not in BLUEPRINTS]
+    if desconhecidos:
+        raise ValueError(f"blueprints desconhecidos: {', '.join(desconhecidos)} (use {', '.join(BLUEPRINTS)})")
+
+    app = Flask(__name__)
+    CORS(app)
+    # limite de taxa + semáforo dos relatórios (seção "limites" do local_config.json)
+    limites.instalar(app, config.get("limites"))
+    # oficina de cada requisição (X-Oficina) e rotas de banco/schema por oficina (seção "oficinas")
+    oficinas.instalar(app, config.get("oficinas"))
+    # consultas acima do limiar vão para /api/debug/slow-queries (seção "consultas_lentas")
+    consultas_lentas.instalar(config.get("consultas_lentas"))
+    app.extensions["consultas_lentas"] = config.get("consultas_lentas") or {}
+    # ?__profile=1 / X-Perfil e amostragem global, só com "perfil": {"ativo": true}
+    perfil.instalar(app, config.get("perfil"))
+    perfil.rotas_debug(app)
+    # mudanças em agendamentos/peças/movimentos para os clientes de /api/eventos (LISTEN no Postgres)
+    app.extensions["eventos"] = eventos.instalar(database.SessionLocal, config.get("eventos"))
+    # outbox de lembretes gravado com o agendamento; despachante opcional em thread (seção "lembretes")
+    app.extensions["lembretes"] = lembretes.instalar(config.get("lembretes"))
+    _apps[app] = {
+        "meses_a_frente": (config.get("particionamento") or {}).get("meses_a_frente",
+                                                                      particionamento.MESES_A_FRENTE),
+        "lembretes": config.get("lembretes"),
+    }
+    database.ao_criar_engine(_instrumentar)
+
+    # as rotas usam `db = next(db_sess())`: a sessão só devolvia a conexão ao pool
+    # quando o coletor de lixo passava (o soak do bench_dia.py esgotava o pool);
+    # agora cada requisição fecha, no teardown, as sessões que abriu
+    if not event.contains(database.SessionLocal, "after_begin", _anotar_sessao):
+        event.listen(database.SessionLocal, "after_begin", _anotar_sessao)
+    app.teardown_request(_fechar_sessoes)
+
+    app.register_blueprint(rotas_operacao.bp)
+    for nome in blueprints:
+        app.register_blueprint(import_module(BLUEPRINTS[nome]).bp)
+    return app
+
+
+def _instrumentar(engine):
+    import consultas_lentas
+    import eventos
+    import lembretes
+    import particionamento
+
+    consultas_lentas.instrumentar(engine)
+    eventos.escutar(engine)
+    for app, opcoes in list(_apps.items()):
+        # Postgres com movimento_estoque/pagamento particionados: cria as partições dos próximos meses
+        particionamento.iniciar_manutencao(engine, opcoes["meses_a_frente"])
+        lembretes.iniciar(app.extensions["lembretes"], engine, opcoes["lembretes"])
+
+
+def _anotar_sessao(sessao, transacao, conexao):
+    if has_request_context():
+        g.setdefault("sessoes", set()).add(sessao)
+
+
+def _fechar_sessoes(exc):
+    for sessao in g.pop("sessoes", ()):
+        sessao.close()
+
+
+def __getattr__(nome):
+    # `gunicorn app:app` / `flask run`: o app padrão só é montado quando alguém pede
+    if nome == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
 
 
 if __name__ == "__main__":
-    # Print connection info so users know what's being used
-    try:
-        from database import DATABASE_URL
-        masked = DATABASE_URL
-        try:
-            # mask password if present
-            import re
-            masked = re.sub(r':[^:@]+@', ':***@', masked)
-        except Exception:
-            pass
-        print(f"[app.py] Starting app with DATABASE_URL: {masked}")
-    except Exception:
-        pass
-    app.run(host="0.0.0.0", port=5000, debug=True)
-
-@app.get('/api/health')
-def health_check():
-    # simple healthcheck: app ok and try a DB query
-    status = {"app": True, "db": False}
-    try:
-        db = next(db_sess())
-        db.execute("SELECT 1")
-        status['db'] = True
-    except Exception:
-        status['db'] = False
-    finally:
-        try:
-            db.close()
-        except Exception:
-            pass
-    return jsonify(status)
+    import re
+    from database import get_url
 
+    # Print connection info so users know what's being used (password masked)
+    print(f"[app.py] Starting app with DATABASE_URL: {re.sub(r':[^:@]+@', ':***@', get_url())}")
+    create_app().run(host="0.0.0.0", port=5000, debug=True)
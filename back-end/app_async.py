@@ -0,0 +1,186 @@
+# back-end/app_async.py
+"""
+Variante asyncio (Quart + SQLAlchemy AsyncEngine) das rotas de leitura.
+
+Enquanto uma consulta espera o banco, o event loop atende outras requisições,
+em vez de prender uma thread por requisição como no app.py. As consultas são
+as mesmas de consultas.py, executadas com AsyncSession.run_sync: o I/O passa
+pelo driver async (asyncpg / aiosqlite) e o código de ORM é compartilhado.
+
+Dependências extras: pip install -r back-end/requirements-async.txt
+
+Rodar (porta 5001, ao lado do app.py na 5000):
+    cd back-end && hypercorn app_async:app --bind 0.0.0.0:5001
+Comparar com o Flask: ver bench_async.py
+"""
+from quart import Quart, g, request, jsonify
+from quart_cors import cors
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from database import DATABASE_URL, get_rotas, oficina_atual
+import busca
+import consultas
+import oficinas
+
+# driver async equivalente ao do DATABASE_URL síncrono
+DRIVERS_ASYNC = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def url_async(url):
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in DRIVERS_ASYNC:
+        raise RuntimeError(f"Sem driver async configurado para '{backend}'")
+    return u.set(drivername=DRIVERS_ASYNC[backend])
+
+
+URL_ASYNC = url_async(DATABASE_URL)
+# mesmo dimensionamento do pool síncrono (database.py); o aiosqlite usa NullPool
+OPCOES_POOL = {} if URL_ASYNC.get_backend_name() == "sqlite" else {
+    "pool_size": 20,
+    "max_overflow": 40,
+    "pool_pre_ping": True,
+    "pool_recycle": 3600,
+}
+engine_async = create_async_engine(URL_ASYNC, echo=False, **OPCOES_POOL)
+SessionAsync = async_sessionmaker(engine_async, expire_on_commit=False)
+
+app = cors(Quart(__name__))
+
+
+async def consultar(fn, *args, **kwargs):
+    """Executa uma função de consultas.py numa AsyncSession (filtrada pela oficina da requisição)."""
+    async with SessionAsync() as db:
+        return await db.run_sync(fn, *args, **kwargs)
+
+
+# Oficina da requisição, como no app.py (oficinas.py). O id não é conferido no cadastro
+# (seria uma consulta síncrona no event loop): oficina inexistente só não tem linhas.
+# Oficinas com banco/schema próprio ("rotas") são atendidas só pelo app.py.
+@app.before_request
+async def definir_oficina():
+    try:
+        oficina = oficinas.ler(request.headers.get(oficinas.CABECALHO) or request.args.get("oficina"),
+                               validar=False)
+    except oficinas.ErroOficina as e:
+        return jsonify({"erro": e.mensagem}), e.status
+    if oficina in get_rotas():
+        return jsonify({"erro": f"oficina {oficina} tem banco próprio: use o app.py"}), 404
+    g.token_oficina = oficina_atual.set(oficina)
+
+
+@app.teardown_request
+async def limpar_oficina(_erro=None):
+    token = g.pop("token_oficina", None)
+    if token is not None:
+        oficina_atual.reset(token)
+
+
+@app.after_serving
+async def fechar_engine():
+    await engine_async.dispose()
+
+
+# -------- Listagens --------
+# mesmos parâmetros de página do app.py: ?limite=&offset=&q=
+def _pagina():
+    return {
+        "termo": request.args.get("q"),
+        "limite": request.args.get("limite", type=int),
+        "offset": request.args.get("offset", default=0, type=int),
+    }
+
+@app.get("/api/pecas")
+async def listar_pecas():
+    return jsonify(await consultar(consultas.dados_pecas, **_pagina()))
+
+@app.get("/api/funcionarios")
+async def listar_funcionarios():
+    return jsonify(await consultar(consultas.dados_funcionarios, **_pagina()))
+
+@app.get("/api/clientes")
+async def listar_clientes():
+    return jsonify(await consultar(consultas.dados_clientes, **_pagina()))
+
+@app.get("/api/veiculos")
+async def listar_veiculos():
+    return jsonify(await consultar(consultas.dados_veiculos, **_pagina()))
+
+@app.get("/api/servicos")
+async def listar_servicos():
+    return jsonify(await consultar(consultas.dados_servicos, **_pagina()))
+
+@app.get("/api/agendamentos")
+async def listar_agendamentos():
+    return jsonify(await consultar(consultas.dados_agendamentos, **_pagina()))
+
+@app.get("/api/fornecedores")
+async def listar_fornecedores():
+    return jsonify(await consultar(consultas.dados_fornecedores, **_pagina()))
+
+@app.get("/api/movimentos-estoque")
+async def listar_movimentos():
+    return jsonify(await consultar(
+        consultas.dados_movimentos,
+        os_id=request.args.get("os_id", type=int),
+        peca_id=request.args.get("id_peca", type=int),
+        **_pagina(),
+    ))
+
+@app.get("/api/busca")
+async def buscar():
+    termo = (request.args.get("q") or "").strip()
+    if not termo:
+        return jsonify({"erro": "informe q"}), 400
+    tipos = request.args.get("tipos")
+    return jsonify(await consultar(
+        busca.buscar, termo,
+        limite=request.args.get("limite", default=busca.LIMITE_PADRAO, type=int),
+        tipos=[t.strip() for t in tipos.split(",")] if tipos else None,
+    ))
+
+
+# -------- Relatórios --------
+@app.get("/api/relatorios/pecas-danificadas")
+async def pecas_danificadas_por_veiculo():
+    veiculo_id = request.args.get("veiculo_id", type=int)
+    if not veiculo_id:
+        return jsonify({"erro": "informe veiculo_id"}), 400
+    data = await consultar(consultas.dados_pecas_danificadas, veiculo_id)
+    if data is None:
+        return jsonify({"erro": "veículo não encontrado"}), 404
+    return jsonify(data)
+
+@app.get("/api/relatorios/historico-veiculo")
+@app.get("/api/relatorios/historico-veiculo-completo")
+async def relatorio_veiculo_completo():
+    veiculo_id = request.args.get("veiculo_id", type=int)
+    if not veiculo_id:
+        return jsonify({"erro": "informe veiculo_id"}), 400
+    data = await consultar(consultas.dados_historico_veiculo, veiculo_id)
+    if data is None:
+        return jsonify({"erro": "veículo não encontrado"}), 404
+    return jsonify(data)
+
+@app.get("/api/reports/customer-lifetime-value")
+async def report_customer_lifetime_value():
+    return jsonify(await consultar(
+        consultas.dados_customer_lifetime_value,
+        request.args.get("id_cliente", type=int),
+    ))
+
+@app.get("/api/reports/top-services-by-revenue")
+async def report_top_services_by_revenue():
+    return jsonify(await consultar(consultas.dados_top_services_by_revenue))
+
+@app.get("/api/reports/parts-usage-frequency")
+async def report_parts_usage_frequency():
+    return jsonify(await consultar(consultas.dados_parts_usage_frequency))
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5001)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: API síncrona (Flask, app.py) x assíncrona (Quart, app_async.py).
+
+Abre N clientes concorrentes (padrão 500) que fazem GETs em loop durante
+--duracao segundos contra cada servidor e mede vazão, erros e latência
+(p50/p95/p99/máx). Os dois servidores precisam estar no ar, sobre o mesmo banco:
+
+    cd back-end
+    gunicorn -w 4 --threads 8 -b :5000 app:app      # ou: python app.py
+    hypercorn -w 4 -b :5001 app_async:app
+    python bench_async.py --sync http://localhost:5000 --async http://localhost:5001
+
+Use a mesma quantidade de workers nos dois para a comparação ser justa. O app.py
+limita a taxa das rotas de relatório (limites.py): para medir só a vazão, use
+"limites": {"ativo": false} no local_config.json.
+Requer httpx (requirements-async.txt).
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+
+ROTAS_PADRAO = [
+    "/api/veiculos",
+    "/api/clientes",
+    "/api/agendamentos",
+    "/api/reports/customer-lifetime-value",
+    "/api/reports/top-services-by-revenue",
+    "/api/reports/parts-usage-frequency",
+    "/api/relatorios/historico-veiculo-completo?veiculo_id=1",
+]
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, int(round(p / 100 * (len(ordenados) - 1)))))
+    return ordenados[k]
+
+
+async def cliente(http, base, rotas, fim, latencias, erros):
+    for rota in rotas:
+        if time.perf_counter() >= fim:
+            return
+        inicio = time.perf_counter()
+        try:
+            r = await http.get(base + rota)
+            if r.status_code >= 400:
+                erros.append(r.status_code)
+            else:
+                latencias.append(time.perf_counter() - inicio)
+        except httpx.HTTPError as e:
+            erros.append(type(e).__name__)
+
+
+async def medir(nome, base, clientes, duracao, rotas, timeout):
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+    latencias, erros = [], []
+    async with httpx.AsyncClient(limits=limites, timeout=timeout) as http:
+        # aquecimento: abre conexões e popula caches do banco
+        await asyncio.gather(*(http.get(base + r) for r in rotas), return_exceptions=True)
+        inicio = time.perf_counter()
+        fim = inicio + duracao
+        tarefas = [
+            cliente(http, base, itertools.cycle(rotas[i % len(rotas):] + rotas[:i % len(rotas)]),
+                    fim, latencias, erros)
+            for i in range(clientes)
+        ]
+        await asyncio.gather(*tarefas)
+        decorrido = time.perf_counter() - inicio
+
+    ms = [x * 1000 for x in latencias]
+    return {
+        "servidor": nome,
+        "ok": len(latencias),
+        "erros": len(erros),
+        "req/s": len(latencias) / decorrido if decorrido else 0,
+        "p50": percentil(ms, 50),
+        "p95": percentil(ms, 95),
+        "p99": percentil(ms, 99),
+        "max": max(ms) if ms else 0,
+        "media": statistics.fmean(ms) if ms else 0,
+    }
+
+
+def imprimir(resultados):
+    print(f"{'servidor':<8} {'ok':>8} {'erros':>7} {'req/s':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for r in resultados:
+        print(f"{r['servidor']:<8} {r['ok']:>8} {r['erros']:>7} {r['req/s']:>9.1f} "
+              f"{r['p50']:>9.1f} {r['p95']:>9.1f} {r['p99']:>9.1f} {r['max']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a API síncrona e a assíncrona sob concorrência.")
+    parser.add_argument("--sync", default="http://localhost:5000", help="URL base do app.py")
+    parser.add_argument("--async", dest="async_", default="http://localhost:5001",
+                        help="URL base do app_async.py")
+    parser.add_argument("--clientes", type=int, default=500, help="clientes concorrentes (padrão 500)")
+    parser.add_argument("--duracao", type=float, default=30, help="segundos por servidor (padrão 30)")
+    parser.add_argument("--timeout", type=float, default=30, help="timeout por requisição, em segundos")
+    parser.add_argument("--rota", action="append", help="rota a exercitar (repita; padrão: leituras principais)")
+    args = parser.parse_args()
+
+    rotas = args.rota or ROTAS_PADRAO
+    resultados = []
+    for nome, base in (("sync", args.sync), ("async", args.async_)):
+        if not base:
+            continue
+        print(f"[bench_async] {nome}: {args.clientes} clientes por {args.duracao:.0f}s em {base}")
+        resultados.append(asyncio.run(
+            medir(nome, base.rstrip("/"), args.clientes, args.duracao, rotas, args.timeout)
+        ))
+    imprimir(resultados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Soak: um dia de oficina comprimido em --duracao segundos contra o app.py.
+
+Os benchmarks por rota (bench_async.py) não mostram a disputa entre escritas e
+relatórios. Aqui cada cenário gera chegadas de Poisson na sua taxa (req/s),
+independentes das respostas (carga aberta: um servidor lento acumula fila em
+vez de frear o gerador), e todos rodam juntos:
+
+    agendamento  POST /api/agendamentos (pico de manhã)
+    veiculo      POST /api/clientes + POST /api/veiculos
+    os           POST /api/os com serviço e peças (baixa estoque) + pagamento
+    gerente      leituras do painel: carga-trabalho, contas a receber, reposição...
+
+PERFIL multiplica as taxas por fase do dia (manhã: agendamentos x --pico;
+fim do dia: mais relatórios). A cada --intervalo segundos imprime uma linha
+com a janela: requisições, p50/p95/p99, erros, ocupação do pool lida em
+/api/health/ready e a memória (RSS) do servidor, se --pid for informado
+(Linux; com gunicorn repita --pid para somar os workers). No fim, um resumo
+por cenário, a deriva de latência (primeira x última janela) e o crescimento
+de memória em MiB/h.
+
+    cd back-end
+    python seed.py && python app.py
+    python bench_dia.py --duracao 1800 --pid $(pgrep -f "app.py")
+    python bench_dia.py --taxa agendamento=8 --taxa gerente=1 --json dia.json
+
+Erros = 5xx e falhas de conexão/timeout. 409 (conflito de horário, estoque) e
+429 (limites.py) são contados à parte: são respostas previstas. Para medir sem
+o limite por IP use "limites": {"ativo": false} no local_config.json.
+Requer httpx (requirements-async.txt).
+"""
+import argparse
+import asyncio
+import json
+import random
+import string
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from bench_async import percentil
+
+# req/s de cada cenário fora dos picos
+TAXAS_PADRAO = {"agendamento": 2.0, "veiculo": 0.3, "os": 0.5, "gerente": 0.2}
+# (início, fim) em fração do dia -> multiplicador por cenário
+PERFIL = [
+    ((0.0, 0.25), {"agendamento": None, "veiculo": 1.5}),  # None = --pico
+    ((0.85, 1.0), {"gerente": 3.0}),                       # fechamento do dia
+]
+ROTAS_GERENTE = [
+    "/api/reports/carga-trabalho",
+    "/api/reports/contas-a-receber",
+    "/api/reports/reposicao",
+    "/api/reports/top-services-by-revenue",
+    "/api/agendamentos?limite=50",
+]
+MAX_EM_VOO = 200
+# um ponto dentro de cada fase e um fora delas: o máximo de multiplicador() está entre eles
+_FRACOES = [ini for (ini, _), _ in PERFIL] + [0.5]
+
+
+def multiplicador(cenario, fracao, pico):
+    for (ini, fim), fatores in PERFIL:
+        if ini <= fracao < fim and cenario in fatores:
+            return pico if fatores[cenario] is None else fatores[cenario]
+    return 1.0
+
+
+def rss_mib(pids):
+    """RSS somado dos processos, em MiB (None fora do Linux ou sem --pid)."""
+    if not pids:
+        return None
+    total = 0
+    try:
+        for pid in pids:
+            with open(f"/proc/{pid}/status") as f:
+                total += next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+    except (OSError, StopIteration):
+        return None
+    return total / 1024
+
+
+def classificar(status):
+    if status < 400:
+        return "ok"
+    if status in (409, 429):
+        return str(status)
+    return "4xx" if status < 500 else "5xx"
+
+
+class Dia:
+    """Estado compartilhado: ids conhecidos, medições e requisições em voo."""
+
+    def __init__(self, http, base, duracao, pico, em_voo_max):
+        self.http, self.base = http, base
+        self.duracao, self.pico = duracao, pico
+        self.em_voo_max = em_voo_max
+        self.em_voo = 0
+        self.descartadas = Counter()
+        self.medicoes = []  # (instante, cenário, classe, ms)
+        self.veiculos = []  # (id_veiculo, id_cliente)
+        self.servicos, self.pecas, self.funcionarios = [], [], []
+        self.prefixo = "".join(random.choices(string.ascii_uppercase, k=2))
+        self.seq = 0
+        self.inicio = None
+
+    async def _listar(self, rota):
+        r = await self.http.get(f"{self.base}{rota}?limite=500")
+        r.raise_for_status()
+        return r.json()["itens"]
+
+    async def preparar(self):
+        veiculos, servicos, pecas, funcionarios = await asyncio.gather(
+            self._listar("/api/veiculos"), self._listar("/api/servicos"),
+            self._listar("/api/pecas"), self._listar("/api/funcionarios"),
+        )
+        self.veiculos = [(v["id_veiculo"], v["cliente"]["id"]) for v in veiculos]
+        self.servicos = [s["id_servico"] for s in servicos]
+        self.pecas = [p["id_peca"] for p in pecas]
+        self.funcionarios = [f["id_funcionario"] for f in funcionarios]
+        if not (self.veiculos and self.servicos and self.funcionarios):
+            raise SystemExit("cadastre veículos, serviços e funcionários antes (python seed.py)")
+
+    async def chamar(self, cenario, metodo, rota, corpo=None):
+        inicio = time.perf_counter()
+        try:
+            r = await self.http.request(metodo, self.base + rota, json=corpo)
+            classe = classificar(r.status_code)
+        except httpx.HTTPError:
+            r, classe = None, "falha"
+        fim = time.perf_counter()
+        self.medicoes.append((fim, cenario, classe, (fim - inicio) * 1000))
+        return r if classe == "ok" else None
+
+    # -------- cenários --------
+    async def agendamento(self):
+        id_veiculo, id_cliente = random.choice(self.veiculos)
+        quando = datetime.combine(date.today() + timedelta(days=random.randint(1, 14)),
+                                  datetime.min.time()).replace(hour=random.randint(8, 17),
+                                                               minute=random.choice((0, 15, 30, 45)))
+        await self.chamar("agendamento", "POST", "/api/agendamentos", {
+            "id_cliente": id_cliente, "id_veiculo": id_veiculo,
+            "id_servico": random.choice(self.servicos), "data_hora": quando.isoformat(),
+        })
+
+    async def veiculo(self):
+        self.seq += 1
+        r = await self.chamar("veiculo", "POST", "/api/clientes", {
+            "nome_razao": f"Cliente Soak {self.prefixo}{self.seq}",
+            "cpf_cnpj": "".join(random.choices(string.digits, k=11)),
+            "telefone": "(11) 90000-0000",
+        })
+        if r is None:
+            return
+        id_cliente = r.json()["id_cliente"]
+        r = await self.chamar("veiculo", "POST", "/api/veiculos", {
+            "placa": f"{self.prefixo}{self.seq:05d}", "id_cliente": id_cliente,
+            "marca": "Fiat", "modelo": "Uno", "km_atual": random.randint(0, 200_000),
+        })
+        if r is not None:
+            self.veiculos.append((r.json()["id_veiculo"], id_cliente))
+
+    async def os(self):
+        id_veiculo, _ = random.choice(self.veiculos)
+        pecas = random.sample(self.pecas, k=min(len(self.pecas), random.randint(1, 3)))
+        r = await self.chamar("os", "POST", "/api/os", {
+            "id_veiculo": id_veiculo,
+            "id_responsavel": random.choice(self.funcionarios),
+            "problema_relatado": "soak",
+            "itens_servico": [{"id_servico": random.choice(self.servicos), "qtd": 1}],
+            "itens_peca": [{"id_peca": p, "qtd": 1, "valor_unit": 40} for p in pecas],
+        })
+        if r is not None:
+            await self.chamar("os", "POST", f"/api/os/{r.json()['id_os']}/pagamentos", {
+                "pagamentos": [{"forma": "Pix", "valor": 50}],
+            })
+
+    async def gerente(self):
+        await self.chamar("gerente", "GET", random.choice(ROTAS_GERENTE))
+
+    # -------- chegadas --------
+    async def _uma(self, cenario):
+        try:
+            await getattr(self, cenario)()
+        finally:
+            self.em_voo -= 1
+
+    async def chegadas(self, cenario, taxa):
+        """Poisson não homogêneo por afinamento: gera na taxa máxima e aceita com taxa(t)/máx."""
+        maxima = taxa * max(multiplicador(cenario, f, self.pico) for f in _FRACOES)
+        if maxima <= 0:
+            return
+        tarefas = set()
+        fim = self.inicio + self.duracao
+        while True:
+            await asyncio.sleep(random.expovariate(maxima))
+            agora = time.perf_counter()
+            if agora >= fim:
+                break
+            atual = taxa * multiplicador(cenario, (agora - self.inicio) / self.duracao, self.pico)
+            if random.random() * maxima >= atual:
+                continue
+            if self.em_voo >= self.em_voo_max:
+                self.descartadas[cenario] += 1  # servidor não acompanha: não empilha sem limite
+                continue
+            self.em_voo += 1
+            t = asyncio.create_task(self._uma(cenario))
+            tarefas.add(t)
+            t.add_done_callback(tarefas.discard)
+        if tarefas:
+            await asyncio.wait(tarefas)
+
+
+async def amostrar(dia, intervalo, pids, serie):
+    """Uma linha por janela: latências das medições que terminaram nela + saúde + RSS."""
+    lidas = 0
+    fim = dia.inicio + dia.duracao
+    while True:
+        await asyncio.sleep(intervalo)
+        janela = dia.medicoes[lidas:]
+        lidas += len(janela)
+        pool = {}
+        try:
+            pool = (await dia.http.get(dia.base + "/api/health/ready")).json().get("pool", {})
+        except (httpx.HTTPError, ValueError):
+            pass
+        ms = [m for _, _, c, m in janela if c == "ok"]
+        classes = Counter(c for _, _, c, _ in janela)
+        ponto = {
+            "t": round(time.perf_counter() - dia.inicio, 1),
+            "req": len(janela),
+            "p50": percentil(ms, 50), "p95": percentil(ms, 95), "p99": percentil(ms, 99),
+            "erros": classes["5xx"] + classes["falha"],
+            "4xx": classes["4xx"] + classes["409"] + classes["429"],
+            "em_voo": dia.em_voo,
+            "pool_ocupacao": pool.get("ocupacao"),
+            "pool_em_uso": pool.get("checked_out"),
+            "rss_mib": rss_mib(pids),
+        }
+        serie.append(ponto)
+        print(f"{ponto['t']:>7.0f}s {ponto['req']:>6} {ponto['p50']:>8.1f} {ponto['p95']:>8.1f} "
+              f"{ponto['p99']:>8.1f} {ponto['erros']:>6} {ponto['4xx']:>6} {ponto['em_voo']:>6} "
+              f"{_fmt(ponto['pool_ocupacao'], '.2f'):>6} {_fmt(ponto['rss_mib'], '.1f'):>8}", flush=True)
+        if time.perf_counter() >= fim and dia.em_voo == 0:
+            return
+
+
+def _fmt(valor, formato):
+    return "-" if valor is None else format(valor, formato)
+
+
+async def rodar(args, taxas):
+    limites = httpx.Limits(max_connections=args.conexoes, max_keepalive_connections=args.conexoes)
+    cabecalhos = {"X-Oficina": str(args.oficina)} if args.oficina else {}
+    async with httpx.AsyncClient(limits=limites, timeout=args.timeout, headers=cabecalhos) as http:
+        dia = Dia(http, args.url.rstrip("/"), args.duracao, args.pico, args.max_em_voo)
+        await dia.preparar()
+        serie = []
+        print(f"[bench_dia] {args.duracao:.0f}s em {dia.base}; taxas {taxas}; pico da manhã x{args.pico}")
+        print(f"{'t':>8} {'req':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>6} "
+              f"{'4xx':>6} {'em voo':>6} {'pool':>6} {'RSS MiB':>8}")
+        dia.inicio = time.perf_counter()
+        await asyncio.gather(
+            amostrar(dia, args.intervalo, args.pid, serie),
+            *(dia.chegadas(c, t) for c, t in taxas.items()),
+        )
+        return dia, serie
+
+
+def resumo(dia, serie):
+    por_cenario = defaultdict(list)
+    for _, cenario, classe, ms in dia.medicoes:
+        por_cenario[cenario].append((classe, ms))
+    print(f"\n{'cenário':<12} {'req':>7} {'erro %':>7} {'409':>5} {'429':>5} {'4xx':>5} "
+          f"{'desc':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for cenario, linhas in sorted(por_cenario.items()):
+        classes = Counter(c for c, _ in linhas)
+        ms = [m for c, m in linhas if c == "ok"]
+        erros = classes["5xx"] + classes["falha"]
+        print(f"{cenario:<12} {len(linhas):>7} {100 * erros / len(linhas):>7.2f} {classes['409']:>5} "
+              f"{classes['429']:>5} {classes['4xx']:>5} {dia.descartadas[cenario]:>5} "
+              f"{percentil(ms, 50):>8.1f} {percentil(ms, 95):>8.1f} {percentil(ms, 99):>8.1f} "
+              f"{max(ms, default=0):>8.1f}")
+
+    com_req = [p for p in serie if p["req"]]
+    if len(com_req) >= 2:
+        print(f"deriva p95: {com_req[0]['p95']:.1f} ms na primeira janela -> "
+              f"{com_req[-1]['p95']:.1f} ms na última")
+    ocupacoes = [p["pool_ocupacao"] for p in serie if p["pool_ocupacao"] is not None]
+    if ocupacoes:
+        print(f"pool: ocupação máxima {max(ocupacoes):.2f}, "
+              f"{sum(o >= 0.9 for o in ocupacoes)} de {len(ocupacoes)} janelas saturadas (>= 0.9)")
+    rss = [(p["t"], p["rss_mib"]) for p in serie if p["rss_mib"] is not None]
+    if len(rss) >= 2 and rss[-1][0] > rss[0][0]:
+        (t0, m0), (t1, m1) = rss[0], rss[-1]
+        print(f"memória do servidor: {m0:.1f} -> {m1:.1f} MiB "
+              f"({(m1 - m0) / (t1 - t0) * 3600:+.1f} MiB/h)")
+
+
+def _taxa(valor):
+    cenario, _, taxa = valor.partition("=")
+    if cenario not in TAXAS_PADRAO:
+        raise argparse.ArgumentTypeError(f"cenário inválido: {cenario} (use {', '.join(TAXAS_PADRAO)})")
+    try:
+        return cenario, float(taxa)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"taxa inválida: {valor!r} (ex.: agendamento=4)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula um dia de oficina contra a API e mede a deriva.")
+    parser.add_argument("--url", default="http://localhost:5000", help="URL base do app.py")
+    parser.add_argument("--duracao", type=float, default=600, help="segundos do dia simulado (padrão 600)")
+    parser.add_argument("--intervalo", type=float, default=10, help="segundos por janela do relatório")
+    parser.add_argument("--taxa", type=_taxa, action="append", default=[],
+                        help="cenário=req/s, repita (padrão: " +
+                             ", ".join(f"{c}={t}" for c, t in TAXAS_PADRAO.items()) + ")")
+    parser.add_argument("--pico", type=float, default=3.0, help="multiplicador de agendamentos de manhã")
+    parser.add_argument("--pid", type=int, action="append", help="PID do servidor para medir a RSS (repita)")
+    parser.add_argument("--oficina", type=int, help="envia X-Oficina em todas as requisições")
+    parser.add_argument("--conexoes", type=int, default=100, help="conexões HTTP simultâneas")
+    parser.add_argument("--max-em-voo", type=int, default=MAX_EM_VOO,
+                        help="acima disso as chegadas são descartadas (e contadas)")
+    parser.add_argument("--timeout", type=float, default=30, help="timeout por requisição, em segundos")
+    parser.add_argument("--semente", type=int, help="semente do random (repetir a mesma sequência)")
+    parser.add_argument("--json", help="grava a série por janela e o resumo neste arquivo")
+    args = parser.parse_args()
+
+    if args.semente is not None:
+        random.seed(args.semente)
+    taxas = {**TAXAS_PADRAO, **dict(args.taxa)}
+    dia, serie = asyncio.run(rodar(args, taxas))
+    resumo(dia, serie)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"taxas": taxas, "duracao": args.duracao, "serie": serie,
+                       "descartadas": dict(dia.descartadas)}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
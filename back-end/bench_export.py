@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark da exportação (exportacao.py) sobre uma massa grande de movimentos.
+
+Insere N movimentos de estoque sintéticos (origem "bench-export"), exporta a
+tabela inteira em CSV e em Parquet e mede linhas/s e o pico de memória do
+processo (RSS máximo) ao fim de cada exportação. Com --url mede também o
+download em streaming pela API (GET /api/export/movimentos-estoque).
+
+    cd back-end
+    python bench_export.py --linhas 2000000
+    python bench_export.py --linhas 0 --url http://localhost:5000   # reaproveita a massa
+    python bench_export.py --limpar
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from database import engine
+from models import MovimentoEstoque, Peca, TipoMovimento
+import exportacao
+
+ORIGEM = "bench-export"
+
+
+def semear(linhas, lote=50_000):
+    with engine.begin() as conn:
+        pecas = conn.execute(select(Peca.id_peca)).scalars().all()
+    if not pecas:
+        raise SystemExit("cadastre peças antes (python seed.py)")
+    inicio = datetime.now() - timedelta(days=365)
+    t0 = time.perf_counter()
+    for base in range(0, linhas, lote):
+        n = min(lote, linhas - base)
+        with engine.begin() as conn:
+            conn.execute(insert(MovimentoEstoque), [{
+                "id_peca": random.choice(pecas),
+                "data": inicio + timedelta(seconds=random.randrange(365 * 86400)),
+                "tipo": TipoMovimento.saida if random.random() < 0.7 else TipoMovimento.entrada,
+                "origem": ORIGEM,
+                "qtd": random.randint(1, 10),
+                "custo_unitario": round(random.uniform(5, 500), 2),
+            } for _ in range(n)])
+    print(f"semeadas {linhas} linhas em {time.perf_counter() - t0:.1f}s")
+
+
+def _rss_max_mib():
+    # ru_maxrss vem em KiB no Linux; o pico não deve crescer com o número de linhas
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else float("nan")
+
+
+def medir(rotulo, fn):
+    t0 = time.perf_counter()
+    linhas, tamanho = fn()
+    dt = time.perf_counter() - t0
+    print(f"{rotulo:<10} {linhas:>10} linhas  {dt:7.2f}s  {linhas / dt:>10.0f} linhas/s  "
+          f"{tamanho / 2**20:8.1f} MiB  RSS máx {_rss_max_mib():7.1f} MiB")
+
+
+def exportar_csv(lote):
+    linhas = tamanho = 0
+    for pedaco in exportacao.csv_tabela(engine, "movimentos-estoque", lote=lote):
+        tamanho += len(pedaco)
+        linhas += pedaco.count("\n")
+    return linhas - 1, tamanho  # sem o cabeçalho
+
+
+def exportar_parquet(lote):
+    caminho = exportacao.parquet_tabela(engine, "movimentos-estoque", lote=lote)
+    try:
+        return exportacao.pq.ParquetFile(caminho).metadata.num_rows, os.path.getsize(caminho)
+    finally:
+        os.remove(caminho)
+
+
+def exportar_http(url):
+    import httpx
+
+    linhas = tamanho = 0
+    with httpx.stream("GET", f"{url}/api/export/movimentos-estoque", timeout=None) as r:
+        r.raise_for_status()
+        for pedaco in r.iter_bytes():
+            tamanho += len(pedaco)
+            linhas += pedaco.count(b"\n")
+    return linhas - 1, tamanho
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=1_000_000, help="movimentos a inserir (0 = usar os existentes)")
+    parser.add_argument("--lote", type=int, default=exportacao.LOTE, help="linhas por bloco do cursor")
+    parser.add_argument("--url", help="mede também o download pela API neste servidor")
+    parser.add_argument("--limpar", action="store_true", help="apaga os movimentos do benchmark e sai")
+    args = parser.parse_args()
+
+    if args.limpar:
+        with engine.begin() as conn:
+            n = conn.execute(delete(MovimentoEstoque).where(MovimentoEstoque.origem == ORIGEM)).rowcount
+        print(f"{n} movimentos removidos")
+        return
+
+    if args.linhas:
+        semear(args.linhas)
+    medir("csv", lambda: exportar_csv(args.lote))
+    if exportacao.parquet_disponivel():
+        medir("parquet", lambda: exportar_parquet(args.lote))
+    else:
+        print("parquet    (pulado: pyarrow não instalado)")
+    if args.url:
+        medir("http csv", lambda: exportar_http(args.url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# back-end/bench_import.py
+"""
+Tempo de subida do backend: cada cenário roda N vezes num processo Python
+novo (import frio, sem nada em cache no interpretador) e o resultado é a
+mediana e o mínimo, em ms, medidos dentro do processo filho.
+
+    python bench_import.py                  # todos os cenários, 15 execuções
+    python bench_import.py -n 30 --importtime create_app
+                                            # + os módulos mais caros (python -X importtime)
+
+Cenários:
+    import app            só o import (o que o master do gunicorn paga antes de criar o app)
+    create_app            app completo (cadastros + relatórios)
+    create_app cadastros  worker só de cadastros/OS
+    primeira requisicao   create_app + GET /api/health/live + GET /api/servicos (abre o engine)
+    fork                  processo pai com o app pronto (--preload) faz fork; o filho atende a
+                          primeira requisição: mede o que cada worker paga depois do fork
+
+Usa o banco do DATABASE_URL / local_config.json; sem ele, rode com
+DATABASE_URL=sqlite:////tmp/bench.db (python seed.py antes, para /api/servicos).
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+
+_MEDIR = """
+import time
+_t0 = time.perf_counter()
+{codigo}
+print("BENCH_MS", (time.perf_counter() - _t0) * 1000)
+"""
+
+_FORK = """
+import os, time
+import app
+aplicacao = app.create_app()
+r, w = os.pipe()
+_t0 = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    os.close(r)
+    aplicacao.test_client().get("/api/servicos")
+    os.write(w, b"ok")
+    os._exit(0)
+os.close(w)
+os.read(r, 2)
+print("BENCH_MS", (time.perf_counter() - _t0) * 1000)
+os.waitpid(pid, 0)
+"""
+
+CENARIOS = {
+    "import app": _MEDIR.format(codigo="import app"),
+    "create_app": _MEDIR.format(codigo="import app\napp.create_app()"),
+    "create_app cadastros": _MEDIR.format(codigo="import app\napp.create_app(blueprints=('cadastros',))"),
+    "primeira requisicao": _MEDIR.format(codigo=(
+        "import app\nc = app.create_app().test_client()\n"
+        "c.get('/api/health/live')\nc.get('/api/servicos')"
+    )),
+}
+if hasattr(os, "fork"):
+    CENARIOS["fork"] = _FORK
+
+
+def executar(codigo, opcoes=()):
+    saida = subprocess.run(
+        [sys.executable, *opcoes, "-c", codigo],
+        cwd=AQUI, capture_output=True, text=True, check=True,
+    )
+    return saida
+
+
+def medir(codigo, n):
+    tempos = []
+    for _ in range(n):
+        linha = next(l for l in executar(codigo).stdout.splitlines() if l.startswith("BENCH_MS"))
+        tempos.append(float(linha.split()[1]))
+    return statistics.median(tempos), min(tempos)
+
+
+def mais_caros(codigo, top=15):
+    """Módulos com maior tempo acumulado no -X importtime (µs -> ms)."""
+    linhas = executar(codigo, ("-X", "importtime")).stderr.splitlines()
+    modulos = []
+    for linha in linhas:
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", linha)
+        if m and len(m.group(3)) <= 3:  # só o primeiro nível de cada import
+            modulos.append((int(m.group(2)) / 1000, m.group(4)))
+    return sorted(modulos, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cenarios", nargs="*", help=f"padrão: todos ({', '.join(CENARIOS)})")
+    parser.add_argument("-n", type=int, default=15, help="execuções por cenário")
+    parser.add_argument("--importtime", action="store_true",
+                        help="mostra os imports mais caros de cada cenário")
+    args = parser.parse_args()
+    desconhecidos = [c for c in args.cenarios if c not in CENARIOS]
+    if desconhecidos:
+        parser.error(f"cenários desconhecidos: {', '.join(desconhecidos)}")
+
+    for nome in args.cenarios or CENARIOS:
+        mediana, minimo = medir(CENARIOS[nome], args.n)
+        print(f"{nome:<22} mediana {mediana:8.1f} ms   mínimo {minimo:8.1f} ms   (n={args.n})")
+        if args.importtime:
+            for ms, modulo in mais_caros(CENARIOS[nome]):
+                print(f"    {ms:8.1f} ms  {modulo}")
+
+
+if __name__ == "__main__":
+    main()
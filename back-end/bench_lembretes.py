@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark do outbox de lembretes (lembretes.py).
+
+1. Vazão do despachante: insere N lembretes vencidos e despacha até esvaziar a
+   fila, contra um SMTP local (lembretes.SMTPLocal) ou um provedor de SMS local
+   (HTTP que aceita o lote), para cada tamanho de --lote.
+2. Custo no agendamento: N POST /api/agendamentos (cliente de teste do Flask)
+   sem e com a seção "lembretes"; a diferença é o que o outbox acrescenta à
+   requisição (carregar cliente/serviço e gravar as linhas na mesma transação).
+
+Usa o banco do DATABASE_URL / local_config.json e apaga o que criou no fim.
+
+    cd back-end
+    python bench_lembretes.py --mensagens 5000 --lote 1 --lote 50 --lote 200
+    python bench_lembretes.py --canal sms --agendamentos 500
+"""
+import argparse
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import delete, insert, select
+
+import database
+import lembretes
+from database import get_engine, oficina_corrente
+from models import Agendamento, Cliente, Lembrete, Servico, Veiculo
+from bench_async import percentil
+
+DOMINIO = "bench.invalid"
+
+
+class _SMSLocal(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(202)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _veiculo():
+    """Primeiro veículo cadastrado, com o cliente e um serviço para os agendamentos."""
+    with get_engine().connect() as conn:
+        v = conn.execute(select(Veiculo.id_veiculo, Veiculo.id_cliente, Veiculo.id_oficina,
+                                select(Servico.id_servico).order_by(Servico.id_servico).limit(1)
+                                .scalar_subquery().label("id_servico"))
+                         .order_by(Veiculo.id_veiculo).limit(1)).first()
+    if v is None or v.id_servico is None:
+        raise SystemExit("cadastre veículos e serviços antes (python seed.py)")
+    return v
+
+
+def semear(canal, mensagens):
+    engine = get_engine()
+    v = _veiculo()
+    with engine.begin() as conn:
+        id_agendamento = conn.execute(insert(Agendamento).values(
+            id_oficina=v.id_oficina, id_cliente=v.id_cliente, id_veiculo=v.id_veiculo, id_servico=v.id_servico,
+            data_hora=datetime.now() + timedelta(days=1),
+        )).inserted_primary_key[0]
+        agora = datetime.now()
+        conn.execute(insert(Lembrete), [{
+            "id_oficina": v.id_oficina, "id_agendamento": id_agendamento, "canal": canal,
+            "destino": f"cliente{i}@{DOMINIO}" if canal == "email" else f"+55119{i:08d}",
+            "assunto": "Lembrete", "mensagem": "Lembrete do benchmark", "proxima_tentativa": agora,
+        } for i in range(mensagens)])
+    return id_agendamento
+
+
+def medir_vazao(args):
+    print(f"{'canal':<6} {'lote':>6} {'msgs':>7} {'lotes':>6} {'seg':>7} {'msgs/s':>9}")
+    if args.canal == "email":
+        servidor = lembretes.SMTPLocal()
+        servidor.__enter__()
+        config = {"smtp": {"host": servidor.host, "port": servidor.port}}
+    else:
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), _SMSLocal)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        config = {"sms": {"url": f"http://127.0.0.1:{servidor.server_address[1]}/lote"}}
+    try:
+        for lote in args.lote or [1, 50, lembretes.LOTE]:
+            id_agendamento = semear(args.canal, args.mensagens)
+            despachante = lembretes.instalar({**config, "lote": lote})
+            enviados = lotes = 0
+            t0 = time.perf_counter()
+            while True:
+                feito = despachante.despachar_lote()
+                if not sum(feito.values()):
+                    break
+                enviados += feito["enviados"]
+                lotes += 1
+            dt = time.perf_counter() - t0
+            print(f"{args.canal:<6} {lote:>6} {enviados:>7} {lotes:>6} {dt:>7.2f} {enviados / dt:>9.0f}")
+            _apagar([id_agendamento])
+    finally:
+        if args.canal == "email":
+            servidor.__exit__(None, None, None)
+        else:
+            servidor.shutdown()
+
+
+def medir_agendamento(args):
+    from app import create_app
+
+    v = _veiculo()
+    with database.SessionLocal() as db:  # garante um e-mail para o canal de e-mail
+        cliente = db.get(Cliente, v.id_cliente)
+        email_original, cliente.email = cliente.email, cliente.email or f"cliente@{DOMINIO}"
+        db.commit()
+    base = datetime.now().replace(second=0, microsecond=0) + timedelta(days=400)
+    criados = []
+    config_lembretes = {"smtp": {"host": "127.0.0.1", "port": 1025},
+                        "sms": {"url": "http://127.0.0.1:1/lote"}}  # só grava: não há despachante
+    print(f"\n{'agendamento':<16} {'n':>6} {'média ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    try:
+        resultados = {}
+        for rotulo, extra in (("sem lembretes", {}), ("com lembretes", {"lembretes": config_lembretes})):
+            c = create_app({**database.get_config(), "limites": {"ativo": False}, **extra}).test_client()
+            ms = []
+            for i in range(args.agendamentos):
+                t0 = time.perf_counter()
+                r = c.post("/api/agendamentos", json={
+                    "id_cliente": v.id_cliente, "id_veiculo": v.id_veiculo, "id_servico": v.id_servico,
+                    "data_hora": (base + timedelta(minutes=len(criados))).isoformat(),
+                })
+                ms.append((time.perf_counter() - t0) * 1000)
+                if r.status_code != 201:
+                    raise SystemExit(f"POST /api/agendamentos falhou: {r.status_code} {r.get_json()}")
+                criados.append(r.get_json()["id_agendamento"])
+            resultados[rotulo] = statistics.fmean(ms)
+            print(f"{rotulo:<16} {len(ms):>6} {statistics.fmean(ms):>9.2f} {percentil(ms, 50):>8.2f} "
+                  f"{percentil(ms, 95):>8.2f} {percentil(ms, 99):>8.2f}")
+        print(f"custo do outbox: {resultados['com lembretes'] - resultados['sem lembretes']:+.2f} ms "
+              "por agendamento (média)")
+    finally:
+        _apagar(criados)
+        with database.SessionLocal() as db:
+            db.get(Cliente, v.id_cliente).email = email_original
+            db.commit()
+
+
+def _apagar(ids_agendamento):
+    with get_engine().begin() as conn:
+        for i in range(0, len(ids_agendamento), 500):
+            bloco = ids_agendamento[i:i + 500]
+            conn.execute(delete(Lembrete).where(Lembrete.id_agendamento.in_(bloco)))
+            conn.execute(delete(Agendamento).where(Agendamento.id_agendamento.in_(bloco)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--canal", choices=("email", "sms"), default="email")
+    parser.add_argument("--mensagens", type=int, default=2000, help="lembretes por medição de vazão")
+    parser.add_argument("--lote", type=int, action="append", help="tamanho do lote (repita; padrão 1, 50, 200)")
+    parser.add_argument("--agendamentos", type=int, default=300, help="POSTs por medição de custo (0 = pula)")
+    args = parser.parse_args()
+
+    print(f"[bench_lembretes] banco: {database.get_url().split('@')[-1]}; oficina {oficina_corrente()}")
+    medir_vazao(args)
+    if args.agendamentos:
+        medir_agendamento(args)
+
+
+if __name__ == "__main__":
+    main()
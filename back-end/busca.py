@@ -0,0 +1,182 @@
+# back-end/busca.py
+"""
+Busca rápida de clientes, veículos e peças (GET /api/busca?q=).
+
+- Postgres: ILIKE/similarity() sobre os índices GIN trigram definidos em models.py.
+- SQLite:   tabela FTS5 `busca_fts`, mantida por triggers (também em models.py).
+- Outros dialetos: LIKE simples, sem índice.
+
+Reindexação (banco criado antes dos índices existirem):
+    python busca.py --reindexar
+"""
+import re
+import sys
+
+from sqlalchemy import select, literal, literal_column, func, case, or_, union_all, text
+
+from database import oficina_atual
+from models import Cliente, Veiculo, Peca, TIPOS_BUSCA
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+
+def buscar(db, termo, limite=LIMITE_PADRAO, tipos=None):
+    """Retorna até `limite` resultados ordenados por relevância (maior score primeiro)."""
+    termo = (termo or "").strip()
+    if not termo:
+        return []
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+    tipos = [t for t in (tipos or TIPOS_BUSCA) if t in TIPOS_BUSCA]
+    if not tipos:
+        return []
+
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "postgresql":
+        return _buscar_postgres(db, termo, limite, tipos)
+    if dialeto == "sqlite":
+        return _buscar_fts5(db, termo, limite, tipos)
+    return _buscar_like(db, termo, limite, tipos)
+
+
+# ---------------------------------------------------------------- Postgres
+def _consultas_por_tipo(termo, ranqueado):
+    """Um SELECT por tipo com colunas (tipo, id, titulo, detalhe, score)."""
+
+    def score(*colunas):
+        if not ranqueado:
+            return literal(0.0)
+        prefixo = case(
+            *[(c.istartswith(termo, autoescape=True), 1.0) for c in colunas], else_=0.0
+        )
+        return func.greatest(*[func.similarity(c, termo) for c in colunas]) + prefixo
+
+    def filtro(*colunas):
+        conds = [c.icontains(termo, autoescape=True) for c in colunas]
+        if ranqueado:
+            # operador % do pg_trgm: pega também erros de digitação
+            conds += [c.op("%")(termo) for c in colunas]
+        return or_(*conds)
+
+    return {
+        "cliente": (
+            select(
+                literal("cliente").label("tipo"), Cliente.id_cliente.label("id"),
+                Cliente.nome_razao.label("titulo"), Cliente.cpf_cnpj.label("detalhe"),
+                score(Cliente.nome_razao, Cliente.cpf_cnpj).label("score"),
+            ).where(filtro(Cliente.nome_razao, Cliente.cpf_cnpj))
+        ),
+        "veiculo": (
+            select(
+                literal("veiculo").label("tipo"), Veiculo.id_veiculo.label("id"),
+                Veiculo.placa.label("titulo"),
+                func.trim(func.coalesce(Veiculo.marca, "") + " " + func.coalesce(Veiculo.modelo, "")).label("detalhe"),
+                score(Veiculo.placa, Veiculo.marca, Veiculo.modelo).label("score"),
+            ).where(filtro(Veiculo.placa, Veiculo.marca, Veiculo.modelo))
+        ),
+        "peca": (
+            select(
+                literal("peca").label("tipo"), Peca.id_peca.label("id"),
+                Peca.descricao.label("titulo"), Peca.sku.label("detalhe"),
+                score(Peca.sku, Peca.descricao).label("score"),
+            ).where(filtro(Peca.sku, Peca.descricao))
+        ),
+    }
+
+
+def _buscar_postgres(db, termo, limite, tipos):
+    consultas = _consultas_por_tipo(termo, ranqueado=True)
+    # cada tipo é limitado antes do UNION para o planner parar cedo em cada índice
+    partes = [
+        consultas[t].order_by(literal_column("score").desc()).limit(limite)
+        for t in tipos
+    ]
+    uniao = union_all(*partes).subquery()
+    stmt = select(uniao).order_by(uniao.c.score.desc()).limit(limite)
+    return _formatar(db.execute(stmt))
+
+
+# ---------------------------------------------------------------- SQLite
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _consulta_fts5(termo):
+    # cada token vira um prefixo entre aspas: "joao"* "silva"*  (AND implícito)
+    tokens = _TOKEN.findall(termo)
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def _buscar_fts5(db, termo, limite, tipos):
+    consulta = _consulta_fts5(termo)
+    if not consulta:
+        return []
+    marcadores = ", ".join(f":t{i}" for i in range(len(tipos)))
+    stmt = text(
+        "SELECT tipo, ref_id AS id, titulo, detalhe, -bm25(busca_fts) AS score "
+        "FROM busca_fts "
+        f"WHERE busca_fts MATCH :consulta AND tipo IN ({marcadores}) "
+        "AND (:oficina IS NULL OR id_oficina = :oficina) "
+        "ORDER BY rank LIMIT :limite"
+    )
+    # SQL direto não passa pelo filtro de oficina do ORM (oficinas.py): filtra aqui
+    params = {"consulta": consulta, "limite": limite, "oficina": oficina_atual.get()}
+    params.update({f"t{i}": t for i, t in enumerate(tipos)})
+    return _formatar(db.execute(stmt, params))
+
+
+# ---------------------------------------------------------------- genérico
+def _buscar_like(db, termo, limite, tipos):
+    consultas = _consultas_por_tipo(termo, ranqueado=False)
+    resultado = []
+    for t in tipos:
+        resultado += _formatar(db.execute(consultas[t].limit(limite)))
+    return resultado[:limite]
+
+
+def _formatar(rows):
+    return [{
+        "tipo": r.tipo,
+        "id": int(r.id),
+        "titulo": r.titulo,
+        "detalhe": r.detalhe,
+        "score": round(float(r.score or 0), 4),
+    } for r in rows]
+
+
+def reindexar(db):
+    """Reconstrói o índice de busca do SQLite a partir das tabelas (no Postgres não há o que fazer)."""
+    if db.get_bind().dialect.name != "sqlite":
+        return 0
+    db.execute(text("DELETE FROM busca_fts"))
+    db.execute(text(
+        "INSERT INTO busca_fts(rowid, tipo, ref_id, id_oficina, titulo, detalhe, texto) "
+        "SELECT id_cliente * 4 + :c, 'cliente', id_cliente, id_oficina, nome_razao, cpf_cnpj, "
+        "nome_razao || ' ' || cpf_cnpj || ' ' || "
+        "replace(replace(replace(cpf_cnpj, '.', ''), '-', ''), '/', '') FROM cliente"
+    ), {"c": TIPOS_BUSCA["cliente"]})
+    db.execute(text(
+        "INSERT INTO busca_fts(rowid, tipo, ref_id, id_oficina, titulo, detalhe, texto) "
+        "SELECT id_veiculo * 4 + :c, 'veiculo', id_veiculo, id_oficina, placa, "
+        "trim(coalesce(marca, '') || ' ' || coalesce(modelo, '')), "
+        "placa || ' ' || replace(placa, '-', '') || ' ' || coalesce(marca, '') || ' ' || coalesce(modelo, '') "
+        "FROM veiculo"
+    ), {"c": TIPOS_BUSCA["veiculo"]})
+    db.execute(text(
+        "INSERT INTO busca_fts(rowid, tipo, ref_id, id_oficina, titulo, detalhe, texto) "
+        "SELECT id_peca * 4 + :c, 'peca', id_peca, id_oficina, descricao, sku, sku || ' ' || descricao FROM peca"
+    ), {"c": TIPOS_BUSCA["peca"]})
+    total = db.execute(text("SELECT count(*) FROM busca_fts")).scalar()
+    db.commit()
+    return total
+
+
+if __name__ == "__main__":
+    from database import Base, engine, SessionLocal
+
+    if "--reindexar" not in sys.argv:
+        print(__doc__)
+        sys.exit(1)
+    # cria extensão/índices/FTS que ainda não existirem
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        print(f"[busca.py] {reindexar(db)} registros indexados ({engine.dialect.name})")
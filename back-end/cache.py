@@ -0,0 +1,57 @@
+# back-end/cache.py
+"""
+Cache em memória com validade (TTL), para relatórios lidos a cada renderização.
+
+    agenda = CacheTTL(ttl_s=15)
+    dados = agenda.obter(("carga", dia), lambda: calcular(db, dia))
+    agenda.invalidar()   # depois de uma escrita que muda o resultado
+
+Por processo: cada worker do servidor tem o seu. Chamadas concorrentes para a
+mesma chave expirada calculam uma vez só (as outras esperam o resultado).
+"""
+import threading
+import time
+
+
+class CacheTTL:
+    def __init__(self, ttl_s=30, max_itens=256):
+        self.ttl_s = ttl_s
+        self.max_itens = max_itens
+        self._itens = {}          # chave -> (expira_em, valor)
+        self._calculando = {}     # chave -> Lock
+        self._lock = threading.Lock()
+
+    def obter(self, chave, calcular):
+        agora = time.monotonic()
+        item = self._itens.get(chave)
+        if item and item[0] > agora:
+            return item[1]
+
+        with self._lock:
+            trava = self._calculando.setdefault(chave, threading.Lock())
+        with trava:
+            item = self._itens.get(chave)  # outra thread pode ter acabado de calcular
+            if item and item[0] > time.monotonic():
+                return item[1]
+            valor = calcular()
+            with self._lock:
+                if len(self._itens) >= self.max_itens:
+                    self._descartar_expirados()
+                self._itens[chave] = (time.monotonic() + self.ttl_s, valor)
+                self._calculando.pop(chave, None)
+            return valor
+
+    def _descartar_expirados(self):
+        agora = time.monotonic()
+        for chave in [c for c, (expira, _) in self._itens.items() if expira <= agora]:
+            del self._itens[chave]
+        if len(self._itens) >= self.max_itens:
+            # ainda cheio: sai o que expira primeiro
+            del self._itens[min(self._itens, key=lambda c: self._itens[c][0])]
+
+    def invalidar(self, chave=None):
+        with self._lock:
+            if chave is None:
+                self._itens.clear()
+            else:
+                self._itens.pop(chave, None)
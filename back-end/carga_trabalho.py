@@ -0,0 +1,141 @@
+# back-end/carga_trabalho.py
+"""
+Carga de trabalho por mecânico (OS.id_responsavel) e agenda por dia.
+
+- Por funcionário: OS por status, receita (serviços + peças das OS não
+  canceladas), backlog em aberto (aberto/em_execucao) e saldo a receber.
+  Um único SELECT com somas condicionais agrupado por funcionário; o LEFT JOIN
+  mantém quem não tem OS (todos zerados).
+- Agenda: agendamentos por dia e status no intervalo, outro SELECT agrupado
+  por date(data_hora).
+
+A tela de agendamento lê isso a cada renderização, então o resultado fica num
+CacheTTL por CACHE_TTL_S segundos. Escritas pelo ORM em OS/Agendamento limpam
+o cache no commit; atualizações em massa (UPDATE direto, ex. totais e status em
+lote) aparecem no máximo CACHE_TTL_S segundos depois.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, case, event, func, select
+from sqlalchemy.orm import Session
+
+from cache import CacheTTL
+from database import oficina_atual
+from models import OS, Agendamento, Funcionario, StatusOS, StatusAgendamento
+
+CACHE_TTL_S = 15
+DIAS_AGENDA = 14
+_CHAVE_SUJO = "carga_trabalho_sujo"
+
+cache = CacheTTL(ttl_s=CACHE_TTL_S)
+
+
+def _soma_se(condicao, valor=1):
+    return func.coalesce(func.sum(case((condicao, valor), else_=0)), 0)
+
+
+def carga_por_funcionario(db, inicio=None, fim=None):
+    juncao = OS.id_responsavel == Funcionario.id_funcionario
+    if inicio:
+        juncao = and_(juncao, OS.data_abertura >= inicio)
+    if fim:
+        juncao = and_(juncao, OS.data_abertura < fim)
+
+    ativa = OS.status != StatusOS.cancelado
+    em_aberto = OS.status.in_([StatusOS.aberto, StatusOS.em_execucao])
+    colunas_status = [_soma_se(OS.status == s).label(s.value) for s in StatusOS]
+    q = (
+        select(
+            Funcionario.id_funcionario,
+            Funcionario.nome,
+            Funcionario.funcao,
+            func.count(OS.id_os).label("total_os"),
+            *colunas_status,
+            _soma_se(ativa, OS.total_servicos + OS.total_pecas).label("receita"),
+            _soma_se(em_aberto, OS.total_servicos + OS.total_pecas).label("backlog_valor"),
+            _soma_se(ativa, OS.saldo).label("saldo_a_receber"),
+            func.min(case((em_aberto, OS.data_abertura))).label("backlog_mais_antigo"),
+        )
+        .outerjoin(OS, juncao)
+        .group_by(Funcionario.id_funcionario, Funcionario.nome, Funcionario.funcao)
+        .order_by(Funcionario.nome)
+    )
+    resultado = []
+    for r in db.execute(q):
+        por_status = {s.value: int(getattr(r, s.value)) for s in StatusOS}
+        mais_antigo = r.backlog_mais_antigo
+        if isinstance(mais_antigo, str):  # SQLite devolve texto em agregados de datetime
+            mais_antigo = datetime.fromisoformat(mais_antigo)
+        resultado.append({
+            "id_funcionario": r.id_funcionario,
+            "nome": r.nome,
+            "funcao": r.funcao,
+            "total_os": r.total_os,
+            "por_status": por_status,
+            "backlog_qtd": por_status[StatusOS.aberto.value] + por_status[StatusOS.em_execucao.value],
+            "backlog_valor": str(r.backlog_valor),
+            "backlog_mais_antigo": mais_antigo.isoformat() if mais_antigo else None,
+            "receita": str(r.receita),
+            "saldo_a_receber": str(r.saldo_a_receber),
+        })
+    return resultado
+
+
+def agenda_por_dia(db, inicio, dias=DIAS_AGENDA):
+    fim = inicio + timedelta(days=dias)
+    dia = func.date(Agendamento.data_hora)
+    linhas = db.execute(
+        select(dia.label("dia"), Agendamento.status, func.count().label("qtd"))
+        .where(Agendamento.data_hora >= inicio, Agendamento.data_hora < fim)
+        .group_by(dia, Agendamento.status)
+    ).all()
+
+    # todos os dias do intervalo aparecem, mesmo sem agendamento
+    por_dia = {
+        (inicio + timedelta(days=n)).isoformat(): {s.value: 0 for s in StatusAgendamento}
+        for n in range(dias)
+    }
+    for r in linhas:
+        por_dia[str(r.dia)[:10]][r.status.value] = r.qtd
+    return [
+        {"dia": d, "total": sum(c.values()), "por_status": c}
+        for d, c in por_dia.items()
+    ]
+
+
+def dados_carga_trabalho(db, inicio=None, fim=None, agenda_inicio=None, agenda_dias=DIAS_AGENDA):
+    agenda_inicio = agenda_inicio or date.today()
+
+    def calcular():
+        return {
+            "gerado_em": datetime.now().isoformat(),
+            "periodo": {
+                "inicio": inicio.isoformat() if inicio else None,
+                "fim": fim.isoformat() if fim else None,
+            },
+            "funcionarios": carga_por_funcionario(db, inicio, fim),
+            "agenda": agenda_por_dia(db, agenda_inicio, agenda_dias),
+        }
+
+    # cada oficina tem o seu resultado (as consultas já saem filtradas por ela)
+    return cache.obter((oficina_atual.get(), inicio, fim, agenda_inicio, agenda_dias), calcular)
+
+
+# -------- invalidação: escritas via ORM em OS/Agendamento --------
+@event.listens_for(Session, "after_flush")
+def _marcar_alteracao(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (OS, Agendamento)):
+            session.info[_CHAVE_SUJO] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_no_commit(session):
+    if session.info.pop(_CHAVE_SUJO, False):
+        cache.invalidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_marca(session):
+    session.info.pop(_CHAVE_SUJO, None)
@@ -0,0 +1,513 @@
+# back-end/consultas.py
+"""
+Consultas de leitura usadas pelas rotas.
+
+Cada função recebe uma Session e devolve dados prontos para jsonify, sem depender
+do Flask. Assim a mesma consulta serve a API síncrona (app.py), a assíncrona
+(app_async.py, via AsyncSession.run_sync) e quem mais precisar.
+Funções de detalhe devolvem None quando o registro principal não existe.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, case, or_
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+
+from models import (
+    Cliente, Veiculo, Funcionario, Servico, Peca,
+    OS, ItemPeca, ItemServico,
+    Agendamento, Fornecedor, MovimentoEstoque, StatusOS,
+)
+
+# -------- Listagens --------
+# Sem `limite` cada listagem devolve a lista inteira (bootstrap, eventos, jobs).
+# Com `limite` devolve uma página {"itens", "offset", "limite", "total"} para as
+# tabelas virtuais do front; `termo` filtra no servidor (ILIKE nas colunas da
+# listagem, coberto pelos índices trigram do busca.py no Postgres). O total só é
+# contado na primeira página (offset 0): as seguintes não repetem o COUNT.
+LIMITE_PAGINA = 500
+
+def _listar(q, serializar, termo=None, colunas=(), limite=None, offset=0):
+    termo = (termo or "").strip()
+    if termo:
+        q = q.filter(or_(*[c.icontains(termo, autoescape=True) for c in colunas]))
+    if limite is None:
+        return [serializar(r) for r in q.all()]
+    limite = max(1, min(int(limite), LIMITE_PAGINA))
+    offset = max(0, int(offset or 0))
+    return {
+        "itens": [serializar(r) for r in q.limit(limite).offset(offset).all()],
+        "offset": offset,
+        "limite": limite,
+        "total": q.order_by(None).count() if offset == 0 else None,
+    }
+
+def _peca(p):
+    return {
+        "id_peca": p.id_peca, "sku": p.sku, "descricao": p.descricao,
+        "origem": p.origem.value, "estoque_atual": p.estoque_atual
+    }
+
+def dados_pecas(db, ids=None, termo=None, limite=None, offset=0):
+    q = db.query(Peca)
+    if ids is not None:
+        q = q.filter(Peca.id_peca.in_(ids))
+    q = q.order_by(Peca.descricao, Peca.id_peca)
+    return _listar(q, _peca, termo, (Peca.sku, Peca.descricao), limite, offset)
+
+def dados_funcionarios(db, termo=None, limite=None, offset=0):
+    q = db.query(Funcionario).order_by(Funcionario.nome, Funcionario.id_funcionario)
+    return _listar(
+        q, lambda f: {"id_funcionario": f.id_funcionario, "nome": f.nome, "funcao": f.funcao},
+        termo, (Funcionario.nome, Funcionario.funcao), limite, offset,
+    )
+
+def _cliente(c):
+    return {
+        "id_cliente": c.id_cliente,
+        "nome_razao": c.nome_razao,
+        "cpf_cnpj": c.cpf_cnpj,
+        "telefone": c.telefone,
+        "email": c.email
+    }
+
+def dados_clientes(db, termo=None, limite=None, offset=0):
+    q = db.query(Cliente).order_by(Cliente.nome_razao, Cliente.id_cliente)
+    return _listar(q, _cliente, termo,
+                   (Cliente.nome_razao, Cliente.cpf_cnpj, Cliente.telefone, Cliente.email), limite, offset)
+
+def _veiculo(v):
+    return {
+        "id_veiculo": v.id_veiculo, "placa": v.placa, "marca": v.marca, "modelo": v.modelo,
+        "cliente": {"id": v.cliente.id_cliente, "nome": v.cliente.nome_razao}
+    }
+
+def dados_veiculos(db, termo=None, limite=None, offset=0):
+    # JOIN + contains_eager: um SELECT só (sem um por cliente) e o filtro pode usar o nome do cliente
+    q = (
+        db.query(Veiculo)
+        .join(Veiculo.cliente)
+        .options(contains_eager(Veiculo.cliente))
+        .order_by(Veiculo.placa, Veiculo.id_veiculo)
+    )
+    return _listar(q, _veiculo, termo,
+                   (Veiculo.placa, Veiculo.marca, Veiculo.modelo, Cliente.nome_razao), limite, offset)
+
+def dados_servicos(db, termo=None, limite=None, offset=0):
+    q = db.query(Servico).order_by(Servico.descricao, Servico.id_servico)
+    return _listar(
+        q, lambda s: {"id_servico": s.id_servico, "descricao": s.descricao, "preco_padrao": str(s.preco_padrao or 0)},
+        termo, (Servico.descricao,), limite, offset,
+    )
+
+def _agendamento(a):
+    return {
+        "id_agendamento": a.id_agendamento,
+        "data_hora": a.data_hora.isoformat() if a.data_hora else None,
+        "status": a.status.value,
+        "cliente": a.cliente.nome_razao if a.cliente else "",
+        "veiculo": f"{a.veiculo.placa} — {a.veiculo.marca} {a.veiculo.modelo}" if a.veiculo else "",
+        "servico": a.servico.descricao if a.servico else "",
+    }
+
+def dados_agendamentos(db, ids=None, termo=None, limite=None, offset=0):
+    q = (
+        db.query(Agendamento)
+        .outerjoin(Agendamento.cliente)
+        .outerjoin(Agendamento.veiculo)
+        .outerjoin(Agendamento.servico)
+        .options(
+            contains_eager(Agendamento.cliente),
+            contains_eager(Agendamento.veiculo),
+            contains_eager(Agendamento.servico),
+        )
+    )
+    if ids is not None:
+        q = q.filter(Agendamento.id_agendamento.in_(ids))
+    q = q.order_by(Agendamento.data_hora.desc(), Agendamento.id_agendamento.desc())
+    return _listar(q, _agendamento, termo,
+                   (Cliente.nome_razao, Veiculo.placa, Veiculo.modelo, Servico.descricao), limite, offset)
+
+def dados_fornecedores(db, termo=None, limite=None, offset=0):
+    q = db.query(Fornecedor).order_by(Fornecedor.nome_razao, Fornecedor.id_fornecedor)
+    return _listar(
+        q, lambda f: {"id_fornecedor": f.id_fornecedor, "nome_razao": f.nome_razao, "cpf_cnpj": f.cpf_cnpj},
+        termo, (Fornecedor.nome_razao, Fornecedor.cpf_cnpj), limite, offset,
+    )
+
+def _movimento(m):
+    return {
+        "id_movimento": m.id_movimento,
+        "data": m.data.isoformat(),
+        "tipo": m.tipo.value,
+        "origem": m.origem,
+        "qtd": m.qtd,
+        "custo_unitario": str(m.custo_unitario) if m.custo_unitario is not None else None,
+        "id_os": m.id_os,
+        "peca": {
+            "id_peca": m.peca.id_peca,
+            "descricao": m.peca.descricao
+        }
+    }
+
+def dados_movimentos(db, os_id=None, peca_id=None, ids=None, termo=None, limite=None, offset=0):
+    q = (
+        db.query(MovimentoEstoque)
+        .join(MovimentoEstoque.peca)
+        .options(contains_eager(MovimentoEstoque.peca))
+        .order_by(MovimentoEstoque.data.desc(), MovimentoEstoque.id_movimento.desc())
+    )
+    if os_id:
+        q = q.filter(MovimentoEstoque.id_os == os_id)
+    if peca_id:
+        q = q.filter(MovimentoEstoque.id_peca == peca_id)
+    if ids is not None:
+        q = q.filter(MovimentoEstoque.id_movimento.in_(ids))
+    return _listar(q, _movimento, termo,
+                   (Peca.descricao, Peca.sku, MovimentoEstoque.origem), limite, offset)
+
+
+# -------- (3.1) Peças danificadas por veículo + origem --------
+def dados_pecas_danificadas(db, veiculo_id):
+    # Busca dados do veículo e cliente
+    veiculo = db.get(Veiculo, veiculo_id)
+    if not veiculo:
+        return None
+
+    cliente = db.get(Cliente, veiculo.id_cliente) if veiculo.id_cliente else None
+
+    # Une OS -> ItemPeca -> Peca; agrupa por peça/origem e soma qtd
+    q = (
+        db.query(
+            Peca.id_peca, Peca.descricao, Peca.origem, func.sum(ItemPeca.qtd).label("qtd_total")
+        )
+        .join(ItemPeca, ItemPeca.id_peca == Peca.id_peca)
+        .join(OS, OS.id_os == ItemPeca.id_os)
+        .filter(OS.id_veiculo == veiculo_id)
+        .group_by(Peca.id_peca, Peca.descricao, Peca.origem)
+        .order_by(Peca.descricao)
+    )
+    data = [{
+        "id_peca": r.id_peca,
+        "descricao": r.descricao,
+        "origem": r.origem.value,
+        "qtd_total": int(r.qtd_total)
+    } for r in q.all()]
+
+    return {
+        "veiculo_id": veiculo_id,
+        "veiculo": {
+            "placa": veiculo.placa,
+            "marca": veiculo.marca,
+            "modelo": veiculo.modelo
+        },
+        "cliente": {
+            "nome_razao": cliente.nome_razao if cliente else None,
+            "cpf_cnpj": cliente.cpf_cnpj if cliente else None,
+            "telefone": cliente.telefone if cliente else None,
+            "email": cliente.email if cliente else None
+        } if cliente else None,
+        "pecas_para_troca": data
+    }
+
+# -------- Ordem de serviço completa --------
+# selectinload: um SELECT por coleção em vez de um por OS
+OPCOES_OS_COMPLETA = (
+    joinedload(OS.responsavel),
+    selectinload(OS.itens_servico).joinedload(ItemServico.servico),
+    selectinload(OS.itens_peca).joinedload(ItemPeca.peca),
+    selectinload(OS.pagamentos),
+)
+
+def serializar_os(os):
+    """OS com itens e pagamentos; carregue com OPCOES_OS_COMPLETA para evitar N+1."""
+    return {
+        "id_os": os.id_os,
+        "status": os.status.value,
+        "problema_relatado": os.problema_relatado,
+        "km_entrada": os.km_entrada,
+        "responsavel": os.responsavel.nome,
+        "total_servicos": str(os.total_servicos),
+        "total_pecas": str(os.total_pecas),
+        "total_pago": str(os.total_pago),
+        "saldo": str(os.saldo),
+        "arquivada": os.arquivada,
+        "servicos": [
+            {
+                "descricao": item.servico.descricao,
+                "qtd": item.qtd,
+                "valor_unit": str(item.valor_unit or 0)
+            }
+            for item in os.itens_servico
+        ],
+        "pecas": [
+            {
+                "descricao": item.peca.descricao,
+                "origem": item.peca.origem.value,
+                "qtd": item.qtd,
+                "valor_unit": str(item.valor_unit or 0)
+            }
+            for item in os.itens_peca
+        ],
+        "pagamentos": [
+            {
+                "data": p.data.isoformat(),
+                "forma": p.forma,
+                "valor": str(p.valor)
+            }
+            for p in os.pagamentos
+        ]
+    }
+
+
+def dados_os(db, id_os):
+    os = db.query(OS).options(*OPCOES_OS_COMPLETA).filter(OS.id_os == id_os).first()
+    if not os:
+        return None
+    data = serializar_os(os)
+    data.update({
+        "id_veiculo": os.id_veiculo,
+        "id_responsavel": os.id_responsavel,
+        "data_abertura": os.data_abertura.isoformat() if os.data_abertura else None,
+    })
+    return data
+
+# -------- (3.3) Histórico de manutenção por veículo --------
+def dados_historico_veiculo(db, veiculo_id):
+    veic = db.get(Veiculo, veiculo_id)
+    if not veic:
+        return None
+
+    cliente = veic.cliente
+
+    ordens = (
+        db.query(OS)
+        .options(*OPCOES_OS_COMPLETA)
+        .filter(OS.id_veiculo == veiculo_id)
+        .order_by(OS.id_os.desc())
+        .all()
+    )
+
+    lista_os = [serializar_os(os) for os in ordens]
+
+    return {
+        "veiculo": {
+            "placa": veic.placa,
+            "marca": veic.marca,
+            "modelo": veic.modelo,
+        },
+        "cliente": {
+            "nome": cliente.nome_razao,
+            "cpf_cnpj": cliente.cpf_cnpj,
+            "telefone": cliente.telefone,
+            "email": cliente.email
+        },
+        "ordens": lista_os
+    }
+
+# -------- Reports --------
+def dados_customer_lifetime_value(db, cliente_id=None):
+    # Aggregate payments per cliente from the denormalized OS.total_pago (Veiculo -> OS).
+    # Pagamento rows of closed periods may already be archived (particionamento.py), and
+    # this keeps the scan on the OS table instead of the whole payment history.
+    pagos_por_cliente = (
+        db.query(
+            Veiculo.id_cliente.label('id_cliente'),
+            func.sum(OS.total_pago).label('total_pago')
+        )
+        .join(OS, OS.id_veiculo == Veiculo.id_veiculo)
+        .group_by(Veiculo.id_cliente)
+        .subquery()
+    )
+
+    q = (
+        db.query(
+            Cliente.id_cliente,
+            Cliente.nome_razao,
+            func.coalesce(pagos_por_cliente.c.total_pago, 0).label('total_pago')
+        )
+        .outerjoin(pagos_por_cliente, pagos_por_cliente.c.id_cliente == Cliente.id_cliente)
+    )
+
+    if cliente_id:
+        q = q.filter(Cliente.id_cliente == cliente_id)
+
+    q = q.order_by(func.coalesce(pagos_por_cliente.c.total_pago, 0).desc())
+
+    rows = q.all()
+    return [{
+        'id_cliente': r.id_cliente,
+        'nome_razao': r.nome_razao,
+        'total_pago': str(r.total_pago)
+    } for r in rows]
+
+
+def dados_top_services_by_revenue(db):
+    q = (
+        db.query(
+            Servico.id_servico,
+            Servico.descricao,
+            func.coalesce(func.sum(ItemServico.valor_unit * ItemServico.qtd), 0).label('receita')
+        )
+        .join(ItemServico, ItemServico.id_servico == Servico.id_servico)
+        .group_by(Servico.id_servico, Servico.descricao)
+        .order_by(func.coalesce(func.sum(ItemServico.valor_unit * ItemServico.qtd), 0).desc())
+    )
+    rows = q.all()
+    return [{
+        'id_servico': r.id_servico,
+        'descricao': r.descricao,
+        'receita': str(r.receita)
+    } for r in rows]
+
+
+def dados_parts_usage_frequency(db):
+    q = (
+        db.query(
+            Peca.id_peca,
+            Peca.sku,
+            Peca.descricao,
+            func.coalesce(func.sum(ItemPeca.qtd), 0).label('total_qtd'),
+            func.count(func.distinct(ItemPeca.id_os)).label('vezes_usada')
+        )
+        .outerjoin(ItemPeca, ItemPeca.id_peca == Peca.id_peca)
+        .group_by(Peca.id_peca, Peca.sku, Peca.descricao)
+        .order_by(func.coalesce(func.sum(ItemPeca.qtd), 0).desc())
+    )
+    rows = q.all()
+    return [{
+        'id_peca': r.id_peca,
+        'sku': r.sku,
+        'descricao': r.descricao,
+        'total_qtd': int(r.total_qtd) if r.total_qtd is not None else 0,
+        'vezes_usada': int(r.vezes_usada) if r.vezes_usada is not None else 0
+    } for r in rows]
+
+
+# -------- Contas a receber (saldo em aberto por OS / por cliente) --------
+FAIXAS_ATRASO = ("0-30", "31-60", "60+")
+
+
+def dados_contas_a_receber(db, agrupar="os", pagina=1, por_pagina=50, cliente_id=None, data_base=None):
+    """
+    Saldos em aberto a partir dos totais mantidos em OS (totais_os.py), sem somar
+    itens e pagamentos a cada consulta. As faixas de atraso usam data_abertura.
+
+    "total" (OS ou clientes no resultado) vem da própria página (count() OVER);
+    numa página além da última, que volta vazia, é contado à parte.
+    """
+    data_base = data_base or datetime.now()
+    pagina = max(1, pagina)
+    por_pagina = max(1, min(por_pagina, 500))
+
+    # limites das faixas calculados aqui: a comparação fica portátil e usa o índice
+    limite_30 = data_base - timedelta(days=30)
+    limite_60 = data_base - timedelta(days=60)
+    faixa = case(
+        (OS.data_abertura >= limite_30, "0-30"),
+        (OS.data_abertura >= limite_60, "31-60"),
+        else_="60+",
+    )
+    faturado = OS.total_servicos + OS.total_pecas
+
+    filtros = [OS.saldo > 0, OS.status != StatusOS.cancelado]
+    if cliente_id:
+        filtros.append(Veiculo.id_cliente == cliente_id)
+
+    base = (
+        select()
+        .select_from(OS)
+        .join(Veiculo, Veiculo.id_veiculo == OS.id_veiculo)
+        .join(Cliente, Cliente.id_cliente == Veiculo.id_cliente)
+        .where(*filtros)
+    )
+
+    # resumo geral por faixa (um GROUP BY sobre o índice parcial)
+    # (agrupa pela coluna da subquery: o CASE tem parâmetros e o Postgres não casaria
+    # o GROUP BY com a expressão do SELECT)
+    por_faixa = base.add_columns(faixa.label("faixa"), OS.saldo).subquery()
+    resumo = {f: "0.00" for f in FAIXAS_ATRASO}
+    for r in db.execute(
+        select(por_faixa.c.faixa, func.sum(por_faixa.c.saldo).label("saldo")).group_by(por_faixa.c.faixa)
+    ):
+        resumo[r.faixa] = str(r.saldo)
+
+    if agrupar == "cliente":
+        saldo_faixa = lambda f: func.sum(case((faixa == f, OS.saldo), else_=0))
+        stmt = (
+            base.add_columns(
+                Cliente.id_cliente, Cliente.nome_razao,
+                func.count(OS.id_os).label("qtd_os"),
+                func.sum(faturado).label("faturado"),
+                func.sum(OS.total_pago).label("pago"),
+                func.sum(OS.saldo).label("saldo"),
+                saldo_faixa("0-30").label("faixa_0_30"),
+                saldo_faixa("31-60").label("faixa_31_60"),
+                saldo_faixa("60+").label("faixa_60_mais"),
+                func.min(OS.data_abertura).label("mais_antiga"),
+                # total de clientes no resultado, calculado junto (sem COUNT separado)
+                func.count().over().label("total_registros"),
+            )
+            .group_by(Cliente.id_cliente, Cliente.nome_razao)
+            .order_by(func.sum(OS.saldo).desc(), Cliente.id_cliente)
+        )
+        rows = db.execute(stmt.limit(por_pagina).offset((pagina - 1) * por_pagina)).all()
+        contar = base.add_columns(Cliente.id_cliente).distinct()
+        itens = [{
+            "id_cliente": r.id_cliente,
+            "nome_razao": r.nome_razao,
+            "qtd_os": r.qtd_os,
+            "faturado": str(r.faturado),
+            "pago": str(r.pago),
+            "saldo": str(r.saldo),
+            "faixas": {
+                "0-30": str(r.faixa_0_30),
+                "31-60": str(r.faixa_31_60),
+                "60+": str(r.faixa_60_mais),
+            },
+            "mais_antiga": r.mais_antiga.isoformat() if r.mais_antiga else None,
+        } for r in rows]
+    else:
+        stmt = (
+            base.add_columns(
+                OS.id_os, OS.status, OS.data_abertura,
+                faturado.label("faturado"), OS.total_pago, OS.saldo,
+                faixa.label("faixa"),
+                Veiculo.placa, Cliente.id_cliente, Cliente.nome_razao,
+                func.sum(OS.saldo).over(partition_by=Cliente.id_cliente).label("saldo_cliente"),
+                func.count().over().label("total_registros"),
+            )
+            .order_by(OS.data_abertura, OS.id_os)
+        )
+        rows = db.execute(stmt.limit(por_pagina).offset((pagina - 1) * por_pagina)).all()
+        contar = base.add_columns(OS.id_os)
+        itens = [{
+            "id_os": r.id_os,
+            "status": r.status.value,
+            "data_abertura": r.data_abertura.isoformat(),
+            "dias_em_aberto": (data_base - r.data_abertura).days,
+            "faixa": r.faixa,
+            "faturado": str(r.faturado),
+            "pago": str(r.total_pago),
+            "saldo": str(r.saldo),
+            "placa": r.placa,
+            "cliente": {"id": r.id_cliente, "nome": r.nome_razao},
+            "saldo_cliente": str(r.saldo_cliente),
+        } for r in rows]
+
+    if rows:
+        total = rows[0].total_registros
+    elif pagina == 1:
+        total = 0
+    else:  # o OFFSET passou do fim: o count() OVER não chega a nenhuma linha
+        total = db.execute(select(func.count()).select_from(contar.subquery())).scalar_one()
+
+    return {
+        "agrupar": "cliente" if agrupar == "cliente" else "os",
+        "data_base": data_base.isoformat(),
+        "pagina": pagina,
+        "por_pagina": por_pagina,
+        "total": total,
+        "resumo_faixas": resumo,
+        "itens": itens,
+    }
+
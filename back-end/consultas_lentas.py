@@ -0,0 +1,211 @@
+# back-end/consultas_lentas.py
+"""
+Registro de consultas lentas do engine (database.py).
+
+Listeners before/after_cursor_execute medem cada execução no cursor. Acima do
+limiar (limiar_ms) a consulta entra num buffer circular (deque) com:
+- o SQL normalizado (literais e listas de parâmetros viram "?"), que agrupa
+  execuções da mesma consulta com valores diferentes;
+- o formato dos parâmetros (nomes e tipos, nunca os valores);
+- a rota do Flask que disparou a consulta (ou a thread, fora de requisição);
+- o plano de execução, capturado numa thread separada nas primeiras
+  explain_primeiras ocorrências de cada SQL normalizado:
+  Postgres: EXPLAIN (ANALYZE, BUFFERS) para SELECT (executa a consulta de
+  novo) e EXPLAIN simples para o resto; SQLite: EXPLAIN QUERY PLAN.
+
+O tempo medido é o da execução no cursor; com stream_results a leitura das
+linhas fica de fora. Exposto em GET /api/debug/slow-queries (DELETE limpa),
+que mostram SQL e origem das consultas: as rotas só respondem com "token"
+configurado e informado em ?token= ou no cabeçalho X-Debug-Token (403 sem ele).
+Com "explain_analyze": true o Postgres reexecuta os SELECTs lentos para medir
+o plano real: carga extra no banco, por isso desligado por padrão.
+
+Configuração opcional em local_config.json (valores abaixo são os padrões):
+    "consultas_lentas": {"ativo": true, "token": null, "limiar_ms": 200, "max_registros": 200,
+                         "explain_primeiras": 3, "explain_analyze": false}
+"""
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+LIMIAR_MS = 200
+MAX_REGISTROS = 200
+EXPLAIN_PRIMEIRAS = 3
+MAX_RESUMO = 500  # SQLs normalizados distintos no resumo
+_OPCAO_IGNORAR = "consultas_lentas_ignorar"
+
+_ESPACOS = re.compile(r"\s+")
+_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+_MARCADOR = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)"
+_LISTA = re.compile(r"\(\s*" + _MARCADOR + r"(?:\s*,\s*" + _MARCADOR + r")+\s*\)")
+_VALUES = re.compile(r"(\(\?, \.\.\.\)|\(\?\))(?:\s*,\s*(?:\(\?, \.\.\.\)|\(\?\)))+")
+
+
+def normalizar(sql):
+    sql = _ESPACOS.sub(" ", sql).strip()
+    sql = _TEXTO.sub("?", sql)
+    sql = _NUMERO.sub("?", sql)
+    sql = _LISTA.sub("(?, ...)", sql)
+    return _VALUES.sub(r"\1, ...", sql)  # INSERT ... VALUES (...), (...), ... em lote
+
+
+def _tipos(valores, limite=30):
+    if isinstance(valores, dict):
+        itens = list(valores.items())
+        formato = {k: type(v).__name__ for k, v in itens[:limite]}
+        if len(itens) > limite:
+            formato["..."] = f"+{len(itens) - limite} parâmetros"
+        return formato
+    if isinstance(valores, (list, tuple)):
+        formato = [type(v).__name__ for v in valores[:limite]]
+        if len(valores) > limite:
+            formato.append(f"+{len(valores) - limite} parâmetros")
+        return formato
+    return type(valores).__name__
+
+
+def formato_parametros(parametros, executemany=False):
+    if executemany:
+        return {"executemany": len(parametros), "linha": _tipos(parametros[0]) if parametros else None}
+    return _tipos(parametros)
+
+
+def _origem():
+    if has_request_context():
+        return f"{request.method} {request.path} ({request.endpoint})"
+    return f"thread {threading.current_thread().name}"
+
+
+class RegistroConsultasLentas:
+    def __init__(self, limiar_ms=LIMIAR_MS, max_registros=MAX_REGISTROS,
+                 explain_primeiras=EXPLAIN_PRIMEIRAS, explain_analyze=False):
+        self.limiar_ms = limiar_ms
+        self.explain_primeiras = explain_primeiras
+        self.explain_analyze = explain_analyze
+        self._registros = deque(maxlen=max_registros)
+        self._resumo = {}  # sql normalizado -> contagem, tempos e planos
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+
+    # ---- listeners ----
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["consultas_lentas_inicio"] = time.perf_counter()
+
+    def _depois(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info.pop("consultas_lentas_inicio", None)
+        if inicio is None:
+            return
+        ms = (time.perf_counter() - inicio) * 1000
+        if ms < self.limiar_ms:
+            return
+        if context is not None and context.execution_options.get(_OPCAO_IGNORAR):
+            return
+        # o EXPLAIN roda no engine da própria conexão (o principal ou o de uma oficina roteada)
+        self.registrar(statement, parameters, executemany, ms, conn.engine)
+
+    def registrar(self, statement, parameters, executemany, ms, engine=None):
+        sql = normalizar(statement)
+        registro = {
+            "quando": datetime.now().isoformat(timespec="milliseconds"),
+            "duracao_ms": round(ms, 2),
+            "sql": sql,
+            "parametros": formato_parametros(parameters, executemany),
+            "origem": _origem(),
+        }
+        with self._lock:
+            self._registros.append(registro)
+            if sql not in self._resumo and len(self._resumo) >= MAX_RESUMO:
+                return  # resumo cheio: o registro individual ainda fica no buffer
+            resumo = self._resumo.setdefault(sql, {
+                "sql": sql, "ocorrencias": 0, "total_ms": 0.0, "max_ms": 0.0, "planos": [],
+            })
+            resumo["ocorrencias"] += 1
+            resumo["total_ms"] += ms
+            resumo["max_ms"] = max(resumo["max_ms"], ms)
+            capturar = not executemany and resumo["ocorrencias"] <= self.explain_primeiras
+        if capturar and engine is not None:
+            self._executor.submit(self._explain, engine, sql, statement, parameters, ms)
+
+    # ---- EXPLAIN em segundo plano ----
+    def _explain(self, engine, sql, statement, parameters, ms):
+        dialeto = engine.dialect.name
+        comando = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        if dialeto == "postgresql":
+            # ANALYZE executa a consulta: só para leituras
+            if self.explain_analyze and comando in ("SELECT", "WITH"):
+                prefixo = "EXPLAIN (ANALYZE, BUFFERS) "
+            else:
+                prefixo = "EXPLAIN "
+        elif dialeto == "sqlite":
+            prefixo = "EXPLAIN QUERY PLAN "
+        else:
+            return
+        plano = {"quando": datetime.now().isoformat(timespec="milliseconds"), "duracao_ms": round(ms, 2)}
+        try:
+            with engine.connect() as conn:
+                conn = conn.execution_options(**{_OPCAO_IGNORAR: True})
+                linhas = conn.exec_driver_sql(prefixo + statement, parameters or ()).all()
+                conn.rollback()
+            plano["plano"] = [" | ".join(str(c) for c in linha) for linha in linhas]
+        except Exception as e:
+            plano["erro"] = f"{type(e).__name__}: {e}"
+        with self._lock:
+            if sql in self._resumo:  # pode ter sido limpo enquanto o EXPLAIN rodava
+                self._resumo[sql]["planos"].append(plano)
+
+    # ---- consulta / limpeza ----
+    def dados(self):
+        with self._lock:
+            registros = list(reversed(self._registros))
+            resumo = sorted(
+                ({**r, "total_ms": round(r["total_ms"], 2), "max_ms": round(r["max_ms"], 2),
+                  "media_ms": round(r["total_ms"] / r["ocorrencias"], 2), "planos": list(r["planos"])}
+                 for r in self._resumo.values()),
+                key=lambda r: r["total_ms"], reverse=True,
+            )
+        return {"limiar_ms": self.limiar_ms, "registros": registros, "resumo": resumo}
+
+    def limpar(self):
+        with self._lock:
+            self._registros.clear()
+            self._resumo.clear()
+
+
+registro = None
+
+
+def instalar(config=None):
+    """Cria o registro do processo (None com "ativo": false); instrumentar(engine) liga os listeners."""
+    global registro
+    config = config or {}
+    if not config.get("ativo", True):
+        return None
+    if registro is None:
+        registro = RegistroConsultasLentas(
+            limiar_ms=float(config.get("limiar_ms", LIMIAR_MS)),
+            max_registros=int(config.get("max_registros", MAX_REGISTROS)),
+            explain_primeiras=int(config.get("explain_primeiras", EXPLAIN_PRIMEIRAS)),
+            explain_analyze=bool(config.get("explain_analyze", False)),
+        )
+    return registro
+
+
+def autorizado(config, informado):
+    """As rotas de diagnóstico exigem o "token" da seção; sem token configurado ficam fechadas."""
+    token = (config or {}).get("token")
+    return token is not None and informado == token
+
+
+def instrumentar(engine):
+    """Passa a medir as consultas de `engine` (chamado por database.ao_criar_engine)."""
+    if registro is None or event.contains(engine, "before_cursor_execute", registro._antes):
+        return
+    event.listen(engine, "before_cursor_execute", registro._antes)
+    event.listen(engine, "after_cursor_execute", registro._depois)
@@ -0,0 +1,73 @@
+# back-end/estoque.py
+"""
+Baixa de estoque das peças usadas numa OS.
+
+Cada linha de ItemPeca vira um MovimentoEstoque de saída e o Peca.estoque_atual
+é decrementado na mesma transação. O decremento é um UPDATE por peça distinta,
+com a checagem de saldo no próprio WHERE (estoque_atual >= qtd), executado em
+ordem crescente de id_peca: duas OS concorrentes sempre travam as linhas de
+Peca na mesma ordem, então uma espera a outra em vez de entrar em deadlock.
+Como é SQL direto, as peças e movimentos alterados são anotados em eventos.py.
+"""
+from collections import defaultdict
+
+from sqlalchemy import insert, select, update
+
+import eventos
+from models import Peca, MovimentoEstoque, TipoMovimento
+
+
+class EstoqueInsuficiente(Exception):
+    def __init__(self, id_peca, solicitado, disponivel):
+        super().__init__(
+            f"estoque insuficiente para a peça {id_peca}: "
+            f"solicitado {solicitado}, disponível {disponivel}"
+        )
+        self.id_peca = id_peca
+        self.solicitado = solicitado
+        self.disponivel = disponivel
+
+
+def consumir_pecas(db, id_os, linhas):
+    """
+    Dá baixa das linhas de peça de uma OS (dicts com id_peca e qtd), sem commit.
+    Levanta EstoqueInsuficiente na primeira peça sem saldo; quem chamou faz rollback.
+    Devolve {id_peca: quantidade baixada}.
+    """
+    por_peca = defaultdict(int)
+    for linha in linhas:
+        por_peca[linha["id_peca"]] += linha["qtd"]
+    if not por_peca:
+        return {}
+
+    for id_peca in sorted(por_peca):
+        qtd = por_peca[id_peca]
+        resultado = db.execute(
+            update(Peca)
+            .where(Peca.id_peca == id_peca, Peca.estoque_atual >= qtd)
+            .values(estoque_atual=Peca.estoque_atual - qtd)
+            .execution_options(synchronize_session=False)
+        )
+        if resultado.rowcount == 0:
+            disponivel = db.execute(
+                select(Peca.estoque_atual).where(Peca.id_peca == id_peca)
+            ).scalar()
+            raise EstoqueInsuficiente(id_peca, qtd, disponivel or 0)
+
+    # razão do estoque: uma saída por linha da OS, num único INSERT em lote
+    ids_movimentos = db.execute(insert(MovimentoEstoque).returning(MovimentoEstoque.id_movimento), [{
+        "id_peca": linha["id_peca"],
+        "id_os": id_os,
+        "tipo": TipoMovimento.saida,
+        "origem": f"OS #{id_os}",
+        "qtd": linha["qtd"],
+    } for linha in linhas]).scalars().all()
+    eventos.anotar(db, "pecas", por_peca)
+    eventos.anotar(db, "movimentos-estoque", ids_movimentos)
+
+    # Peca já carregadas na sessão passam a reler o estoque
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, Peca) and obj.id_peca in por_peca:
+            db.expire(obj, ["estoque_atual"])
+
+    return dict(por_peca)
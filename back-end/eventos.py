@@ -0,0 +1,372 @@
+# back-end/eventos.py
+"""
+Atualizações ao vivo (Server-Sent Events) de agendamentos, peças e movimentos.
+
+Em vez de o front reler /api/agendamentos e /api/pecas a cada tela, ele abre
+GET /api/eventos e recebe só o que mudou:
+
+    event: agendamentos
+    id: 3f9a1c2e-17
+    data: {"itens": [{...linha de /api/agendamentos...}], "removidos": [12]}
+
+Tipos: "agendamentos", "pecas" e "movimentos-estoque" (mesmo formato das
+listagens, com o nome do dataset do /api/bootstrap) e "recarregar" quando o
+cliente perdeu eventos e deve reler tudo.
+
+Como as mudanças são coletadas:
+- ORM: listeners de Session pegam Agendamento, Peca (nova ou com estoque_atual
+  alterado) e MovimentoEstoque novos a cada flush.
+- SQL direto (UPDATE/INSERT em lote, ex. estoque.py e importacao.py): quem
+  escreve chama anotar(db, tipo, ids) antes do commit.
+
+Como chegam a todos os processos:
+- Postgres: cada flush/anotar faz pg_notify(CANAL, ids) na própria transação,
+  então só vale o que for commitado. Uma thread por processo fica em LISTEN
+  numa conexão fora do pool e repassa para a Central local.
+- Outros bancos (SQLite): os ids ficam na sessão e vão para a Central do
+  próprio processo no after_commit (não há outros processos a avisar).
+
+A Central junta o que chega em JANELA_S, relê as linhas uma vez (não uma por
+cliente) e entrega a cada assinante. Cada mudança leva a oficina da linha
+(id_oficina): o cliente só recebe os eventos da oficina com que se conectou
+(/api/eventos?oficina=2, ver oficinas.py). Cliente lento com a fila cheia é
+desconectado; o EventSource reconecta com Last-Event-ID e recebe o que perdeu
+do histórico recente, ou "recarregar" se já não estiver lá.
+
+Cada cliente conectado prende uma thread do servidor enquanto a aba estiver
+aberta: com gunicorn use workers com threads (--threads) ou gevent (-k gevent),
+nunca o worker sync de uma thread só. Acima de max_assinantes por processo a
+conexão é recusada com 503 e o front segue com o cache por TTL.
+
+Configuração opcional em local_config.json:
+    "eventos": {"ativo": true, "max_assinantes": 8}
+"""
+import itertools
+import json
+import queue
+import select as _select
+import threading
+import time
+import uuid
+from collections import deque
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy import select as sa_select
+from sqlalchemy.orm import Session
+
+from consultas import dados_agendamentos, dados_movimentos, dados_pecas
+from database import oficina_corrente, usar_oficina
+from models import Agendamento, MovimentoEstoque, Peca
+
+CANAL = "mecanica_eventos"
+JANELA_S = 0.05          # junta rajadas de mudanças num evento só
+PING_S = 15              # comentário de keep-alive para proxies não fecharem a conexão
+MAX_FILA = 100           # eventos pendentes por cliente antes de desconectá-lo
+HISTORICO = 500          # eventos guardados para quem reconecta com Last-Event-ID
+MAX_ITENS_EVENTO = 500   # acima disso manda "recarregar" em vez da lista
+MAX_PAYLOAD = 7000       # NOTIFY aceita até 8000 bytes
+RECONECTAR_S = 5
+MAX_ASSINANTES = 8       # clientes SSE por processo; cada um prende uma thread do servidor
+
+_CHAVE_PENDENTES = "eventos_pendentes"
+
+# tipo -> função (db, ids) que devolve as linhas no formato da listagem e a chave de id
+CARREGADORES = {
+    "agendamentos": (lambda db, ids: dados_agendamentos(db, ids=ids), "id_agendamento"),
+    "pecas": (lambda db, ids: dados_pecas(db, ids=ids), "id_peca"),
+    "movimentos-estoque": (lambda db, ids: dados_movimentos(db, ids=ids), "id_movimento"),
+}
+
+
+class ErroEventos(Exception):
+    """Assinatura recusada; `status` é o código HTTP sugerido."""
+
+    def __init__(self, mensagem, status=503):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+class Assinante:
+    def __init__(self, oficina=None):
+        self.fila = queue.Queue(maxsize=MAX_FILA)
+        self.oficina = oficina   # None: recebe de todas
+        self.descartado = False
+
+    def recebe(self, oficina):
+        return oficina is None or self.oficina is None or oficina == self.oficina
+
+
+class Central:
+    """Distribui os eventos do processo para os clientes SSE conectados."""
+
+    def __init__(self, session_factory, max_assinantes=MAX_ASSINANTES):
+        self.session_factory = session_factory
+        self.max_assinantes = max_assinantes
+        self.boot = uuid.uuid4().hex[:8]   # ids de evento só valem dentro do mesmo processo
+        self._seq = itertools.count(1)
+        self._entrada = queue.Queue()
+        self._assinantes = set()
+        self._historico = deque(maxlen=HISTORICO)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # ---- entrada ----
+    def publicar(self, pendentes):
+        """pendentes: {(oficina, tipo): ids}. Não bloqueia: a leitura das linhas é feita na thread da Central."""
+        if pendentes:
+            self._entrada.put(pendentes)
+            self._iniciar()
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._laco, name="eventos", daemon=True)
+                self._thread.start()
+
+    def _laco(self):
+        while True:
+            juntos = {}
+            _juntar(juntos, self._entrada.get())
+            time.sleep(JANELA_S)
+            while True:
+                try:
+                    _juntar(juntos, self._entrada.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._distribuir(self._montar(juntos))
+            except Exception as e:  # banco indisponível: os clientes relêem tudo quando ele voltar
+                print(f"[eventos] falha ao montar eventos: {type(e).__name__}: {e}")
+                self._distribuir([(None, "recarregar", {"tipos": sorted({t for _, t in juntos})})])
+
+    def _montar(self, juntos):
+        eventos = []
+        for (oficina, tipo), ids in juntos.items():
+            if tipo not in CARREGADORES:
+                continue
+            if len(ids) > MAX_ITENS_EVENTO:
+                eventos.append((oficina, "recarregar", {"tipos": [tipo]}))
+                continue
+            carregar, chave = CARREGADORES[tipo]
+            # a sessão da oficina: banco da rota dela e linhas filtradas por id_oficina
+            with usar_oficina(oficina), self.session_factory() as db:
+                itens = carregar(db, sorted(ids))
+            encontrados = {item[chave] for item in itens}
+            eventos.append((oficina, tipo, {
+                "itens": itens,
+                "removidos": sorted(i for i in ids if i not in encontrados),
+            }))
+        return eventos
+
+    def _distribuir(self, eventos):
+        """eventos: (oficina ou None para todas, tipo, dados)."""
+        with self._lock:
+            for oficina, tipo, dados in eventos:
+                evento = (f"{self.boot}-{next(self._seq)}", tipo, json.dumps(dados, ensure_ascii=False), oficina)
+                self._historico.append(evento)
+                for assinante in list(self._assinantes):
+                    if not assinante.recebe(oficina):
+                        continue
+                    try:
+                        assinante.fila.put_nowait(evento)
+                    except queue.Full:
+                        assinante.descartado = True
+                        self._assinantes.discard(assinante)
+
+    # ---- assinantes ----
+    def assinar(self, ultimo_id=None, oficina=None):
+        """
+        Devolve (assinante, eventos a reenviar). Sem como reenviar, o primeiro é "recarregar".
+        ErroEventos (503) com max_assinantes já conectados.
+        """
+        assinante = Assinante(oficina)
+        with self._lock:
+            if len(self._assinantes) >= self.max_assinantes:
+                raise ErroEventos("limite de atualizações ao vivo atingido neste servidor")
+            self._assinantes.add(assinante)
+            if not ultimo_id:
+                return assinante, []
+            boot, _, seq = ultimo_id.partition("-")
+            historico = list(self._historico)
+        if boot == self.boot and seq.isdigit():
+            seq = int(seq)
+            perdidos = [e for e in historico if int(e[0].split("-")[1]) > seq and assinante.recebe(e[3])]
+            primeiro = int(historico[0][0].split("-")[1]) if historico else None
+            if primeiro is None or primeiro <= seq + 1:
+                return assinante, perdidos
+        return assinante, [(f"{self.boot}-0", "recarregar", json.dumps({"tipos": sorted(CARREGADORES)}))]
+
+    def cancelar(self, assinante):
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+    def conectados(self):
+        with self._lock:
+            return len(self._assinantes)
+
+
+def _juntar(destino, pendentes):
+    for tipo, ids in pendentes.items():
+        destino.setdefault(tipo, set()).update(ids)
+
+
+def formatar_sse(evento):
+    id_evento, tipo, dados = evento[:3]
+    return f"id: {id_evento}\nevent: {tipo}\ndata: {dados}\n\n"
+
+
+def fluxo(central, ultimo_id=None, oficina=None):
+    """
+    Assina já (ErroEventos se a Central estiver cheia, antes de a resposta começar)
+    e devolve o gerador do corpo text/event-stream (só eventos de `oficina`).
+    """
+    assinante, atrasados = central.assinar(ultimo_id, oficina)
+    return _corpo(central, assinante, atrasados)
+
+
+def _corpo(central, assinante, atrasados):
+    try:
+        yield f"retry: {RECONECTAR_S * 1000}\n\n"
+        for evento in atrasados:
+            yield formatar_sse(evento)
+        while not assinante.descartado:
+            try:
+                yield formatar_sse(assinante.fila.get(timeout=PING_S))
+            except queue.Empty:
+                yield ": ping\n\n"
+    finally:
+        central.cancelar(assinante)
+
+
+central = None
+
+
+# ---------------------------------------------------------------- coleta das mudanças
+def _postgres(session):
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def _notificar(conn, pendentes):
+    """pg_notify em pedaços que caibam no limite do NOTIFY."""
+    for (oficina, tipo), ids in pendentes.items():
+        ids = sorted(ids)
+        passo = max(1, MAX_PAYLOAD // 12)
+        for i in range(0, len(ids), passo):
+            payload = json.dumps({"oficina": oficina, "tipo": tipo, "ids": ids[i:i + passo]},
+                                 separators=(",", ":"))
+            conn.execute(sa_select(func.pg_notify(CANAL, payload)))
+
+
+def anotar(db, tipo, ids):
+    """Registra mudanças feitas por SQL direto; vale só se a transação de `db` for commitada."""
+    ids = {int(i) for i in ids if i is not None}
+    if not ids:
+        return
+    chave = (oficina_corrente(), tipo)  # SQL direto grava na oficina corrente (default de id_oficina)
+    if _postgres(db):
+        _notificar(db.connection(), {chave: ids})
+    else:
+        db.info.setdefault(_CHAVE_PENDENTES, {}).setdefault(chave, set()).update(ids)
+
+
+def _alterados(session):
+    pendentes = {}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        oficina = getattr(obj, "id_oficina", None)
+        if isinstance(obj, Agendamento):
+            pendentes.setdefault((oficina, "agendamentos"), set()).add(obj.id_agendamento)
+        elif isinstance(obj, Peca):
+            if obj in session.new or obj in session.deleted or inspect(obj).attrs.estoque_atual.history.has_changes():
+                pendentes.setdefault((oficina, "pecas"), set()).add(obj.id_peca)
+        elif isinstance(obj, MovimentoEstoque) and obj in session.new:
+            pendentes.setdefault((oficina, "movimentos-estoque"), set()).add(obj.id_movimento)
+            pendentes.setdefault((oficina, "pecas"), set()).add(obj.id_peca)
+    return pendentes
+
+
+@event.listens_for(Session, "after_flush")
+def _coletar(session, flush_context):
+    pendentes = _alterados(session)
+    if not pendentes:
+        return
+    if _postgres(session):
+        session.info[_CHAVE_PENDENTES + "_pg"] = pendentes
+    else:
+        destino = session.info.setdefault(_CHAVE_PENDENTES, {})
+        _juntar(destino, pendentes)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _notificar_flush(session, flush_context):
+    pendentes = session.info.pop(_CHAVE_PENDENTES + "_pg", None)
+    if pendentes:
+        _notificar(session.connection(), pendentes)
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_local(session):
+    pendentes = session.info.pop(_CHAVE_PENDENTES, None)
+    if pendentes and central is not None:
+        central.publicar(pendentes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_CHAVE_PENDENTES, None)
+    session.info.pop(_CHAVE_PENDENTES + "_pg", None)
+
+
+# ---------------------------------------------------------------- LISTEN (Postgres)
+def _escutar(engine, destino):
+    while True:
+        bruta = None
+        try:
+            bruta = engine.raw_connection()
+            bruta.detach()  # conexão dedicada: não ocupa vaga do pool
+            conexao = bruta.driver_connection
+            conexao.autocommit = True
+            conexao.cursor().execute(f"LISTEN {CANAL}")
+            while True:
+                if _select.select([conexao], [], [], PING_S) == ([], [], []):
+                    continue
+                conexao.poll()
+                pendentes = {}
+                while conexao.notifies:
+                    aviso = json.loads(conexao.notifies.pop(0).payload)
+                    pendentes.setdefault((aviso.get("oficina"), aviso["tipo"]), set()).update(aviso["ids"])
+                destino.publicar(pendentes)
+        except Exception as e:
+            print(f"[eventos] LISTEN interrompido ({type(e).__name__}: {e}); reconectando")
+            # o que mudou enquanto estava fora não vai chegar: clientes relêem tudo
+            destino._distribuir([(None, "recarregar", {"tipos": sorted(CARREGADORES)})])
+        finally:
+            if bruta is not None:
+                try:
+                    bruta.close()
+                except Exception:
+                    pass
+        time.sleep(RECONECTAR_S)
+
+
+def instalar(session_factory, config=None):
+    """Cria a Central do processo (None com "ativo": false). O LISTEN é ligado por escutar(engine)."""
+    global central
+    config = config or {}
+    if not config.get("ativo", True):
+        return None
+    if central is None:
+        central = Central(session_factory, config.get("max_assinantes", MAX_ASSINANTES))
+    return central
+
+
+_escutando = set()
+
+
+def escutar(engine):
+    """No Postgres, inicia a thread de LISTEN do engine para a Central (uma por engine)."""
+    if central is None or engine.dialect.name != "postgresql" or id(engine) in _escutando:
+        return
+    _escutando.add(id(engine))
+    threading.Thread(target=_escutar, args=(engine, central), name="eventos-listen",
+                     daemon=True).start()
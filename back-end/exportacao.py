@@ -0,0 +1,228 @@
+# back-end/exportacao.py
+"""
+Exportação em CSV (e Parquet, opcional) de movimentos de estoque, pagamentos
+e dos relatórios de /api/reports/*.
+
+As tabelas grandes são lidas com cursor do lado do servidor
+(stream_results + yield_per) e escritas em blocos de LOTE linhas: a memória
+fica constante qualquer que seja o tamanho da exportação. As linhas saem
+direto do SELECT do Core, sem montar objetos do ORM.
+
+- CSV: gerador de blocos de texto, para o Flask enviar como resposta em streaming.
+- Parquet: um row group por bloco, gravado num arquivo temporário (o rodapé do
+  Parquet só é escrito no fim). Requer pyarrow (requirements-export.txt).
+
+Os relatórios agregados são pequenos e vêm prontos das funções de consultas.py.
+As leituras pelo Core não passam pelo filtro de oficina da Session (oficinas.py):
+quem chama passa id_oficina nos filtros.
+"""
+import csv
+import io
+import os
+import tempfile
+
+from sqlalchemy import select, DateTime, Enum, Integer, Numeric
+
+from models import MovimentoEstoque, Pagamento, Peca
+import consultas
+
+# pyarrow só é importado no primeiro pedido de Parquet (~100 ms a menos para subir o app)
+pa = pq = None
+
+LOTE = 10_000
+FORMATOS = ("csv", "parquet")
+
+
+class ErroExportacao(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+def _select_movimentos(data_inicio=None, data_fim=None, id_peca=None, id_os=None, id_oficina=None):
+    q = (
+        select(
+            MovimentoEstoque.id_movimento,
+            MovimentoEstoque.data,
+            MovimentoEstoque.tipo,
+            MovimentoEstoque.origem,
+            MovimentoEstoque.qtd,
+            MovimentoEstoque.custo_unitario,
+            MovimentoEstoque.id_os,
+            MovimentoEstoque.id_peca,
+            Peca.sku,
+            Peca.descricao,
+        )
+        .join(Peca, Peca.id_peca == MovimentoEstoque.id_peca)
+        .order_by(MovimentoEstoque.id_movimento)
+    )
+    if data_inicio:
+        q = q.where(MovimentoEstoque.data >= data_inicio)
+    if data_fim:
+        q = q.where(MovimentoEstoque.data < data_fim)
+    if id_peca:
+        q = q.where(MovimentoEstoque.id_peca == id_peca)
+    if id_os:
+        q = q.where(MovimentoEstoque.id_os == id_os)
+    if id_oficina is not None:
+        q = q.where(MovimentoEstoque.id_oficina == id_oficina)
+    return q
+
+
+def _select_pagamentos(data_inicio=None, data_fim=None, id_os=None, id_oficina=None, **_):
+    q = select(
+        Pagamento.id_pagamento,
+        Pagamento.id_os,
+        Pagamento.data,
+        Pagamento.forma,
+        Pagamento.valor,
+    ).order_by(Pagamento.id_pagamento)
+    if data_inicio:
+        q = q.where(Pagamento.data >= data_inicio)
+    if data_fim:
+        q = q.where(Pagamento.data < data_fim)
+    if id_os:
+        q = q.where(Pagamento.id_os == id_os)
+    if id_oficina is not None:
+        q = q.where(Pagamento.id_oficina == id_oficina)
+    return q
+
+
+# nome -> função que monta o SELECT a partir dos filtros
+TABELAS = {
+    "movimentos-estoque": _select_movimentos,
+    "pagamentos": _select_pagamentos,
+}
+# nome -> função de consultas.py (lista de dicts)
+RELATORIOS = {
+    "customer-lifetime-value": consultas.dados_customer_lifetime_value,
+    "top-services-by-revenue": consultas.dados_top_services_by_revenue,
+    "parts-usage-frequency": consultas.dados_parts_usage_frequency,
+}
+
+
+def _colunas_enum(colunas):
+    # enums viram o valor ("saida"), o resto o csv/pyarrow já sabem escrever
+    return [i for i, c in enumerate(colunas) if isinstance(c.type, Enum)]
+
+
+def _blocos(engine, consulta, lote=LOTE):
+    """Gera (nomes das colunas, blocos de tuplas) a partir de um cursor do lado do servidor."""
+    conn = engine.connect().execution_options(stream_results=True, yield_per=lote)
+    try:
+        resultado = conn.execute(consulta)
+        nomes = list(resultado.keys())
+        enums = _colunas_enum(consulta.selected_columns)
+        yield nomes
+        for bloco in resultado.partitions():
+            if enums:
+                bloco = [list(linha) for linha in bloco]
+                for linha in bloco:
+                    for i in enums:
+                        if linha[i] is not None:
+                            linha[i] = linha[i].value
+            yield bloco
+    finally:
+        conn.close()
+
+
+def csv_tabela(engine, nome, lote=LOTE, **filtros):
+    """Gerador de pedaços de texto CSV da tabela `nome` (cabeçalho primeiro)."""
+    blocos = _blocos(engine, TABELAS[nome](**filtros), lote)
+    buf = io.StringIO()
+    escritor = csv.writer(buf, lineterminator="\n")
+    escritor.writerow(next(blocos))
+    for bloco in blocos:
+        escritor.writerows(bloco)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def csv_relatorio(db, nome):
+    linhas = RELATORIOS[nome](db)
+    buf = io.StringIO()
+    if linhas:
+        escritor = csv.DictWriter(buf, fieldnames=list(linhas[0]), lineterminator="\n")
+        escritor.writeheader()
+        escritor.writerows(linhas)
+    return buf.getvalue()
+
+
+def _tipo_arrow(coluna):
+    t = coluna.type
+    if isinstance(t, Integer):
+        return pa.int64()
+    if isinstance(t, Numeric):
+        return pa.decimal128(t.precision or 18, t.scale or 2)
+    if isinstance(t, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def parquet_disponivel():
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:  # Parquet é opcional
+            return False
+        pa, pq = pyarrow, pyarrow.parquet
+    return True
+
+
+def _exigir_pyarrow():
+    if not parquet_disponivel():
+        raise ErroExportacao("exportação Parquet indisponível: instale pyarrow", 501)
+
+
+def parquet_tabela(engine, nome, lote=LOTE, **filtros):
+    """Grava a tabela `nome` num arquivo Parquet temporário e devolve o caminho (quem chama apaga)."""
+    _exigir_pyarrow()
+    consulta = TABELAS[nome](**filtros)
+    esquema = pa.schema([(c.name, _tipo_arrow(c)) for c in consulta.selected_columns])
+    arquivo = tempfile.NamedTemporaryFile(suffix=".parquet", delete=False)
+    arquivo.close()
+    blocos = _blocos(engine, consulta, lote)
+    next(blocos)
+    try:
+        with pq.ParquetWriter(arquivo.name, esquema) as escritor:
+            for bloco in blocos:
+                colunas = list(zip(*bloco))
+                escritor.write_batch(pa.record_batch(
+                    [pa.array(col, type=campo.type) for col, campo in zip(colunas, esquema)],
+                    schema=esquema,
+                ))
+    except Exception:
+        os.remove(arquivo.name)
+        raise
+    return arquivo.name
+
+
+def ler_e_apagar(caminho, bloco=1 << 20):
+    """Envia o arquivo em pedaços e o apaga ao terminar (ou se o cliente desistir)."""
+    try:
+        with open(caminho, "rb") as f:
+            while pedaco := f.read(bloco):
+                yield pedaco
+    finally:
+        os.remove(caminho)
+
+
+def parquet_relatorio(db, nome):
+    _exigir_pyarrow()
+    buf = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist(RELATORIOS[nome](db)), buf)
+    return buf.getvalue()
+
+
+def validar(nome, formato):
+    if formato not in FORMATOS:
+        raise ErroExportacao(f"formato inválido: {formato!r} (use csv ou parquet)")
+    if nome not in TABELAS and nome not in RELATORIOS:
+        raise ErroExportacao(f"exportação desconhecida: {nome}", 404)
+    if formato == "parquet":
+        _exigir_pyarrow()
@@ -0,0 +1,204 @@
+# back-end/importacao.py
+"""
+Importação em massa do catálogo de peças / tabela de preços de fornecedor (CSV).
+
+O arquivo é lido linha a linha (csv.DictReader sobre o stream) e gravado em
+lotes de LOTE linhas válidas:
+    INSERT INTO peca ... ON CONFLICT (id_oficina, sku) DO UPDATE SET descricao, origem
+    INSERT INTO fornecedor_peca ... ON CONFLICT (id_fornecedor, id_peca) DO UPDATE SET preco_custo
+um executemany por tabela e por lote (Postgres e SQLite >= 3.35 têm a mesma
+sintaxe), com commit por lote. O estoque_atual do CSV só vale para peças novas:
+a tabela de preços nunca mexe no estoque de uma peça já cadastrada.
+
+Colunas (cabeçalho obrigatório, separador , ou ;):
+    sku*, descricao*, origem (nacional|importada), estoque_atual, preco_custo
+preco_custo aceita 12.50, 12,50 e 1.234,56; só é gravado com um fornecedor.
+
+Linhas inválidas não interrompem a importação: entram no relatório com o
+número da linha (a primeira linha de dados é a 2).
+
+    python importacao.py catalogo.csv --fornecedor 3 [--oficina 2]
+"""
+import argparse
+import csv
+import io
+import time
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import eventos
+from models import Peca, Fornecedor, OrigemPeca, fornecedor_peca
+
+LOTE = 1000
+MAX_ERROS_LISTADOS = 500
+INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+_peca = Peca.__table__
+_TAM_SKU = _peca.c.sku.type.length
+_TAM_DESCRICAO = _peca.c.descricao.type.length
+
+
+class ErroImportacao(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+def _decimal(texto):
+    texto = texto.strip()
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    v = Decimal(texto)
+    if v < 0 or not v.is_finite():
+        raise InvalidOperation
+    return v
+
+
+def validar_linha(linha):
+    """Dict do CSV -> (valores da peça, preco_custo). Levanta ValueError com a mensagem."""
+    sku = (linha.get("sku") or "").strip()
+    descricao = (linha.get("descricao") or "").strip()
+    if not sku:
+        raise ValueError("sku vazio")
+    if len(sku) > _TAM_SKU:
+        raise ValueError(f"sku com mais de {_TAM_SKU} caracteres")
+    if not descricao:
+        raise ValueError("descricao vazia")
+    if len(descricao) > _TAM_DESCRICAO:
+        raise ValueError(f"descricao com mais de {_TAM_DESCRICAO} caracteres")
+
+    origem = (linha.get("origem") or "nacional").strip().lower()
+    try:
+        origem = OrigemPeca(origem)
+    except ValueError:
+        raise ValueError(f"origem inválida: {origem!r}")
+
+    estoque = (linha.get("estoque_atual") or "").strip()
+    try:
+        estoque = int(estoque) if estoque else 0
+    except ValueError:
+        raise ValueError(f"estoque_atual inválido: {estoque!r}")
+    if estoque < 0:
+        raise ValueError("estoque_atual negativo")
+
+    preco = (linha.get("preco_custo") or "").strip()
+    try:
+        preco = _decimal(preco) if preco else None
+    except InvalidOperation:
+        raise ValueError(f"preco_custo inválido: {preco!r}")
+
+    return {"sku": sku, "descricao": descricao, "origem": origem, "estoque_atual": estoque}, preco
+
+
+def _gravar_lote(db, insert, pecas, id_fornecedor):
+    # o mesmo sku duas vezes no lote quebraria o ON CONFLICT: vale a última linha
+    por_sku = {}
+    for valores, preco in pecas:
+        por_sku[valores["sku"]] = (valores, preco)
+
+    stmt = insert(_peca)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_peca.c.id_oficina, _peca.c.sku],
+        set_={"descricao": stmt.excluded.descricao, "origem": stmt.excluded.origem},
+    ).returning(_peca.c.id_peca, _peca.c.sku)
+    ids = {sku: id_peca for id_peca, sku in db.execute(stmt, [v for v, _ in por_sku.values()])}
+
+    if id_fornecedor is not None:
+        vinculos = [
+            {"id_fornecedor": id_fornecedor, "id_peca": ids[sku], "preco_custo": preco}
+            for sku, (_, preco) in por_sku.items()
+        ]
+        stmt = insert(fornecedor_peca)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[fornecedor_peca.c.id_fornecedor, fornecedor_peca.c.id_peca],
+            set_={"preco_custo": stmt.excluded.preco_custo},
+        )
+        db.execute(stmt, vinculos)
+    eventos.anotar(db, "pecas", ids.values())
+    db.commit()
+    return len(por_sku)
+
+
+def _detectar_separador(arquivo):
+    cabecalho = arquivo.readline()
+    separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+    return cabecalho, separador
+
+
+def importar(db, arquivo, id_fornecedor=None, lote=LOTE):
+    """
+    Importa o CSV de `arquivo` (objeto texto) em lotes, com commit por lote.
+    Devolve o relatório: linhas lidas, gravadas, erros por linha e vazão.
+    """
+    dialeto = db.get_bind().dialect.name
+    if dialeto not in INSERTS:
+        raise ErroImportacao(f"importação não suportada no banco {dialeto}", 501)
+    insert = INSERTS[dialeto]
+
+    if id_fornecedor is not None:
+        if not db.execute(select(Fornecedor.id_fornecedor).where(Fornecedor.id_fornecedor == id_fornecedor)).first():
+            raise ErroImportacao("fornecedor não encontrado", 404)
+
+    cabecalho, separador = _detectar_separador(arquivo)
+    colunas = next(csv.reader([cabecalho], delimiter=separador), [])
+    colunas = [c.strip().lower() for c in colunas]
+    faltando = {"sku", "descricao"} - set(colunas)
+    if faltando:
+        raise ErroImportacao(f"cabeçalho sem as colunas: {', '.join(sorted(faltando))}")
+
+    inicio = time.perf_counter()
+    lidas = gravadas = total_erros = 0
+    erros = []
+    pendentes = []
+    for numero, linha in enumerate(csv.DictReader(arquivo, fieldnames=colunas, delimiter=separador), 2):
+        lidas += 1
+        try:
+            pendentes.append(validar_linha(linha))
+        except ValueError as e:
+            total_erros += 1
+            if len(erros) < MAX_ERROS_LISTADOS:
+                erros.append({"linha": numero, "sku": (linha.get("sku") or "").strip(), "erro": str(e)})
+            continue
+        if len(pendentes) >= lote:
+            gravadas += _gravar_lote(db, insert, pendentes, id_fornecedor)
+            pendentes = []
+    if pendentes:
+        gravadas += _gravar_lote(db, insert, pendentes, id_fornecedor)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "linhas_lidas": lidas,
+        "pecas_gravadas": gravadas,
+        "total_erros": total_erros,
+        "erros": erros,
+        "segundos": round(segundos, 3),
+        "linhas_por_segundo": round(lidas / segundos) if segundos else lidas,
+    }
+
+
+def abrir_texto(stream):
+    """Stream binário (arquivo enviado, request.stream) -> texto UTF-8, aceitando BOM do Excel."""
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+if __name__ == "__main__":
+    import json
+    from database import SessionLocal, oficina_corrente, usar_oficina
+
+    parser = argparse.ArgumentParser(description="Importa catálogo de peças / tabela de preços (CSV).")
+    parser.add_argument("arquivo")
+    parser.add_argument("--fornecedor", type=int, help="id_fornecedor da tabela de preços")
+    parser.add_argument("--lote", type=int, default=LOTE, help=f"linhas por lote (padrão {LOTE})")
+    parser.add_argument("--oficina", type=int, default=oficina_corrente(), help="id da oficina (padrão: a padrão)")
+    args = parser.parse_args()
+
+    with usar_oficina(args.oficina), SessionLocal() as db, open(args.arquivo, encoding="utf-8-sig", newline="") as f:
+        try:
+            relatorio = importar(db, f, args.fornecedor, args.lote)
+        except ErroImportacao as e:
+            raise SystemExit(f"[importacao.py] {e.mensagem}")
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
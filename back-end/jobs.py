@@ -0,0 +1,298 @@
+# back-end/jobs.py
+"""
+Relatórios pesados em segundo plano.
+
+Cada pedido vira uma linha na tabela job e roda num ProcessPoolExecutor, fora
+das threads que atendem o Flask. O worker marca o andamento na própria linha
+(pendente -> executando -> concluido/erro) e grava o resultado em JSON em
+DIR_RESULTADOS; a API só consulta a tabela e entrega o arquivo.
+
+Limites: MAX_PROCESSOS relatórios rodando ao mesmo tempo e no máximo
+MAX_PENDENTES esperando na fila; acima disso o pedido é recusado (429), para
+que relatórios não consumam todas as conexões do banco e a CPU do servidor.
+
+Cancelamento: um job pendente sai da fila na hora; um job já em execução é
+marcado como cancelado e o resultado é descartado quando o worker termina.
+
+Vários processos servidores (gunicorn -w N) dividem a tabela: cada job guarda
+o dono (host:pid:boot do processo que o enfileirou) e o dono renova o
+batimento dos seus jobs a cada BATIMENTO_S. Só jobs pendentes/executando sem
+batimento há ORFAO_S (o dono morreu ou reiniciou) são marcados como erro, na
+criação do pool e depois a cada batimento. MAX_PROCESSOS vale por processo
+(tamanho do pool); MAX_PENDENTES conta os pendentes na tabela, de todos os
+processos e oficinas.
+
+Cada job é da oficina que o pediu (Job.id_oficina): o worker roda o relatório
+com usar_oficina, então o resultado só tem os dados dela.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, inspect, or_, select, text, update
+
+from database import SessionLocal, descartar_herdado, get_engine, usar_oficina
+from models import Job, StatusJob
+import consultas
+import reposicao
+
+MAX_PROCESSOS = 2
+MAX_PENDENTES = 8
+BATIMENTO_S = 15
+ORFAO_S = 4 * BATIMENTO_S
+DIR_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados_jobs")
+
+# tipo -> (função(db, **parametros), {parâmetro: tipo})
+TIPOS = {
+    "customer-lifetime-value": (consultas.dados_customer_lifetime_value, {"cliente_id": int}),
+    "top-services-by-revenue": (consultas.dados_top_services_by_revenue, {}),
+    "parts-usage-frequency": (consultas.dados_parts_usage_frequency, {}),
+    "movimentos-estoque": (consultas.dados_movimentos, {"os_id": int, "peca_id": int}),
+    "contas-a-receber": (consultas.dados_contas_a_receber, {
+        "agrupar": str, "pagina": int, "por_pagina": int, "cliente_id": int,
+    }),
+    "reposicao": (reposicao.relatorio_direto, {"janela_dias": int, "somente_alertas": bool}),
+}
+STATUS_FINAIS = {StatusJob.concluido, StatusJob.erro, StatusJob.cancelado}
+STATUS_ATIVOS = [StatusJob.pendente, StatusJob.executando]
+
+
+class ErroJob(Exception):
+    """Pedido inválido ou recusado; `status` é o código HTTP sugerido."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+def _validar(tipo, parametros):
+    if tipo not in TIPOS:
+        raise ErroJob(f"tipo inválido: {tipo!r} (use {', '.join(sorted(TIPOS))})")
+    if not isinstance(parametros, dict):
+        raise ErroJob("parametros deve ser um objeto")
+    aceitos = TIPOS[tipo][1]
+    validos = {}
+    for nome, valor in parametros.items():
+        if nome not in aceitos:
+            raise ErroJob(f"parâmetro não aceito por {tipo}: {nome}")
+        if valor is None:
+            continue
+        conv = aceitos[nome]
+        if conv is bool and not isinstance(valor, bool):
+            raise ErroJob(f"{nome} deve ser true/false")
+        try:
+            validos[nome] = conv(valor)
+        except (TypeError, ValueError):
+            raise ErroJob(f"{nome} inválido")
+    return validos
+
+
+def serializar_job(job):
+    return {
+        "id_job": job.id_job,
+        "tipo": job.tipo,
+        "parametros": json.loads(job.parametros or "{}"),
+        "status": job.status.value,
+        "criado_em": job.criado_em.isoformat() if job.criado_em else None,
+        "iniciado_em": job.iniciado_em.isoformat() if job.iniciado_em else None,
+        "finalizado_em": job.finalizado_em.isoformat() if job.finalizado_em else None,
+        "erro": job.erro,
+        "resultado": f"/api/jobs/{job.id_job}/resultado" if job.status == StatusJob.concluido else None,
+    }
+
+
+# ---------------- processo worker ----------------
+def _inicializar_worker():
+    # conexões herdadas do processo pai (fork) não podem ser usadas aqui
+    descartar_herdado()
+
+
+def _transicao(db, id_job, de, para, **valores):
+    """UPDATE condicional do status; False se outro lado (ex.: cancelamento) mudou antes."""
+    feito = db.execute(
+        update(Job)
+        .where(Job.id_job == id_job, Job.status == de)
+        .values(status=para, **valores)
+    ).rowcount == 1
+    db.commit()
+    return feito
+
+
+def _json_padrao(valor):
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"{type(valor).__name__} não serializável")
+
+
+def _executar(id_job, tipo, parametros, id_oficina=None):
+    """Roda no processo filho."""
+    with usar_oficina(id_oficina), SessionLocal() as db:
+        if not _transicao(db, id_job, StatusJob.pendente, StatusJob.executando,
+                          iniciado_em=datetime.now()):
+            return  # cancelado enquanto esperava
+        try:
+            resultado = TIPOS[tipo][0](db, **parametros)
+            db.rollback()  # só leitura: libera a conexão antes de escrever o arquivo
+
+            os.makedirs(DIR_RESULTADOS, exist_ok=True)
+            caminho = os.path.join(DIR_RESULTADOS, f"job-{id_job}.json")
+            with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(resultado, f, ensure_ascii=False, default=_json_padrao)
+            os.replace(caminho + ".tmp", caminho)
+
+            if not _transicao(db, id_job, StatusJob.executando, StatusJob.concluido,
+                              finalizado_em=datetime.now(), arquivo=caminho):
+                os.remove(caminho)  # cancelado durante a execução
+        except Exception as e:
+            db.rollback()
+            _transicao(db, id_job, StatusJob.executando, StatusJob.erro,
+                       finalizado_em=datetime.now(), erro=f"{type(e).__name__}: {e}")
+
+
+# ---------------- processo servidor ----------------
+_lock = threading.Lock()
+_pool = None
+_ativos = {}  # id_job -> Future (pendentes e em execução neste processo)
+_identidade = None  # (pid, dono)
+
+
+def _dono():
+    """host:pid:boot deste processo (recalculado depois de um fork)."""
+    global _identidade
+    if _identidade is None or _identidade[0] != os.getpid():
+        _identidade = (os.getpid(), f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}")
+    return _identidade[1]
+
+
+def _garantir_colunas(engine):
+    # bancos criados antes do dono/batimento: as colunas vêm do models.py só em create_all
+    existentes = {c["name"] for c in inspect(engine).get_columns(Job.__tablename__)}
+    with engine.begin() as conn:
+        for coluna in (Job.__table__.c.dono, Job.__table__.c.batimento):
+            if coluna.name not in existentes:
+                conn.execute(text(f"ALTER TABLE {Job.__tablename__} ADD COLUMN {coluna.name} "
+                                  f"{coluna.type.compile(dialect=engine.dialect)}"))
+
+
+def recuperar_orfaos(db, agora=None):
+    """Marca como erro os jobs ativos cujo dono parou de dar sinal; devolve quantos."""
+    agora = agora or datetime.now()
+    return db.execute(
+        update(Job)
+        .where(Job.status.in_(STATUS_ATIVOS),
+               or_(Job.batimento.is_(None), Job.batimento < agora - timedelta(seconds=ORFAO_S)))
+        .values(status=StatusJob.erro, finalizado_em=agora,
+                erro="interrompido: o processo que rodava o job parou")
+        .execution_options(todas_as_oficinas=True, synchronize_session=False)
+    ).rowcount
+
+
+def _bater(db):
+    db.execute(
+        update(Job).where(Job.dono == _dono(), Job.status.in_(STATUS_ATIVOS))
+        .values(batimento=datetime.now())
+        .execution_options(todas_as_oficinas=True, synchronize_session=False)
+    )
+    recuperar_orfaos(db)
+    db.commit()
+
+
+def _laco_batimento():
+    while True:
+        time.sleep(BATIMENTO_S)
+        try:
+            with usar_oficina(None), SessionLocal() as db:
+                _bater(db)
+        except Exception as e:  # banco fora do ar não derruba o app; tenta no próximo batimento
+            print(f"[jobs] falha no batimento: {type(e).__name__}: {e}")
+
+
+def _obter_pool():
+    global _pool
+    if _pool is None:
+        _garantir_colunas(get_engine())
+        with usar_oficina(None), SessionLocal() as db:
+            recuperar_orfaos(db)
+            db.commit()
+        _pool = ProcessPoolExecutor(max_workers=MAX_PROCESSOS, initializer=_inicializar_worker)
+        threading.Thread(target=_laco_batimento, name="jobs-batimento", daemon=True).start()
+    return _pool
+
+
+def pendentes(db):
+    """Jobs esperando na tabela (todos os processos e oficinas)."""
+    return db.execute(
+        select(func.count()).select_from(Job).where(Job.status == StatusJob.pendente)
+        .execution_options(todas_as_oficinas=True)
+    ).scalar()
+
+
+def _ao_terminar(id_job, id_oficina):
+    def callback(futuro):
+        with _lock:
+            _ativos.pop(id_job, None)
+        if not futuro.cancelled() and futuro.exception() is not None:
+            # o worker morreu (ex.: pool quebrado) sem conseguir registrar o erro
+            with usar_oficina(id_oficina), SessionLocal() as db:
+                for de in (StatusJob.pendente, StatusJob.executando):
+                    _transicao(db, id_job, de, StatusJob.erro, finalizado_em=datetime.now(),
+                               erro=f"falha no worker: {futuro.exception()}")
+    return callback
+
+
+def submeter(db, tipo, parametros=None):
+    """Registra e enfileira um job. Faz commit: o worker precisa enxergar a linha."""
+    parametros = _validar(tipo, parametros or {})
+    with _lock:
+        pool = _obter_pool()
+        # contagem na tabela: vale para todos os processos (aproximada sob corrida entre eles)
+        if pendentes(db) >= MAX_PENDENTES:
+            raise ErroJob("fila de relatórios cheia, tente novamente em instantes", 429)
+        job = Job(tipo=tipo, parametros=json.dumps(parametros), dono=_dono(), batimento=datetime.now())
+        db.add(job)
+        db.commit()
+        futuro = pool.submit(_executar, job.id_job, tipo, parametros, job.id_oficina)
+        _ativos[job.id_job] = futuro
+    futuro.add_done_callback(_ao_terminar(job.id_job, job.id_oficina))
+    return job
+
+
+def obter(db, id_job):
+    job = db.get(Job, id_job)
+    if not job:
+        raise ErroJob("job não encontrado", 404)
+    return job
+
+
+def cancelar(db, id_job):
+    job = obter(db, id_job)
+    if job.status in STATUS_FINAIS:
+        raise ErroJob(f"job já está {job.status.value}", 409)
+    with _lock:
+        futuro = _ativos.get(id_job)
+    if futuro is not None:
+        futuro.cancel()  # só tem efeito se ainda não começou
+    for de in (StatusJob.pendente, StatusJob.executando):
+        if _transicao(db, id_job, de, StatusJob.cancelado, finalizado_em=datetime.now()):
+            break
+    db.refresh(job)
+    return job
+
+
+def listar(db, status=None, limite=50):
+    consulta = select(Job).order_by(Job.id_job.desc()).limit(limite)
+    if status:
+        try:
+            consulta = consulta.where(Job.status == StatusJob(status))
+        except ValueError:
+            raise ErroJob(f"status inválido: {status!r}")
+    return db.execute(consulta).scalars().all()
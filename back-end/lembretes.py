@@ -0,0 +1,382 @@
+# back-end/lembretes.py
+"""
+Lembretes de agendamento por e-mail/SMS com outbox transacional.
+
+POST /api/agendamentos grava, na mesma transação do agendamento, uma linha em
+`lembrete` por canal (Despachante.enfileirar): se o agendamento for desfeito o
+lembrete também é, e a requisição nunca fala com SMTP nem com o provedor de SMS.
+
+O despachante (despachar_lote, em laço por iniciar() ou `python lembretes.py`):
+1. reserva até `lote` lembretes vencidos com SELECT ... FOR UPDATE SKIP LOCKED
+   e adia a proxima_tentativa deles por RESERVA_S. Vários processos dividem a
+   fila sem pegar a mesma linha, e a reserva de um processo que morreu no meio
+   do envio vence sozinha (a linha volta para a fila);
+2. agrupa por canal e envia cada grupo de uma vez: uma conexão SMTP para todos
+   os e-mails, um POST para todos os SMS;
+3. marca enviado, ou agenda nova tentativa com backoff exponencial
+   (BACKOFF_S * 2^(tentativas-1), com jitter, até MAX_TENTATIVAS -> erro).
+Lembretes de agendamento cancelado viram "cancelado" sem envio.
+
+Configuração em local_config.json (sem ela nada é gravado):
+
+    "lembretes": {
+        "antecedencia_horas": 24,
+        "despachante": true,           # thread no processo do app (uma por engine)
+        "smtp": {"host": "localhost", "port": 1025, "remetente": "oficina@exemplo.com",
+                 "usuario": null, "senha": null, "starttls": false},
+        "sms": {"url": "https://provedor.exemplo/api/lote", "token": "..."}
+    }
+
+Só os canais configurados recebem lembretes (e-mail só para cliente com e-mail).
+
+    python lembretes.py                  # despachante em laço (cria a tabela se faltar)
+    python lembretes.py --uma-vez
+    python lembretes.py smtp-local       # SMTP de teste na porta 1025: imprime o que chega
+
+Vazão do despachante e custo no agendamento: python bench_lembretes.py
+"""
+import argparse
+import json
+import random
+import socketserver
+import smtplib
+import threading
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta
+from email import message_from_bytes
+from email.message import EmailMessage
+
+from sqlalchemy import bindparam, select, update
+
+from database import SessionLocal, usar_oficina
+from models import (
+    Agendamento, CanalLembrete, Cliente, Lembrete, Servico, StatusAgendamento,
+    StatusLembrete, Veiculo,
+)
+
+ANTECEDENCIA_H = 24
+LOTE = 200
+RESERVA_S = 300          # tempo para enviar um lote antes de a reserva vencer
+BACKOFF_S = 60
+MAX_BACKOFF_S = 6 * 3600
+MAX_TENTATIVAS = 6
+INTERVALO_S = 5          # espera do laço quando a fila esvazia
+
+
+# ---------------- provedores ----------------
+class ProvedorSMTP:
+    """Uma conexão SMTP por lote; falha de um destinatário não derruba os outros."""
+
+    def __init__(self, host="localhost", port=25, remetente="oficina@localhost",
+                 usuario=None, senha=None, starttls=False, timeout=10):
+        self.host, self.port, self.remetente = host, port, remetente
+        self.usuario, self.senha, self.starttls = usuario, senha, starttls
+        self.timeout = timeout
+
+    def enviar(self, mensagens, resultados):
+        """Preenche resultados[id] = None (enviado) ou o erro, à medida que envia."""
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.usuario:
+                smtp.login(self.usuario, self.senha)
+            for m in mensagens:
+                email = EmailMessage()
+                email["From"] = self.remetente
+                email["To"] = m["destino"]
+                email["Subject"] = m["assunto"] or "Lembrete"
+                email.set_content(m["mensagem"])
+                try:
+                    smtp.send_message(email)
+                    resultados[m["id_lembrete"]] = None
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                    resultados[m["id_lembrete"]] = f"{type(e).__name__}: {e}"
+
+
+class ProvedorSMS:
+    """POST do lote inteiro em JSON: {"mensagens": [{"id", "para", "texto"}]}; 2xx = todas aceitas."""
+
+    def __init__(self, url, token=None, timeout=10):
+        self.url, self.token, self.timeout = url, token, timeout
+
+    def enviar(self, mensagens, resultados):
+        corpo = json.dumps({"mensagens": [
+            {"id": m["id_lembrete"], "para": m["destino"], "texto": m["mensagem"]} for m in mensagens
+        ]}).encode()
+        pedido = urllib.request.Request(self.url, data=corpo, method="POST",
+                                        headers={"Content-Type": "application/json"})
+        if self.token:
+            pedido.add_header("Authorization", f"Bearer {self.token}")
+        with urllib.request.urlopen(pedido, timeout=self.timeout):
+            pass  # HTTPError (4xx/5xx) sobe e o lote inteiro volta com backoff
+        for m in mensagens:
+            resultados[m["id_lembrete"]] = None
+
+
+# ---------------- outbox + despachante ----------------
+class Despachante:
+    def __init__(self, provedores, antecedencia_horas=ANTECEDENCIA_H, lote=LOTE,
+                 max_tentativas=MAX_TENTATIVAS, backoff_s=BACKOFF_S):
+        self.provedores = provedores  # CanalLembrete -> provedor com enviar(mensagens, resultados)
+        self.antecedencia = timedelta(hours=antecedencia_horas)
+        self.lote = lote
+        self.max_tentativas = max_tentativas
+        self.backoff_s = backoff_s
+
+    def enfileirar(self, db, agendamento):
+        """Adiciona à sessão os lembretes do agendamento (sem commit: vão junto com ele)."""
+        agora = datetime.now()
+        if agendamento.data_hora <= agora:
+            return []
+        cliente = db.get(Cliente, agendamento.id_cliente)
+        veiculo = db.get(Veiculo, agendamento.id_veiculo)
+        servico = db.get(Servico, agendamento.id_servico)
+        quando = agendamento.data_hora
+        texto = (f"Olá, {cliente.nome_razao}! Lembrete: {servico.descricao if servico else 'serviço'} "
+                 f"do veículo {veiculo.placa} em {quando:%d/%m/%Y} às {quando:%H:%M}.")
+        destinos = {CanalLembrete.email: cliente.email, CanalLembrete.sms: cliente.telefone}
+        novos = [
+            Lembrete(
+                agendamento=agendamento, canal=canal, destino=destinos[canal],
+                assunto=f"Lembrete de agendamento - {quando:%d/%m %H:%M}", mensagem=texto,
+                proxima_tentativa=max(agora, quando - self.antecedencia),
+            )
+            for canal in self.provedores if destinos.get(canal)
+        ]
+        db.add_all(novos)
+        return novos
+
+    def _atraso(self, tentativas):
+        base = min(MAX_BACKOFF_S, self.backoff_s * 2 ** (tentativas - 1))
+        return timedelta(seconds=base * random.uniform(0.8, 1.2))
+
+    def _reservar(self, db, agora):
+        ids = db.execute(
+            select(Lembrete.id_lembrete)
+            .where(Lembrete.status == StatusLembrete.pendente, Lembrete.proxima_tentativa <= agora)
+            .order_by(Lembrete.proxima_tentativa)
+            .limit(self.lote)
+            .with_for_update(skip_locked=True)  # SQLite ignora: lá um despachante só
+        ).scalars().all()
+        if not ids:
+            return []
+        db.execute(
+            update(Lembrete).where(Lembrete.id_lembrete.in_(ids))
+            .values(proxima_tentativa=agora + timedelta(seconds=RESERVA_S))
+        )
+        linhas = db.execute(
+            select(Lembrete.id_lembrete, Lembrete.canal, Lembrete.destino, Lembrete.assunto,
+                   Lembrete.mensagem, Lembrete.tentativas, Agendamento.status.label("agendamento"))
+            .join(Agendamento, Agendamento.id_agendamento == Lembrete.id_agendamento)
+            .where(Lembrete.id_lembrete.in_(ids))
+        ).mappings().all()
+        db.commit()
+        return linhas
+
+    def despachar_lote(self, bind=None):
+        """Reserva, envia e registra um lote. Devolve {"enviados", "falhas", "cancelados"}."""
+        with usar_oficina(None), (SessionLocal(bind=bind) if bind is not None else SessionLocal()) as db:
+            linhas = self._reservar(db, datetime.now())
+            cancelados = [l["id_lembrete"] for l in linhas if l["agendamento"] == StatusAgendamento.cancelado]
+            por_canal = defaultdict(list)
+            for l in linhas:
+                if l["agendamento"] != StatusAgendamento.cancelado:
+                    por_canal[l["canal"]].append(l)
+
+            resultados = {}
+            for canal, mensagens in por_canal.items():
+                provedor = self.provedores.get(canal)
+                try:
+                    if provedor is None:
+                        raise RuntimeError(f"canal {canal.value} sem provedor configurado")
+                    provedor.enviar(mensagens, resultados)
+                except Exception as e:  # conexão/provedor fora: o que não saiu volta com backoff
+                    for m in mensagens:
+                        resultados.setdefault(m["id_lembrete"], f"{type(e).__name__}: {e}")
+
+            agora = datetime.now()
+            enviados = [i for i, erro in resultados.items() if erro is None]
+            falhas = []
+            for l in linhas:
+                erro = resultados.get(l["id_lembrete"])
+                if erro is None:
+                    continue
+                tentativas = l["tentativas"] + 1
+                esgotou = tentativas >= self.max_tentativas
+                falhas.append({
+                    "b_id": l["id_lembrete"], "b_tentativas": tentativas, "b_erro": erro[:500],
+                    "b_status": StatusLembrete.erro if esgotou else StatusLembrete.pendente,
+                    "b_proxima": agora + self._atraso(tentativas),
+                })
+            if enviados:
+                db.execute(update(Lembrete).where(Lembrete.id_lembrete.in_(enviados)).values(
+                    status=StatusLembrete.enviado, enviado_em=agora,
+                    tentativas=Lembrete.tentativas + 1, erro=None,
+                ))
+            if cancelados:
+                db.execute(update(Lembrete).where(Lembrete.id_lembrete.in_(cancelados))
+                           .values(status=StatusLembrete.cancelado))
+            if falhas:
+                # executemany: um UPDATE preparado para todas as falhas do lote
+                db.connection().execute(
+                    update(Lembrete.__table__)
+                    .where(Lembrete.__table__.c.id_lembrete == bindparam("b_id"))
+                    .values(tentativas=bindparam("b_tentativas"), erro=bindparam("b_erro"),
+                            status=bindparam("b_status"), proxima_tentativa=bindparam("b_proxima")),
+                    falhas,
+                )
+            db.commit()
+        return {"enviados": len(enviados), "falhas": len(falhas), "cancelados": len(cancelados)}
+
+    def laco(self, bind=None, parar=None, intervalo_s=INTERVALO_S):
+        """Despacha enquanto houver lotes cheios; com a fila vazia espera intervalo_s."""
+        parar = parar or threading.Event()
+        while not parar.is_set():
+            try:
+                feito = self.despachar_lote(bind)
+                if sum(feito.values()):
+                    print(f"[lembretes] {feito}")
+                if sum(feito.values()) >= self.lote:
+                    continue
+            except Exception as e:  # banco fora do ar não derruba o app; tenta de novo depois
+                print(f"[lembretes] falha ao despachar: {type(e).__name__}: {e}")
+            parar.wait(intervalo_s)
+
+
+def instalar(config):
+    """Despachante configurado pela seção "lembretes" (None sem seção ou sem canais)."""
+    if not config:
+        return None
+    provedores = {}
+    if config.get("smtp"):
+        provedores[CanalLembrete.email] = ProvedorSMTP(**config["smtp"])
+    if config.get("sms"):
+        provedores[CanalLembrete.sms] = ProvedorSMS(**config["sms"])
+    if not provedores:
+        return None
+    return Despachante(
+        provedores,
+        antecedencia_horas=config.get("antecedencia_horas", ANTECEDENCIA_H),
+        lote=config.get("lote", LOTE),
+        max_tentativas=config.get("max_tentativas", MAX_TENTATIVAS),
+        backoff_s=config.get("backoff_s", BACKOFF_S),
+    )
+
+
+_em_laco = set()
+
+
+def iniciar(despachante, engine, config=None):
+    """Com "despachante": true, roda o laço numa thread daemon (uma por engine)."""
+    if despachante is None or not (config or {}).get("despachante") or id(engine) in _em_laco:
+        return None
+    _em_laco.add(id(engine))
+    Lembrete.__table__.create(engine, checkfirst=True)  # bancos criados antes do outbox
+    parar = threading.Event()
+    threading.Thread(target=despachante.laco, args=(engine, parar), name="lembretes",
+                     daemon=True).start()
+    return parar
+
+
+# ---------------- SMTP local para testes ----------------
+class _SessaoSMTP(socketserver.StreamRequestHandler):
+    def _responder(self, linha):
+        self.wfile.write(linha.encode() + b"\r\n")
+
+    def handle(self):
+        servidor = self.server.smtp_local
+        self._responder("220 smtp-local pronto")
+        destinos = []
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            comando = linha.decode(errors="replace").strip()
+            verbo = comando[:4].upper()
+            if verbo in ("EHLO", "HELO"):
+                self._responder("250 smtp-local")
+            elif verbo == "MAIL":
+                destinos = []
+                self._responder("250 OK")
+            elif verbo == "RCPT":
+                endereco = comando.partition(":")[2].strip().strip("<>")
+                if endereco in servidor.rejeitar:
+                    self._responder("550 destinatário recusado")
+                else:
+                    destinos.append(endereco)
+                    self._responder("250 OK")
+            elif verbo == "DATA":
+                self._responder("354 termine com <CRLF>.<CRLF>")
+                corpo = []
+                for dado in self.rfile:
+                    if dado in (b".\r\n", b".\n"):
+                        break
+                    corpo.append(dado[1:] if dado.startswith(b"..") else dado)
+                with servidor.lock:
+                    servidor.recebidas.append((destinos, message_from_bytes(b"".join(corpo))))
+                if servidor.ao_receber:
+                    servidor.ao_receber(destinos, servidor.recebidas[-1][1])
+                self._responder("250 OK")
+            elif verbo in ("RSET", "NOOP"):
+                self._responder("250 OK")
+            elif verbo == "QUIT":
+                self._responder("221 tchau")
+                return
+            else:
+                self._responder("502 comando não implementado")
+
+
+class SMTPLocal:
+    """
+    Servidor SMTP mínimo em thread, para testes e benchmark (não entrega nada):
+    guarda (destinatários, mensagem) em `recebidas` e recusa com 550 os
+    endereços de `rejeitar`. port=0 escolhe uma porta livre.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, rejeitar=(), ao_receber=None):
+        self.recebidas = []
+        self.rejeitar = set(rejeitar)
+        self.ao_receber = ao_receber
+        self.lock = threading.Lock()
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._servidor = socketserver.ThreadingTCPServer((host, port), _SessaoSMTP)
+        self._servidor.daemon_threads = True
+        self._servidor.smtp_local = self
+        self.host, self.port = self._servidor.server_address[:2]
+
+    def __enter__(self):
+        threading.Thread(target=self._servidor.serve_forever, name="smtp-local", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+if __name__ == "__main__":
+    from database import get_config, get_engine
+
+    parser = argparse.ArgumentParser(description="Despachante de lembretes de agendamento.")
+    parser.add_argument("comando", nargs="?", choices=("despachar", "smtp-local"), default="despachar")
+    parser.add_argument("--uma-vez", action="store_true", help="despacha um lote e sai")
+    parser.add_argument("--porta", type=int, default=1025, help="porta do smtp-local")
+    args = parser.parse_args()
+
+    if args.comando == "smtp-local":
+        def _mostrar(destinos, mensagem):
+            print(f"-> {', '.join(destinos)}: {mensagem['Subject']}\n   {mensagem.get_payload().strip()}")
+
+        with SMTPLocal(port=args.porta, ao_receber=_mostrar) as smtp:
+            print(f"[lembretes] SMTP local em {smtp.host}:{smtp.port} (Ctrl+C para sair)")
+            threading.Event().wait()
+    else:
+        despachante = instalar(get_config().get("lembretes"))
+        if despachante is None:
+            raise SystemExit('configure "lembretes" com "smtp" e/ou "sms" no local_config.json')
+        engine = get_engine()
+        Lembrete.__table__.create(engine, checkfirst=True)
+        if args.uma_vez:
+            print(despachante.despachar_lote())
+        else:
+            despachante.laco()
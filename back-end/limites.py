@@ -0,0 +1,172 @@
+# back-end/limites.py
+"""
+Limite de taxa e controle de admissão para as rotas caras.
+
+1) Token bucket por (cliente, regra): cada regra é um prefixo de rota,
+   opcionalmente precedido do método ("POST /api/jobs"), com taxa
+   (requisições/s) e rajada. Sem token disponível -> 429 + Retry-After. A
+   submissão de jobs tem balde próprio, separado da consulta de status
+   (GET /api/jobs/<id>), que a página repete enquanto espera o job.
+   Os baldes ficam em memória (por processo) ou, com backend "redis", num
+   Redis compartilhado entre processos/instâncias (script Lua atômico).
+2) Semáforo de concorrência para relatórios/exportações: no máximo
+   MAX_CONCORRENTES ao mesmo tempo por processo; quem não consegue vaga em
+   ESPERA_MAX_S recebe 503 + Retry-After. Assim os relatórios nunca ocupam
+   todas as conexões do pool e as rotas baratas (agenda, cadastros) seguem
+   respondendo com a latência de sempre.
+
+Configuração opcional em local_config.json (valores abaixo são os padrões):
+    "limites": {
+        "ativo": true,
+        "backend": "memoria",                 # ou "redis"
+        "redis_url": "redis://localhost:6379/0",
+        "regras": {"/api/reports/": [2, 10], "POST /api/jobs": [1, 5], ...},
+                                              # [método] prefixo: [taxa/s, rajada]
+        "rotas_pesadas": ["/api/reports/", ...],
+        "max_concorrentes": 4,
+        "espera_max_s": 0.5,
+        "confiar_x_forwarded_for": false
+    }
+"""
+import math
+import threading
+import time
+
+from flask import g, jsonify, request
+
+REGRAS_PADRAO = {
+    "/api/reports/": (2, 10),
+    "/api/relatorios/": (2, 10),
+    "/api/movimentos-estoque": (5, 20),
+    "/api/export/": (0.2, 3),
+    "POST /api/jobs": (1, 5),
+    "/api/jobs": (10, 30),                    # status/resultado: polling
+    "/api/busca": (10, 30),
+}
+ROTAS_PESADAS_PADRAO = ("/api/reports/", "/api/relatorios/", "/api/movimentos-estoque", "/api/export/")
+MAX_CONCORRENTES = 4
+ESPERA_MAX_S = 0.5
+LIMPEZA_A_CADA_S = 60
+
+
+class BaldesMemoria:
+    """Token buckets em memória, protegidos por um lock."""
+
+    def __init__(self):
+        self._baldes = {}  # chave -> [tokens, último instante]
+        self._lock = threading.Lock()
+        self._ultima_limpeza = time.monotonic()
+
+    def consumir(self, chave, taxa, rajada):
+        """Devolve 0 se liberou, ou os segundos até haver um token."""
+        agora = time.monotonic()
+        with self._lock:
+            tokens, antes = self._baldes.get(chave, (rajada, agora))
+            tokens = min(rajada, tokens + (agora - antes) * taxa)
+            if tokens >= 1:
+                self._baldes[chave] = [tokens - 1, agora]
+                espera = 0.0
+            else:
+                self._baldes[chave] = [tokens, agora]
+                espera = (1 - tokens) / taxa
+            if agora - self._ultima_limpeza > LIMPEZA_A_CADA_S:
+                self._limpar(agora)
+        return espera
+
+    def _limpar(self, agora):
+        # balde parado há mais de um minuto já estaria cheio: é o mesmo que não existir
+        for chave in [c for c, (_, t) in self._baldes.items() if agora - t > LIMPEZA_A_CADA_S]:
+            del self._baldes[chave]
+        self._ultima_limpeza = agora
+
+
+class BaldesRedis:
+    """Mesmos token buckets num Redis compartilhado (HASH por chave, com expiração)."""
+
+    SCRIPT = """
+    local taxa, rajada, agora = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local b = redis.call('HMGET', KEYS[1], 't', 'ts')
+    local tokens, antes = tonumber(b[1]) or rajada, tonumber(b[2]) or agora
+    tokens = math.min(rajada, tokens + math.max(0, agora - antes) * taxa)
+    local espera = 0
+    if tokens >= 1 then tokens = tokens - 1 else espera = (1 - tokens) / taxa end
+    redis.call('HSET', KEYS[1], 't', tokens, 'ts', agora)
+    redis.call('EXPIRE', KEYS[1], math.ceil(rajada / taxa) + 1)
+    return tostring(espera)
+    """
+
+    def __init__(self, url):
+        import redis  # opcional: pip install redis
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.2)
+        self._script = self._redis.register_script(self.SCRIPT)
+        self._reserva = BaldesMemoria()
+
+    def consumir(self, chave, taxa, rajada):
+        try:
+            return float(self._script(keys=[f"limite:{chave}"], args=[taxa, rajada, time.time()]))
+        except Exception:
+            # Redis fora do ar não pode derrubar a API: limita só neste processo
+            return self._reserva.consumir(chave, taxa, rajada)
+
+
+def _resposta(status, mensagem, espera):
+    resposta = jsonify({"erro": mensagem})
+    resposta.status_code = status
+    resposta.headers["Retry-After"] = str(max(1, math.ceil(espera)))
+    return resposta
+
+
+def _metodo_e_prefixo(regra):
+    """Separa o método opcional: "POST /api/jobs" -> ("POST", "/api/jobs"), "/api/busca" -> (None, ...)."""
+    metodo, _, prefixo = regra.rpartition(" ")
+    return (metodo.upper() or None), prefixo
+
+
+def instalar(app, config=None):
+    """Registra os hooks de before/teardown_request no app Flask."""
+    config = config or {}
+    if not config.get("ativo", True):
+        return
+
+    regras = [(r, *_metodo_e_prefixo(r), tuple(v)) for r, v in (config.get("regras") or REGRAS_PADRAO).items()]
+    # prefixo mais específico primeiro; no mesmo prefixo, a regra com método antes
+    regras.sort(key=lambda regra: (len(regra[2]), regra[1] is not None), reverse=True)
+    rotas_pesadas = tuple(config.get("rotas_pesadas") or ROTAS_PESADAS_PADRAO)
+    espera_max = float(config.get("espera_max_s", ESPERA_MAX_S))
+    semaforo = threading.BoundedSemaphore(int(config.get("max_concorrentes", MAX_CONCORRENTES)))
+    confiar_xff = bool(config.get("confiar_x_forwarded_for", False))
+
+    if config.get("backend") == "redis":
+        baldes = BaldesRedis(config.get("redis_url", "redis://localhost:6379/0"))
+    else:
+        baldes = BaldesMemoria()
+
+    def cliente():
+        if confiar_xff and request.headers.get("X-Forwarded-For"):
+            return request.headers["X-Forwarded-For"].split(",")[0].strip()
+        return request.remote_addr or "?"
+
+    @app.before_request
+    def _admitir():
+        if request.method == "OPTIONS":  # preflight do CORS
+            return None
+        caminho = request.path
+        for regra, metodo, prefixo, (taxa, rajada) in regras:
+            if caminho.startswith(prefixo) and metodo in (None, request.method):
+                espera = baldes.consumir(f"{cliente()}|{regra}", taxa, rajada)
+                if espera > 0:
+                    return _resposta(429, "muitas requisições, tente novamente em instantes", espera)
+                break
+
+        if caminho.startswith(rotas_pesadas):
+            if not semaforo.acquire(timeout=espera_max):
+                return _resposta(503, "servidor ocupado com relatórios, tente novamente", 1)
+            g.limites_vaga = True
+        return None
+
+    @app.teardown_request
+    def _liberar(_erro=None):
+        # teardown roda também em exportações em streaming, ao fim do envio
+        if g.pop("limites_vaga", False):
+            semaforo.release()
@@ -1,12 +1,12 @@
 # back-end/models.py
 import enum
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, DateTime, Numeric,
-    Enum, Table
+    Column, Integer, String, ForeignKey, DateTime, Numeric, Boolean,
+    Enum, Table, Index, UniqueConstraint, DDL, Text, event, false, text, true
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, declared_attr, relationship, with_loader_criteria
 from sqlalchemy.sql import func
-from database import Base
+from database import Base, oficina_atual, oficina_corrente
 
 # ===================== ENUMS ==========================
 class OrigemPeca(str, enum.Enum):
@@ -29,24 +29,86 @@ class TipoMovimento(str, enum.Enum):
     saida = "saida"
     ajuste = "ajuste"
 
+class StatusJob(str, enum.Enum):
+    pendente = "pendente"
+    executando = "executando"
+    concluido = "concluido"
+    erro = "erro"
+    cancelado = "cancelado"
+
+class CanalLembrete(str, enum.Enum):
+    email = "email"
+    sms = "sms"
+
+class StatusLembrete(str, enum.Enum):
+    pendente = "pendente"
+    enviado = "enviado"
+    erro = "erro"            # esgotou as tentativas
+    cancelado = "cancelado"  # agendamento cancelado antes do envio
+
+# ===================== OFICINA =========================
+# Cada filial é uma oficina (tenant). As tabelas com DaOficina levam id_oficina
+# e são filtradas automaticamente pela oficina da requisição (ver oficinas.py);
+# Servico e Fornecedor são catálogos compartilhados entre as filiais.
+class Oficina(Base):
+    __tablename__ = "oficina"
+
+    id_oficina = Column(Integer, primary_key=True)
+    nome = Column(String(120), nullable=False, unique=True)
+    ativa = Column(Boolean, nullable=False, default=True, server_default=true())
+
+
+class DaOficina:
+    """Mixin: id_oficina preenchido com a oficina corrente (database.oficina_corrente) no INSERT."""
+
+    @declared_attr
+    def id_oficina(cls):
+        return Column(Integer, ForeignKey("oficina.id_oficina"), nullable=False,
+                      default=oficina_corrente)
+
+
+# Filtro automático: com uma oficina em database.oficina_atual, toda consulta do
+# ORM recebe WHERE id_oficina = :oficina nas tabelas com DaOficina (ver oficinas.py).
+# Fica aqui para valer em qualquer processo que carregue os modelos (ex.: workers
+# de jobs.py com spawn, que não importam oficinas.py).
+@event.listens_for(Session, "do_orm_execute")
+def _filtrar_por_oficina(estado):
+    oficina = oficina_atual.get()
+    if oficina is None or estado.is_column_load or estado.is_relationship_load:
+        # lazy loads/refresh herdam o filtro da consulta que carregou o objeto
+        return
+    if estado.execution_options.get("todas_as_oficinas"):
+        return
+    estado.statement = estado.statement.options(with_loader_criteria(
+        DaOficina,
+        lambda cls: cls.id_oficina == oficina,
+        include_aliases=True,
+    ))
+
 # ===================== CLIENTE =========================
-class Cliente(Base):
+class Cliente(DaOficina, Base):
     __tablename__ = "cliente"
 
     id_cliente = Column(Integer, primary_key=True)
     nome_razao = Column(String(120), nullable=False)
-    cpf_cnpj = Column(String(20), nullable=False, unique=True, index=True)
+    cpf_cnpj = Column(String(20), nullable=False)
     telefone = Column(String(20), nullable=False)
     email = Column(String(100))
 
     veiculos = relationship("Veiculo", back_populates="cliente")
 
+    # o mesmo CPF/CNPJ pode ser cliente de duas filiais
+    __table_args__ = (
+        UniqueConstraint("id_oficina", "cpf_cnpj", name="uq_cliente_oficina_cpf_cnpj"),
+        Index("ix_cliente_oficina_nome", "id_oficina", "nome_razao"),
+    )
+
 # ===================== VEICULO =========================
-class Veiculo(Base):
+class Veiculo(DaOficina, Base):
     __tablename__ = "veiculo"
 
     id_veiculo = Column(Integer, primary_key=True)
-    placa = Column(String(10), nullable=False, unique=True)
+    placa = Column(String(10), nullable=False)
     chassi = Column(String(50))
     km_atual = Column(Integer)
     marca = Column(String(50))
@@ -57,8 +119,12 @@ class Veiculo(Base):
 
     ordens = relationship("OS", back_populates="veiculo")
 
+    __table_args__ = (
+        UniqueConstraint("id_oficina", "placa", name="uq_veiculo_oficina_placa"),
+    )
+
 # ===================== FUNCIONARIO =====================
-class Funcionario(Base):
+class Funcionario(DaOficina, Base):
     __tablename__ = "funcionario"
 
     id_funcionario = Column(Integer, primary_key=True)
@@ -67,6 +133,10 @@ class Funcionario(Base):
 
     ordens = relationship("OS", back_populates="responsavel")
 
+    __table_args__ = (
+        Index("ix_funcionario_oficina_nome", "id_oficina", "nome"),
+    )
+
 # ===================== SERVICO =========================
 class Servico(Base):
     __tablename__ = "servico"
@@ -78,11 +148,11 @@ class Servico(Base):
     itens_servico = relationship("ItemServico", back_populates="servico")
 
 # ===================== PECA ============================
-class Peca(Base):
+class Peca(DaOficina, Base):
     __tablename__ = "peca"
 
     id_peca = Column(Integer, primary_key=True)
-    sku = Column(String(50), nullable=False, unique=True, index=True)
+    sku = Column(String(50), nullable=False)
     descricao = Column(String(200), nullable=False)
     origem = Column(Enum(OrigemPeca), nullable=False, default=OrigemPeca.nacional)
     estoque_atual = Column(Integer, nullable=False, default=0)
@@ -91,6 +161,12 @@ class Peca(Base):
     movimentos = relationship("MovimentoEstoque", back_populates="peca")
     fornecedores = relationship("Fornecedor", secondary="fornecedor_peca", back_populates="pecas")
 
+    # estoque é por filial: cada uma tem a sua linha do mesmo SKU
+    __table_args__ = (
+        UniqueConstraint("id_oficina", "sku", name="uq_peca_oficina_sku"),
+        Index("ix_peca_oficina_descricao", "id_oficina", "descricao"),
+    )
+
 # ===================== FORNECEDOR ======================
 class Fornecedor(Base):
     __tablename__ = "fornecedor"
@@ -105,17 +181,27 @@ fornecedor_peca = Table(
     "fornecedor_peca", Base.metadata,
     Column("id_fornecedor", Integer, ForeignKey("fornecedor.id_fornecedor"), primary_key=True),
     Column("id_peca", Integer, ForeignKey("peca.id_peca"), primary_key=True),
+    Column("preco_custo", Numeric(10, 2)),  # última tabela de preços importada (importacao.py)
 )
 
 # ===================== OS ==============================
-class OS(Base):
+class OS(DaOficina, Base):
     __tablename__ = "os"
 
     id_os = Column(Integer, primary_key=True)
     status = Column(Enum(StatusOS), nullable=False, default=StatusOS.aberto)
+    data_abertura = Column(DateTime, nullable=False, default=func.now(), server_default=func.now())
     problema_relatado = Column(String(255))
     km_entrada = Column(Integer)
 
+    # Totais desnormalizados, mantidos por totais_os.py na mesma transação dos itens/pagamentos
+    total_servicos = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    total_pecas = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    total_pago = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    saldo = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    # pagamentos/movimentos já foram para o arquivo (particionamento.py): os totais acima ficam congelados
+    arquivada = Column(Boolean, nullable=False, default=False, server_default=false())
+
     id_veiculo = Column(Integer, ForeignKey("veiculo.id_veiculo"), nullable=False)
     veiculo = relationship("Veiculo", back_populates="ordens")
 
@@ -127,8 +213,17 @@ class OS(Base):
     pagamentos = relationship("Pagamento", back_populates="os")
     movimentos = relationship("MovimentoEstoque", back_populates="os")
 
+# Contas a receber: índice parcial só com as OS que ainda têm saldo
+Index(
+    "ix_os_em_aberto_data", OS.id_oficina, OS.data_abertura,
+    postgresql_where=OS.saldo > 0,
+    sqlite_where=OS.saldo > 0,
+)
+# Carga por mecânico: agrupa por responsável e status sem varrer a tabela
+Index("ix_os_responsavel_status", OS.id_oficina, OS.id_responsavel, OS.status)
+
 # ===================== ITEM SERVICO ====================
-class ItemServico(Base):
+class ItemServico(DaOficina, Base):
     __tablename__ = "item_servico"
 
     id_item_servico = Column(Integer, primary_key=True)
@@ -142,7 +237,7 @@ class ItemServico(Base):
     servico = relationship("Servico", back_populates="itens_servico")
 
 # ===================== ITEM PECA =======================
-class ItemPeca(Base):
+class ItemPeca(DaOficina, Base):
     __tablename__ = "item_peca"
 
     id_item_peca = Column(Integer, primary_key=True)
@@ -156,19 +251,23 @@ class ItemPeca(Base):
     peca = relationship("Peca", back_populates="itens_peca")
 
 # ===================== PAGAMENTO =======================
-class Pagamento(Base):
+class Pagamento(DaOficina, Base):
     __tablename__ = "pagamento"
 
     id_pagamento = Column(Integer, primary_key=True)
-    data = Column(DateTime, default=func.now())
+    data = Column(DateTime, nullable=False, default=func.now(), server_default=func.now())  # chave de partição
     forma = Column(String(50))
     valor = Column(Numeric(10,2))
 
-    id_os = Column(Integer, ForeignKey("os.id_os"), nullable=False)
+    id_os = Column(Integer, ForeignKey("os.id_os"), nullable=False, index=True)
     os = relationship("OS", back_populates="pagamentos")
 
+    __table_args__ = (
+        Index("ix_pagamento_oficina_data", "id_oficina", "data"),
+    )
+
 # ===================== MOVIMENTO ESTOQUE ===============
-class MovimentoEstoque(Base):
+class MovimentoEstoque(DaOficina, Base):
     __tablename__ = "movimento_estoque"
 
     id_movimento = Column(Integer, primary_key=True)
@@ -178,14 +277,35 @@ class MovimentoEstoque(Base):
     qtd = Column(Integer, nullable=False)
     custo_unitario = Column(Numeric(10,2))
 
-    id_os = Column(Integer, ForeignKey("os.id_os"))
+    id_os = Column(Integer, ForeignKey("os.id_os"), index=True)
     os = relationship("OS", back_populates="movimentos")
 
     id_peca = Column(Integer, ForeignKey("peca.id_peca"), nullable=False)
     peca = relationship("Peca", back_populates="movimentos")
 
+    # relatório de reposição: saídas da janela, agregadas por dia/peça sem ler a tabela toda
+    __table_args__ = (
+        Index("ix_movimento_tipo_data", "id_oficina", "tipo", "data", "id_peca", "qtd"),
+    )
+
+# ===================== JOB (relatórios em segundo plano) ======================
+class Job(DaOficina, Base):
+    __tablename__ = "job"
+
+    id_job = Column(Integer, primary_key=True)
+    tipo = Column(String(40), nullable=False)
+    parametros = Column(Text)                 # JSON
+    status = Column(Enum(StatusJob), nullable=False, default=StatusJob.pendente, index=True)
+    criado_em = Column(DateTime, nullable=False, default=func.now())
+    iniciado_em = Column(DateTime)
+    finalizado_em = Column(DateTime)
+    arquivo = Column(String(255))             # resultado em JSON no disco
+    erro = Column(Text)
+    dono = Column(String(120))                # processo servidor que enfileirou (host:pid:boot)
+    batimento = Column(DateTime)              # último sinal de vida do dono
+
 # ===================== AGENDAMENTO ======================
-class Agendamento(Base):
+class Agendamento(DaOficina, Base):
     __tablename__ = "agendamento"
 
     id_agendamento = Column(Integer, primary_key=True)
@@ -200,3 +320,106 @@ class Agendamento(Base):
 
     id_servico = Column(Integer, ForeignKey("servico.id_servico"), nullable=False)
     servico = relationship("Servico")
+
+    __table_args__ = (
+        Index("ix_agendamento_oficina_data_hora", "id_oficina", "data_hora"),
+    )
+
+# ===================== LEMBRETE (outbox) ================
+# Gravado na mesma transação do agendamento (POST /api/agendamentos) e enviado
+# depois pelo despachante de lembretes.py; a mensagem já vai pronta.
+class Lembrete(DaOficina, Base):
+    __tablename__ = "lembrete"
+
+    id_lembrete = Column(Integer, primary_key=True)
+    id_agendamento = Column(Integer, ForeignKey("agendamento.id_agendamento"), nullable=False, index=True)
+    agendamento = relationship("Agendamento")
+    canal = Column(Enum(CanalLembrete), nullable=False)
+    destino = Column(String(120), nullable=False)   # e-mail ou telefone
+    assunto = Column(String(200))
+    mensagem = Column(Text, nullable=False)
+    status = Column(Enum(StatusLembrete), nullable=False, default=StatusLembrete.pendente)
+    tentativas = Column(Integer, nullable=False, default=0, server_default="0")
+    proxima_tentativa = Column(DateTime, nullable=False)  # envio (ou reenvio) a partir daqui
+    criado_em = Column(DateTime, nullable=False, default=func.now())
+    enviado_em = Column(DateTime)
+    erro = Column(Text)
+
+    __table_args__ = (
+        # fila do despachante: só as pendentes, de todas as oficinas, pela ordem de envio
+        Index("ix_lembrete_pendente", "proxima_tentativa",
+              postgresql_where=text("status = 'pendente'"), sqlite_where=text("status = 'pendente'")),
+    )
+
+# ===================== BUSCA ===========================
+# Postgres: índices GIN trigram (pg_trgm) atendem ILIKE '%termo%' e similarity().
+# id_oficina vai na frente (btree_gin): a busca de uma filial não lê as posting lists das outras.
+for _extensao in ("pg_trgm", "btree_gin"):
+    event.listen(
+        Base.metadata, "before_create",
+        DDL(f"CREATE EXTENSION IF NOT EXISTS {_extensao}").execute_if(dialect="postgresql"),
+    )
+
+for _nome, _coluna in (
+    ("ix_cliente_nome_razao_trgm", Cliente.nome_razao),
+    ("ix_cliente_cpf_cnpj_trgm", Cliente.cpf_cnpj),
+    ("ix_veiculo_placa_trgm", Veiculo.placa),
+    ("ix_veiculo_marca_trgm", Veiculo.marca),
+    ("ix_veiculo_modelo_trgm", Veiculo.modelo),
+    ("ix_peca_sku_trgm", Peca.sku),
+    ("ix_peca_descricao_trgm", Peca.descricao),
+):
+    Index(
+        _nome, _coluna.class_.id_oficina, _coluna,
+        postgresql_using="gin",
+        postgresql_ops={_coluna.key: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
+# SQLite: tabela FTS5 única mantida por triggers.
+# rowid = id * 4 + código do tipo, para apagar/atualizar sem varrer o índice.
+TIPOS_BUSCA = {"cliente": 1, "veiculo": 2, "peca": 3}
+
+def _so_digitos(col):
+    return f"replace(replace(replace({col}, '.', ''), '-', ''), '/', '')"
+
+_TEXTO_BUSCA_SQLITE = {
+    "cliente": (
+        "id_cliente", "NEW.nome_razao", "NEW.cpf_cnpj",
+        f"NEW.nome_razao || ' ' || NEW.cpf_cnpj || ' ' || {_so_digitos('NEW.cpf_cnpj')}",
+    ),
+    "veiculo": (
+        "id_veiculo", "NEW.placa",
+        "trim(coalesce(NEW.marca, '') || ' ' || coalesce(NEW.modelo, ''))",
+        "NEW.placa || ' ' || replace(NEW.placa, '-', '') || ' ' "
+        "|| coalesce(NEW.marca, '') || ' ' || coalesce(NEW.modelo, '')",
+    ),
+    "peca": (
+        "id_peca", "NEW.descricao", "NEW.sku",
+        "NEW.sku || ' ' || NEW.descricao",
+    ),
+}
+
+DDL_BUSCA_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5("
+    "tipo UNINDEXED, ref_id UNINDEXED, id_oficina UNINDEXED, titulo UNINDEXED, detalhe UNINDEXED, texto, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+]
+for _tipo, (_pk, _titulo, _detalhe, _texto) in _TEXTO_BUSCA_SQLITE.items():
+    _codigo = TIPOS_BUSCA[_tipo]
+    _insert = (
+        "INSERT INTO busca_fts(rowid, tipo, ref_id, id_oficina, titulo, detalhe, texto) "
+        f"VALUES (NEW.{_pk} * 4 + {_codigo}, '{_tipo}', NEW.{_pk}, NEW.id_oficina, {_titulo}, {_detalhe}, {_texto});"
+    )
+    _delete = f"DELETE FROM busca_fts WHERE rowid = OLD.{_pk} * 4 + {_codigo};"
+    DDL_BUSCA_SQLITE += [
+        f"CREATE TRIGGER IF NOT EXISTS busca_{_tipo}_ai AFTER INSERT ON {_tipo} BEGIN {_insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS busca_{_tipo}_ad AFTER DELETE ON {_tipo} BEGIN {_delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS busca_{_tipo}_au AFTER UPDATE ON {_tipo} BEGIN {_delete} {_insert} END",
+    ]
+
+for _sql in DDL_BUSCA_SQLITE:
+    event.listen(Base.metadata, "after_create", DDL(_sql).execute_if(dialect="sqlite"))
+event.listen(
+    Base.metadata, "before_drop",
+    DDL("DROP TABLE IF EXISTS busca_fts").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,281 @@
+# back-end/ordens.py
+"""
+Ciclo de vida da OS: abertura com itens/pagamentos, inclusão de itens e
+mudança de status (individual ou em lote).
+
+As funções não fazem commit: a rota decide quando confirmar a transação.
+Itens e pagamentos entram com INSERT em lote (um executemany por tabela) e os
+totais da OS são recalculados uma vez no fim (totais_os.recalcular_totais).
+Peças lançadas dão baixa no estoque na mesma transação (estoque.consumir_pecas).
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import insert, select, update
+
+from models import (
+    OS, ItemServico, ItemPeca, Pagamento, Servico, Peca,
+    Veiculo, Funcionario, StatusOS,
+)
+from totais_os import recalcular_totais
+from estoque import consumir_pecas, EstoqueInsuficiente
+
+# status atual -> status permitidos a seguir
+TRANSICOES = {
+    StatusOS.aberto: {StatusOS.em_execucao, StatusOS.cancelado},
+    StatusOS.em_execucao: {StatusOS.finalizado, StatusOS.cancelado},
+    StatusOS.finalizado: set(),
+    StatusOS.cancelado: set(),
+}
+# itens só entram enquanto a OS não foi encerrada; pagamentos também depois de finalizada
+STATUS_ACEITA_ITENS = {StatusOS.aberto, StatusOS.em_execucao}
+STATUS_ACEITA_PAGAMENTOS = {StatusOS.aberto, StatusOS.em_execucao, StatusOS.finalizado}
+MAX_IDS_LOTE = 5000
+
+
+class ErroOS(Exception):
+    """Erro de validação/regra de negócio; `status` é o código HTTP sugerido."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+def _status(valor):
+    try:
+        return StatusOS(valor)
+    except ValueError:
+        raise ErroOS(f"status inválido: {valor!r} (use {', '.join(s.value for s in StatusOS)})")
+
+
+def _qtd(valor, linha):
+    try:
+        qtd = int(valor if valor is not None else 1)
+    except (TypeError, ValueError):
+        raise ErroOS(f"{linha}: qtd inválida")
+    if qtd <= 0:
+        raise ErroOS(f"{linha}: qtd deve ser positiva")
+    return qtd
+
+
+def _valor(valor, linha, obrigatorio=True):
+    if valor is None:
+        if obrigatorio:
+            raise ErroOS(f"{linha}: valor obrigatório")
+        return None
+    try:
+        v = Decimal(str(valor))
+    except InvalidOperation:
+        raise ErroOS(f"{linha}: valor inválido")
+    if v < 0:
+        raise ErroOS(f"{linha}: valor não pode ser negativo")
+    return v
+
+
+def _km(valor):
+    if valor is None:
+        return None
+    try:
+        km = int(valor) if not isinstance(valor, (bool, float)) else None
+    except (TypeError, ValueError):
+        km = None
+    if km is None or km < 0:
+        raise ErroOS("km_entrada deve ser um inteiro não negativo")
+    return km
+
+
+def _lista_de_objetos(valor, nome):
+    if not isinstance(valor, (list, tuple)):
+        raise ErroOS(f"{nome} deve ser uma lista")
+    for n, item in enumerate(valor, 1):
+        if not isinstance(item, dict):
+            raise ErroOS(f"{nome}[{n}]: deve ser um objeto")
+    return valor
+
+
+def _id(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _linhas_servico(db, id_os, itens):
+    ids = {_id(i.get("id_servico")) for i in itens}
+    precos = dict(db.execute(
+        select(Servico.id_servico, Servico.preco_padrao).where(Servico.id_servico.in_(ids))
+    ).all())
+    linhas = []
+    for n, item in enumerate(itens, 1):
+        rotulo = f"itens_servico[{n}]"
+        id_servico = _id(item.get("id_servico"))
+        if id_servico not in precos:
+            raise ErroOS(f"{rotulo}: serviço {id_servico} não encontrado", 404)
+        valor = _valor(item.get("valor_unit"), rotulo, obrigatorio=False)
+        linhas.append({
+            "id_os": id_os,
+            "id_servico": id_servico,
+            "qtd": _qtd(item.get("qtd"), rotulo),
+            # sem valor informado, vale o preço padrão do serviço
+            "valor_unit": valor if valor is not None else (precos[id_servico] or 0),
+        })
+    return linhas
+
+
+def _linhas_peca(db, id_os, itens):
+    ids = {_id(i.get("id_peca")) for i in itens}
+    existentes = set(db.execute(select(Peca.id_peca).where(Peca.id_peca.in_(ids))).scalars())
+    linhas = []
+    for n, item in enumerate(itens, 1):
+        rotulo = f"itens_peca[{n}]"
+        id_peca = _id(item.get("id_peca"))
+        if id_peca not in existentes:
+            raise ErroOS(f"{rotulo}: peça {item.get('id_peca')} não encontrada", 404)
+        linhas.append({
+            "id_os": id_os,
+            "id_peca": id_peca,
+            "qtd": _qtd(item.get("qtd"), rotulo),
+            "valor_unit": _valor(item.get("valor_unit"), rotulo),
+        })
+    return linhas
+
+
+def _linhas_pagamento(id_os, pagamentos):
+    linhas = []
+    for n, pg in enumerate(pagamentos, 1):
+        rotulo = f"pagamentos[{n}]"
+        linha = {
+            "id_os": id_os,
+            "forma": pg.get("forma"),
+            "valor": _valor(pg.get("valor"), rotulo),
+        }
+        if pg.get("data"):
+            try:
+                linha["data"] = datetime.fromisoformat(pg["data"])
+            except (TypeError, ValueError):
+                raise ErroOS(f"{rotulo}: data deve estar em ISO")
+        linhas.append(linha)
+    return linhas
+
+
+def _inserir_em_lote(db, modelo, linhas):
+    if not linhas:
+        return
+    # colunas heterogêneas (ex.: pagamento com e sem data) viram lotes separados
+    por_colunas = {}
+    for linha in linhas:
+        por_colunas.setdefault(tuple(sorted(linha)), []).append(linha)
+    for grupo in por_colunas.values():
+        db.execute(insert(modelo), grupo)
+
+
+def adicionar_itens(db, os, itens_servico=(), itens_peca=(), pagamentos=()):
+    """Inclui itens e pagamentos numa OS já existente (sem commit)."""
+    if (itens_servico or itens_peca) and os.status not in STATUS_ACEITA_ITENS:
+        raise ErroOS(f"OS {os.id_os} está {os.status.value}: não aceita novos itens", 409)
+    if pagamentos and os.status not in STATUS_ACEITA_PAGAMENTOS:
+        raise ErroOS(f"OS {os.id_os} está {os.status.value}: não aceita pagamentos", 409)
+    if pagamentos and os.arquivada:
+        raise ErroOS(f"OS {os.id_os} está arquivada: não aceita pagamentos", 409)
+
+    # valida tudo antes de escrever qualquer linha
+    itens_servico = _lista_de_objetos(itens_servico, "itens_servico")
+    itens_peca = _lista_de_objetos(itens_peca, "itens_peca")
+    pagamentos = _lista_de_objetos(pagamentos, "pagamentos")
+    linhas_servico = _linhas_servico(db, os.id_os, itens_servico) if itens_servico else []
+    linhas_peca = _linhas_peca(db, os.id_os, itens_peca) if itens_peca else []
+    linhas_pagamento = _linhas_pagamento(os.id_os, pagamentos) if pagamentos else []
+
+    _inserir_em_lote(db, ItemServico, linhas_servico)
+    _inserir_em_lote(db, ItemPeca, linhas_peca)
+    _inserir_em_lote(db, Pagamento, linhas_pagamento)
+
+    try:
+        consumir_pecas(db, os.id_os, linhas_peca)
+    except EstoqueInsuficiente as e:
+        raise ErroOS(str(e), 409)
+
+    if linhas_servico or linhas_peca or linhas_pagamento:
+        recalcular_totais(db, [os.id_os])
+
+
+def criar_os(db, dados):
+    """Abre uma OS completa (itens e pagamentos opcionais) e devolve o objeto OS (sem commit)."""
+    id_veiculo = dados.get("id_veiculo")
+    id_responsavel = dados.get("id_responsavel")
+    if not id_veiculo or not id_responsavel:
+        raise ErroOS("id_veiculo e id_responsavel são obrigatórios")
+
+    veiculo = db.get(Veiculo, id_veiculo)
+    if not veiculo:
+        raise ErroOS("veículo não encontrado", 404)
+    if not db.get(Funcionario, id_responsavel):
+        raise ErroOS("responsável não encontrado", 404)
+
+    status = _status(dados.get("status") or StatusOS.aberto.value)
+    if status not in STATUS_ACEITA_ITENS:
+        raise ErroOS("uma OS nova deve começar como aberto ou em_execucao")
+
+    km_entrada = _km(dados.get("km_entrada"))
+    os = OS(
+        id_veiculo=id_veiculo,
+        id_responsavel=id_responsavel,
+        status=status,
+        problema_relatado=dados.get("problema_relatado"),
+        km_entrada=km_entrada,
+    )
+    db.add(os)
+    db.flush()  # id_os para os itens
+
+    adicionar_itens(
+        db, os,
+        itens_servico=dados.get("itens_servico") or [],
+        itens_peca=dados.get("itens_peca") or [],
+        pagamentos=dados.get("pagamentos") or [],
+    )
+
+    # quilometragem de entrada atualiza o hodômetro do veículo se for maior
+    if km_entrada is not None and (veiculo.km_atual or 0) < km_entrada:
+        veiculo.km_atual = km_entrada
+    return os
+
+
+def mudar_status(os, novo):
+    novo = _status(novo)
+    if novo not in TRANSICOES[os.status]:
+        raise ErroOS(f"transição inválida: {os.status.value} -> {novo.value}", 409)
+    os.status = novo
+
+
+def mudar_status_em_lote(db, ids, novo):
+    """
+    Um único UPDATE ... WHERE id_os IN (...) AND status IN (origens válidas).
+    Devolve (ids atualizados, ids ignorados por não existirem ou não permitirem a transição).
+    """
+    novo = _status(novo)
+    ids = sorted({int(i) for i in ids})
+    if not ids:
+        raise ErroOS("informe ids")
+    if len(ids) > MAX_IDS_LOTE:
+        raise ErroOS(f"no máximo {MAX_IDS_LOTE} OS por lote")
+
+    origens = [s for s, destinos in TRANSICOES.items() if novo in destinos]
+    if not origens:
+        raise ErroOS(f"nenhum status pode ir para {novo.value}", 409)
+
+    atualizados = db.execute(
+        update(OS)
+        .where(OS.id_os.in_(ids), OS.status.in_(origens))
+        .values(status=novo)
+        .returning(OS.id_os)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+    # OS já carregadas na sessão precisam reler o status
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, OS) and obj.id_os in atualizados:
+            db.expire(obj, ["status"])
+
+    feitos = set(atualizados)
+    return sorted(feitos), [i for i in ids if i not in feitos]
@@ -0,0 +1,464 @@
+# back-end/particionamento.py
+"""
+Particionamento por mês e arquivamento de movimento_estoque e pagamento.
+
+Particionamento (só Postgres): as duas tabelas viram tabelas particionadas por
+faixa em `data`, uma partição por mês (<tabela>_pAAAAMM) mais a partição
+<tabela>_default, que recebe o que cair fora das faixas criadas. A chave
+primária passa a ser (id, data), exigência do Postgres; ids continuam vindo da
+mesma sequência, então seguem únicos e o ORM não muda. Consultas com filtro em
+`data` (reposição, exportações, fluxo de caixa) só leem as partições do
+período, e os índices de cada mês são pequenos o bastante para ficar em memória.
+
+    python particionamento.py converter        # uma vez: copia as tabelas para a versão particionada
+    python particionamento.py garantir -m 3    # cria as partições dos próximos meses (idempotente)
+
+O app também roda `garantir` ao subir e uma vez por dia numa thread. Partições
+novas são criadas fora do pai e anexadas com ATTACH PARTITION, levando junto o
+que estiver na default para aquele mês; assim a criação nunca falha por causa
+de linhas que já caíram na default.
+
+Arquivamento (Postgres e SQLite): meses fechados (mais antigos que
+meses_quentes) têm as linhas de OS finalizadas/canceladas, e os movimentos sem
+OS, copiadas para arquivos JSON Lines comprimidos em ARQUIVO_DIR e apagadas das
+tabelas quentes. Partições que ficam vazias são removidas. As OS envolvidas
+ficam com arquivada = true: os totais desnormalizados continuam valendo, o
+recálculo de totais as ignora e elas não aceitam mais pagamentos.
+
+    python particionamento.py arquivar --meses-quentes 12 [--simular]
+    python particionamento.py consultar pagamento --de 2023-01 --ate 2023-06 --os 10 [--oficina 2]
+
+A consulta sob demanda também está em GET /api/arquivo/<tabela>.
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+
+from sqlalchemy import exists, func, or_, select, text, update
+from sqlalchemy.schema import AddConstraint, CreateIndex
+
+from database import oficina_corrente
+from models import OS, MovimentoEstoque, Pagamento, StatusOS
+
+ARQUIVO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arquivo")
+MESES_A_FRENTE = 3
+MESES_QUENTES = 12
+INTERVALO_MANUTENCAO_S = 24 * 3600
+LIMITE_CONSULTA = 1000
+LOTE = 5000
+
+# tabela -> (modelo, coluna de id)
+TABELAS = {
+    "movimento_estoque": (MovimentoEstoque, "id_movimento"),
+    "pagamento": (Pagamento, "id_pagamento"),
+}
+STATUS_ARQUIVAVEIS = (StatusOS.finalizado, StatusOS.cancelado)
+
+
+class ErroParticionamento(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+
+# ---------------------------------------------------------------- meses
+def _inicio_mes(d):
+    return date(d.year, d.month, 1)
+
+
+def _somar_meses(d, n):
+    total = d.year * 12 + d.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _mes(texto):
+    """'2024-03' -> date(2024, 3, 1)."""
+    try:
+        return datetime.strptime(texto, "%Y-%m").date()
+    except (TypeError, ValueError):
+        raise ErroParticionamento(f"mês inválido: {texto!r} (use AAAA-MM)")
+
+
+def _nome_particao(tabela, mes):
+    return f"{tabela}_p{mes:%Y%m}"
+
+
+# ---------------------------------------------------------------- Postgres
+def _exigir_postgres(conn):
+    if conn.dialect.name != "postgresql":
+        raise ErroParticionamento("particionamento nativo só existe no Postgres")
+
+
+def particionada(conn, tabela):
+    tipo = conn.execute(
+        text("SELECT c.relkind FROM pg_class c WHERE c.oid = to_regclass(:t)"), {"t": tabela}
+    ).scalar()
+    return tipo == "p"
+
+
+def _existe(conn, nome):
+    return conn.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": nome}).scalar()
+
+
+def criar_particao(conn, tabela, mes):
+    """Cria a partição do mês (se faltar), movendo para ela as linhas do mês que estão na default."""
+    nome = _nome_particao(tabela, mes)
+    if _existe(conn, nome):
+        return False
+    de, ate = mes, _somar_meses(mes, 1)
+    conn.execute(text(
+        f"CREATE TABLE {nome} (LIKE {tabela} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    if _existe(conn, f"{tabela}_default"):
+        conn.execute(text(
+            f"WITH movidas AS (DELETE FROM {tabela}_default WHERE data >= :de AND data < :ate "
+            f"RETURNING *) INSERT INTO {nome} SELECT * FROM movidas"
+        ), {"de": de, "ate": ate})
+    conn.execute(text(
+        f"ALTER TABLE {tabela} ATTACH PARTITION {nome} FOR VALUES FROM ('{de}') TO ('{ate}')"
+    ))
+    return True
+
+
+def garantir_particoes(engine, meses_a_frente=MESES_A_FRENTE, hoje=None):
+    """Cria as partições do mês corrente até `meses_a_frente` meses adiante. Devolve as criadas."""
+    inicio = _inicio_mes(hoje or date.today())
+    criadas = []
+    with engine.begin() as conn:
+        _exigir_postgres(conn)
+        for tabela in TABELAS:
+            if not particionada(conn, tabela):
+                continue
+            for n in range(meses_a_frente + 1):
+                mes = _somar_meses(inicio, n)
+                if criar_particao(conn, tabela, mes):
+                    criadas.append(_nome_particao(tabela, mes))
+    return criadas
+
+
+def converter(engine, meses_a_frente=MESES_A_FRENTE):
+    """
+    Troca movimento_estoque e pagamento pelas versões particionadas, numa única
+    transação por tabela (a tabela fica bloqueada durante a cópia). Tabelas já
+    particionadas são puladas. Devolve {tabela: linhas copiadas}.
+    """
+    copiadas = {}
+    with engine.begin() as conn:
+        _exigir_postgres(conn)
+        # bancos criados antes do arquivamento: a coluna vem do models.py só em create_all
+        conn.execute(text("ALTER TABLE os ADD COLUMN IF NOT EXISTS arquivada boolean NOT NULL DEFAULT false"))
+    for tabela, (modelo, coluna_id) in TABELAS.items():
+        with engine.begin() as conn:
+            _exigir_postgres(conn)
+            if particionada(conn, tabela):
+                continue
+            conn.execute(text(f"LOCK TABLE {tabela} IN ACCESS EXCLUSIVE MODE"))
+            sequencia = conn.execute(
+                text("SELECT pg_get_serial_sequence(:t, :c)"), {"t": tabela, "c": coluna_id}
+            ).scalar()
+            if tabela == "pagamento":
+                # a chave de partição não pode ficar nula: pagamentos antigos sem data herdam a da OS
+                conn.execute(text(
+                    "UPDATE pagamento p SET data = o.data_abertura FROM os o "
+                    "WHERE p.id_os = o.id_os AND p.data IS NULL"
+                ))
+            novo = f"{tabela}_novo"
+            conn.execute(text(
+                f"CREATE TABLE {novo} (LIKE {tabela} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+                f"PARTITION BY RANGE (data)"
+            ))
+            conn.execute(text(f"ALTER TABLE {novo} ALTER COLUMN data SET NOT NULL"))
+
+            menor = conn.execute(text(f"SELECT min(data) FROM {tabela}")).scalar()
+            primeiro = _inicio_mes(menor or date.today())
+            ultimo = _somar_meses(_inicio_mes(date.today()), meses_a_frente)
+            mes = primeiro
+            while mes <= ultimo:
+                conn.execute(text(
+                    f"CREATE TABLE {_nome_particao(tabela, mes)} PARTITION OF {novo} "
+                    f"FOR VALUES FROM ('{mes}') TO ('{_somar_meses(mes, 1)}')"
+                ))
+                mes = _somar_meses(mes, 1)
+            conn.execute(text(f"CREATE TABLE {tabela}_default PARTITION OF {novo} DEFAULT"))
+
+            copiadas[tabela] = conn.execute(
+                text(f"INSERT INTO {novo} SELECT * FROM {tabela}")
+            ).rowcount
+
+            # a sequência pertence à coluna antiga: sem isso o DROP a levaria junto
+            if sequencia:
+                conn.execute(text(f"ALTER SEQUENCE {sequencia} OWNED BY NONE"))
+            conn.execute(text(f"DROP TABLE {tabela}"))
+            conn.execute(text(f"ALTER TABLE {novo} RENAME TO {tabela}"))
+            if sequencia:
+                conn.execute(text(f"ALTER SEQUENCE {sequencia} OWNED BY {tabela}.{coluna_id}"))
+
+            # índices e chaves depois da carga: criados no pai, descem para cada partição
+            conn.execute(text(f"ALTER TABLE {tabela} ADD PRIMARY KEY ({coluna_id}, data)"))
+            for fk in modelo.__table__.foreign_key_constraints:
+                conn.execute(AddConstraint(fk))
+            for indice in modelo.__table__.indexes:
+                conn.execute(CreateIndex(indice))
+            conn.execute(text(f"ANALYZE {tabela}"))
+    return copiadas
+
+
+def listar_particoes(engine):
+    """[{tabela, particao, limites, linhas_estimadas}] das tabelas particionadas."""
+    with engine.connect() as conn:
+        _exigir_postgres(conn)
+        linhas = conn.execute(text(
+            "SELECT pai.relname AS tabela, filho.relname AS particao, "
+            "pg_get_expr(filho.relpartbound, filho.oid) AS limites, "
+            "filho.reltuples::bigint AS linhas_estimadas "
+            "FROM pg_inherits i "
+            "JOIN pg_class pai ON pai.oid = i.inhparent "
+            "JOIN pg_class filho ON filho.oid = i.inhrelid "
+            "WHERE pai.relname IN ('movimento_estoque', 'pagamento') "
+            "ORDER BY pai.relname, filho.relname"
+        )).mappings().all()
+    return [dict(r) for r in linhas]
+
+
+def _remover_particao_vazia(conn, tabela, mes):
+    nome = _nome_particao(tabela, mes)
+    if not _existe(conn, nome):
+        return False
+    if conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {nome})")).scalar():
+        return False  # ainda há linhas de OS em aberto nesse mês
+    conn.execute(text(f"ALTER TABLE {tabela} DETACH PARTITION {nome}"))
+    conn.execute(text(f"DROP TABLE {nome}"))
+    return True
+
+
+# ---------------------------------------------------------------- arquivamento
+def _json(valor):
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def _filtro_arquivavel(modelo, de, ate):
+    """Linhas do mês cujas OS já foram encerradas (movimentos sem OS também entram)."""
+    os_encerrada = exists().where(OS.id_os == modelo.id_os, OS.status.in_(STATUS_ARQUIVAVEIS))
+    condicao = os_encerrada if modelo is Pagamento else or_(modelo.id_os.is_(None), os_encerrada)
+    return (modelo.data >= de) & (modelo.data < ate) & condicao
+
+
+def _gravar_arquivo(conn, tabela, modelo, filtro, mes):
+    """Grava as linhas num .jsonl.gz (tmp + rename) e devolve (caminho, linhas, ids de OS)."""
+    pasta = os.path.join(ARQUIVO_DIR, tabela)
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"{mes:%Y-%m}_{datetime.now():%Y%m%d%H%M%S%f}.jsonl.gz")
+    colunas = list(modelo.__table__.columns)
+    linhas, ids_os = 0, set()
+    resultado = conn.execution_options(stream_results=True, yield_per=LOTE).execute(
+        select(*colunas).where(filtro).order_by(modelo.data)
+    )
+    with gzip.open(caminho + ".tmp", "wt", encoding="utf-8") as f:
+        for linha in resultado:
+            registro = {c.name: _json(v) for c, v in zip(colunas, linha)}
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            linhas += 1
+            if registro["id_os"] is not None:
+                ids_os.add(registro["id_os"])
+    if not linhas:
+        os.remove(caminho + ".tmp")
+        return None, 0, ids_os
+    os.replace(caminho + ".tmp", caminho)
+    return caminho, linhas, ids_os
+
+
+def _data(valor):
+    if isinstance(valor, str):  # SQLite devolve texto em agregados de datetime
+        return datetime.fromisoformat(valor)
+    return valor
+
+
+def meses_arquivaveis(conn, meses_quentes=MESES_QUENTES, hoje=None):
+    """Meses fechados (anteriores à janela quente) entre a linha mais antiga e a mais nova deles."""
+    limite = _somar_meses(_inicio_mes(hoje or date.today()), -meses_quentes)
+    faixas = [
+        conn.execute(select(func.min(modelo.data), func.max(modelo.data)).where(modelo.data < limite)).one()
+        for modelo, _ in TABELAS.values()
+    ]
+    faixas = [(_data(menor), _data(maior)) for menor, maior in faixas if menor is not None]
+    if not faixas:
+        return []
+    mes, ultimo = _inicio_mes(min(f[0] for f in faixas)), _inicio_mes(max(f[1] for f in faixas))
+    meses = []
+    while mes <= ultimo:
+        meses.append(mes)
+        mes = _somar_meses(mes, 1)
+    return meses
+
+
+def arquivar_mes(engine, mes, simular=False):
+    """
+    Arquiva o mês `mes` das duas tabelas, uma transação por tabela. O arquivo é
+    gravado antes do DELETE; se o DELETE ou o commit falharem, ele é apagado e
+    as linhas continuam nas tabelas quentes para a próxima rodada.
+    """
+    de, ate = mes, _somar_meses(mes, 1)
+    resumo = {"mes": f"{mes:%Y-%m}", "tabelas": {}}
+    for tabela, (modelo, _) in TABELAS.items():
+        filtro = _filtro_arquivavel(modelo, de, ate)
+        if simular:
+            with engine.connect() as conn:
+                qtd = conn.execute(select(func.count()).select_from(modelo).where(filtro)).scalar()
+            resumo["tabelas"][tabela] = {"linhas": qtd}
+            continue
+        caminho = None
+        try:
+            with engine.begin() as conn:
+                caminho, linhas, ids_os = _gravar_arquivo(conn, tabela, modelo, filtro, mes)
+                if not linhas:
+                    resumo["tabelas"][tabela] = {"linhas": 0}
+                    continue
+                ids = sorted(ids_os)
+                for i in range(0, len(ids), LOTE):
+                    conn.execute(
+                        update(OS).where(OS.id_os.in_(ids[i:i + LOTE])).values(arquivada=True)
+                    )
+                apagadas = conn.execute(modelo.__table__.delete().where(filtro)).rowcount
+                if apagadas != linhas:
+                    # alguém escreveu no mês durante a cópia: desfaz e deixa para a próxima rodada
+                    raise ErroParticionamento(
+                        f"{tabela} {mes:%Y-%m}: {linhas} linhas arquivadas, {apagadas} apagadas", 409
+                    )
+                particao_removida = (
+                    conn.dialect.name == "postgresql" and particionada(conn, tabela)
+                    and _remover_particao_vazia(conn, tabela, mes)
+                )
+        except BaseException:
+            if caminho and os.path.exists(caminho):
+                os.remove(caminho)
+            raise
+        resumo["tabelas"][tabela] = {
+            "linhas": linhas, "arquivo": caminho, "os": len(ids),
+            "particao_removida": particao_removida,
+        }
+    return resumo
+
+
+def arquivar(engine, meses_quentes=MESES_QUENTES, simular=False, hoje=None):
+    with engine.connect() as conn:
+        meses = meses_arquivaveis(conn, meses_quentes, hoje)
+    resumos = [arquivar_mes(engine, mes, simular) for mes in meses]
+    return [r for r in resumos if any(t["linhas"] for t in r["tabelas"].values())]
+
+
+def consultar_arquivo(tabela, de=None, ate=None, id_os=None, id_peca=None, id_oficina=None,
+                      limite=LIMITE_CONSULTA):
+    """Lê os arquivos de `tabela` dos meses de..ate (AAAA-MM, inclusive) e filtra por OS/peça/oficina."""
+    if tabela not in TABELAS:
+        raise ErroParticionamento(f"tabela inválida: {tabela!r} (use {', '.join(TABELAS)})")
+    if id_peca is not None and tabela != "movimento_estoque":
+        raise ErroParticionamento("id_peca só se aplica a movimento_estoque")
+    de = f"{_mes(de):%Y-%m}" if de else None
+    ate = f"{_mes(ate):%Y-%m}" if ate else None
+    pasta = os.path.join(ARQUIVO_DIR, tabela)
+    arquivos = sorted(os.listdir(pasta)) if os.path.isdir(pasta) else []
+
+    linhas = []
+    for nome in arquivos:
+        mes = nome[:7]
+        if not nome.endswith(".jsonl.gz") or (de and mes < de) or (ate and mes > ate):
+            continue
+        with gzip.open(os.path.join(pasta, nome), "rt", encoding="utf-8") as f:
+            for texto in f:
+                registro = json.loads(texto)
+                if id_os is not None and registro["id_os"] != id_os:
+                    continue
+                if id_peca is not None and registro["id_peca"] != id_peca:
+                    continue
+                # arquivos de antes das oficinas não têm a coluna: são da oficina padrão
+                if id_oficina is not None and registro.get("id_oficina", oficina_corrente()) != id_oficina:
+                    continue
+                linhas.append(registro)
+                if len(linhas) >= limite:
+                    return linhas, True
+    return linhas, False
+
+
+# ---------------------------------------------------------------- manutenção automática
+_em_manutencao = set()
+
+
+def iniciar_manutencao(engine, meses_a_frente=MESES_A_FRENTE, intervalo_s=INTERVALO_MANUTENCAO_S):
+    """No Postgres, roda garantir_particoes agora e a cada intervalo_s numa thread daemon (uma por engine)."""
+    if engine.dialect.name != "postgresql" or id(engine) in _em_manutencao:
+        return None
+    _em_manutencao.add(id(engine))
+    parar = threading.Event()
+
+    def laco():
+        while True:
+            try:
+                criadas = garantir_particoes(engine, meses_a_frente)
+                if criadas:
+                    print(f"[particionamento] partições criadas: {', '.join(criadas)}")
+            except Exception as e:  # banco fora do ar não derruba o app; tenta de novo depois
+                print(f"[particionamento] falha ao garantir partições: {type(e).__name__}: {e}")
+            if parar.wait(intervalo_s):
+                return
+
+    threading.Thread(target=laco, name="particoes", daemon=True).start()
+    return parar
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Partições mensais e arquivamento de movimentos/pagamentos.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("converter", help="converte as tabelas para particionadas (Postgres)")
+    p.add_argument("-m", "--meses-a-frente", type=int, default=MESES_A_FRENTE)
+    p = sub.add_parser("garantir", help="cria as partições dos próximos meses (Postgres)")
+    p.add_argument("-m", "--meses-a-frente", type=int, default=MESES_A_FRENTE)
+    sub.add_parser("listar", help="lista as partições (Postgres)")
+    p = sub.add_parser("arquivar", help="arquiva os meses fechados")
+    p.add_argument("--meses-quentes", type=int, default=MESES_QUENTES)
+    p.add_argument("--simular", action="store_true", help="só conta as linhas, sem gravar nem apagar")
+    p = sub.add_parser("consultar", help="lê linhas arquivadas")
+    p.add_argument("tabela", choices=list(TABELAS))
+    p.add_argument("--de", help="AAAA-MM")
+    p.add_argument("--ate", help="AAAA-MM")
+    p.add_argument("--os", type=int)
+    p.add_argument("--peca", type=int)
+    p.add_argument("--oficina", type=int, help="só as linhas desta oficina")
+    p.add_argument("--limite", type=int, default=LIMITE_CONSULTA)
+    args = parser.parse_args()
+
+    try:
+        if args.comando == "converter":
+            for tabela, n in converter(engine, args.meses_a_frente).items():
+                print(f"[particionamento] {tabela}: {n} linhas copiadas para a tabela particionada")
+        elif args.comando == "garantir":
+            criadas = garantir_particoes(engine, args.meses_a_frente)
+            print(f"[particionamento] {len(criadas)} partições criadas {criadas}")
+        elif args.comando == "listar":
+            for r in listar_particoes(engine):
+                print(f"{r['particao']:32} {r['limites']:70} ~{r['linhas_estimadas']} linhas")
+        elif args.comando == "arquivar":
+            for resumo in arquivar(engine, args.meses_quentes, args.simular):
+                print(json.dumps(resumo, ensure_ascii=False))
+        else:
+            linhas, truncado = consultar_arquivo(args.tabela, args.de, args.ate, id_os=args.os, id_peca=args.peca,
+                                                 id_oficina=args.oficina, limite=args.limite)
+            for r in linhas:
+                print(json.dumps(r, ensure_ascii=False))
+            if truncado:
+                print(f"[particionamento] limite de {args.limite} linhas atingido")
+    except ErroParticionamento as e:
+        parser.exit(1, f"[particionamento] {e.mensagem}\n")
@@ -0,0 +1,293 @@
+# back-end/perfil.py
+"""
+Perfil de requisições sob demanda, sem debugger.
+
+Desligado por padrão. Com "perfil": {"ativo": true} no local_config.json:
+
+- Por requisição: ?__profile=<token> ou o cabeçalho X-Perfil: <token>, com o
+  "token" da seção. Sem token configurado nenhuma requisição é perfilada e as
+  rotas /api/debug de perfil respondem 403, como em consultas_lentas.py. Uma
+  thread amostra a pilha da thread da requisição a cada intervalo_ms e guarda
+  as pilhas no formato "collapsed" (flamegraph.pl, speedscope, inferno). A
+  resposta ganha Server-Timing com o tempo de banco (cursor), serialização
+  JSON, Python (o resto) e total, e X-Perfil-Id para baixar o perfil em
+  GET /api/debug/perfis/<id>. Os últimos MAX_PERFIS ficam em memória.
+- Amostragem global ("amostragem_global": true): uma thread amostra, a cada
+  intervalo_global_ms, só as threads que estão atendendo requisições e soma as
+  pilhas de todas elas (raiz = endpoint). Custo baixo, pensado para ficar
+  ligado: GET /api/debug/perfil-global devolve o acumulado.
+
+Configuração (padrões):
+    "perfil": {"ativo": false, "token": null, "intervalo_ms": 2,
+               "amostragem_global": false, "intervalo_global_ms": 20}
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import g, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+import database
+
+INTERVALO_MS = 2
+INTERVALO_GLOBAL_MS = 20
+MAX_PERFIS = 50
+MAX_PILHAS_GLOBAIS = 20_000
+PROFUNDIDADE_MAX = 128
+
+_local = threading.local()   # medições da requisição perfilada nesta thread
+_ids = itertools.count(1)
+_perfis = deque(maxlen=MAX_PERFIS)
+_lock = threading.Lock()
+
+
+def _rotulo(codigo):
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+def pilha_colapsada(frame, raiz):
+    nomes = []
+    while frame is not None and len(nomes) < PROFUNDIDADE_MAX:
+        nomes.append(_rotulo(frame.f_code))
+        frame = frame.f_back
+    nomes.append(raiz)
+    return ";".join(reversed(nomes))
+
+
+def texto_colapsado(contagem):
+    return "".join(f"{pilha} {n}\n" for pilha, n in contagem.most_common())
+
+
+class Amostrador(threading.Thread):
+    """Amostra periodicamente as threads devolvidas por `alvos()` -> {ident: raiz}."""
+
+    def __init__(self, alvos, intervalo_s, contagem, limite=None):
+        super().__init__(name="perfil-amostrador", daemon=True)
+        self.alvos = alvos
+        self.intervalo_s = intervalo_s
+        self.contagem = contagem
+        self.limite = limite
+        self.amostras = 0
+        self.lock = threading.Lock()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo_s):
+            frames = sys._current_frames()
+            for ident, raiz in list(self.alvos().items()):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                pilha = pilha_colapsada(frame, raiz)
+                with self.lock:
+                    if self.limite is None or pilha in self.contagem or len(self.contagem) < self.limite:
+                        self.contagem[pilha] += 1
+                    self.amostras += 1
+
+    def texto(self):
+        with self.lock:
+            return texto_colapsado(self.contagem)
+
+    def zerar(self):
+        with self.lock:
+            self.contagem.clear()
+            self.amostras = 0
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+class ProvedorJSONMedido(DefaultJSONProvider):
+    """jsonify de sempre, somando o tempo de serialização da requisição perfilada."""
+
+    def response(self, *args, **kwargs):
+        if not getattr(_local, "ativo", False):
+            return super().response(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return super().response(*args, **kwargs)
+        finally:
+            _local.serializacao += time.perf_counter() - inicio
+
+
+def _antes_cursor(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, "ativo", False):
+        _local.inicio_cursor = time.perf_counter()
+
+
+def _depois_cursor(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(_local, "inicio_cursor", None)
+    if inicio is not None:
+        _local.db += time.perf_counter() - inicio
+        _local.consultas += 1
+        _local.inicio_cursor = None
+
+
+def _caminho_sem_token():
+    args = "&".join(f"{k}={v}" for k, v in request.args.items(multi=True) if k != "__profile")
+    return f"{request.path}?{args}" if args else request.path
+
+
+def listar_perfis():
+    with _lock:
+        return [{k: v for k, v in p.items() if k != "pilhas"} for p in reversed(_perfis)]
+
+
+def obter_perfil(id_perfil):
+    with _lock:
+        return next((p for p in _perfis if p["id"] == id_perfil), None)
+
+
+def instrumentar(engine):
+    """Listeners que medem o tempo de banco da requisição com perfil (uma vez por engine)."""
+    if not event.contains(engine, "before_cursor_execute", _antes_cursor):
+        event.listen(engine, "before_cursor_execute", _antes_cursor)
+        event.listen(engine, "after_cursor_execute", _depois_cursor)
+
+
+def instalar(app, config=None):
+    """Liga o modo de perfil no app (nada acontece com "ativo": false).
+
+    O engine é instrumentado quando for criado (database.ao_criar_engine), não aqui.
+    """
+    config = config or {}
+    if not config.get("ativo", False):
+        return False
+
+    token = config.get("token")
+    intervalo_s = float(config.get("intervalo_ms", INTERVALO_MS)) / 1000
+    app.json = ProvedorJSONMedido(app)
+    database.ao_criar_engine(instrumentar)
+
+    em_requisicao = {}  # ident da thread -> endpoint (amostragem global)
+    app.extensions["perfil"] = {"token": token, "global": None}
+
+    def autorizado():
+        pedido = request.args.get("__profile") or request.headers.get("X-Perfil")
+        return token is not None and pedido == token
+
+    @app.before_request
+    def _iniciar_perfil():
+        em_requisicao[threading.get_ident()] = request.endpoint or request.path
+        if not autorizado():
+            return
+        _local.ativo = True
+        _local.db = _local.serializacao = 0.0
+        _local.consultas = 0
+        _local.inicio_cursor = None
+        g.perfil_inicio = time.perf_counter()
+        g.perfil_contagem = Counter()
+        ident = threading.get_ident()
+        raiz = request.endpoint or request.path
+        g.perfil_amostrador = Amostrador(lambda: {ident: raiz}, intervalo_s, g.perfil_contagem)
+        g.perfil_amostrador.start()
+
+    @app.after_request
+    def _finalizar_perfil(resposta):
+        if not getattr(_local, "ativo", False):
+            return resposta
+        _local.ativo = False
+        total = time.perf_counter() - g.perfil_inicio
+        g.perfil_amostrador.parar()
+        db, ser = _local.db, _local.serializacao
+        perfil = {
+            "id": next(_ids),
+            "quando": datetime.now().isoformat(timespec="milliseconds"),
+            "rota": f"{request.method} {_caminho_sem_token()}",
+            "endpoint": request.endpoint,
+            "status": resposta.status_code,
+            "total_ms": round(total * 1000, 2),
+            "db_ms": round(db * 1000, 2),
+            "consultas": _local.consultas,
+            "serializacao_ms": round(ser * 1000, 2),
+            "python_ms": round(max(total - db - ser, 0) * 1000, 2),
+            "amostras": g.perfil_amostrador.amostras,
+            "intervalo_ms": intervalo_s * 1000,
+            "pilhas": texto_colapsado(g.perfil_contagem),
+        }
+        with _lock:
+            _perfis.append(perfil)
+        resposta.headers["Server-Timing"] = (
+            f"db;dur={perfil['db_ms']}, serializacao;dur={perfil['serializacao_ms']}, "
+            f"python;dur={perfil['python_ms']}, total;dur={perfil['total_ms']}"
+        )
+        resposta.headers["X-Perfil-Id"] = str(perfil["id"])
+        return resposta
+
+    @app.teardown_request
+    def _sair_da_requisicao(_erro=None):
+        em_requisicao.pop(threading.get_ident(), None)
+        _local.ativo = False
+        amostrador = g.pop("perfil_amostrador", None)
+        if amostrador is not None and amostrador.is_alive():  # exceção antes do after_request
+            amostrador.parar()
+
+    if config.get("amostragem_global", False):
+        intervalo_global = float(config.get("intervalo_global_ms", INTERVALO_GLOBAL_MS)) / 1000
+        amostrador = Amostrador(lambda: em_requisicao, intervalo_global, Counter(),
+                                limite=MAX_PILHAS_GLOBAIS)
+        amostrador.name = "perfil-global"
+        amostrador.start()
+        app.extensions["perfil"]["global"] = amostrador
+    return True
+
+
+def rotas_debug(app):
+    """Rotas /api/debug/perfis e /api/debug/perfil-global (404 com o perfil desligado)."""
+
+    def estado():
+        return app.extensions.get("perfil")
+
+    def negar():
+        cfg = estado()
+        if cfg is None:
+            return jsonify({"erro": "perfil desativado (local_config.json)"}), 404
+        informado = request.args.get("token") or request.headers.get("X-Perfil")
+        if cfg["token"] is None or informado != cfg["token"]:
+            return jsonify({"erro": "token de perfil inválido (perfil.token)"}), 403
+        return None
+
+    @app.get("/api/debug/perfis")
+    def listar_perfis_rota():
+        return negar() or jsonify(listar_perfis())
+
+    @app.get("/api/debug/perfis/<int:id_perfil>")
+    def baixar_perfil(id_perfil):
+        erro = negar()
+        if erro:
+            return erro
+        perfil = obter_perfil(id_perfil)
+        if perfil is None:
+            return jsonify({"erro": "perfil não encontrado (só os últimos ficam em memória)"}), 404
+        if request.args.get("formato") == "json":
+            return jsonify(perfil)
+        return perfil["pilhas"], 200, {
+            "Content-Type": "text/plain; charset=utf-8",
+            "Content-Disposition": f"attachment; filename=perfil-{id_perfil}.folded",
+        }
+
+    @app.get("/api/debug/perfil-global")
+    def perfil_global():
+        erro = negar()
+        if erro:
+            return erro
+        cfg = estado()
+        if cfg["global"] is None:
+            return jsonify({"erro": "amostragem global desligada"}), 404
+        return cfg["global"].texto(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+    @app.delete("/api/debug/perfil-global")
+    def zerar_perfil_global():
+        erro = negar()
+        if erro:
+            return erro
+        if estado()["global"] is not None:
+            estado()["global"].zerar()
+        return jsonify({"ok": True})
@@ -0,0 +1,254 @@
+# back-end/reposicao.py
+"""
+Relatório de reposição (ponto de pedido) por velocidade de consumo.
+
+Para cada peça: consumo médio diário das saídas de MovimentoEstoque numa janela
+deslizante, dias de cobertura do estoque_atual e quantidade sugerida de compra,
+agrupados por Fornecedor (fornecedor_peca).
+
+O consumo fica em memória em baldes diários (dia -> peça -> qtd). Cada
+atualização relê as saídas com id_movimento acima de (último visto -
+MARGEM_IDS), uma a uma, e soma só as que ainda não foram contadas: no Postgres
+transações concorrentes podem confirmar ids fora de ordem, e um movimento com
+id menor que o último visto que aparece depois ainda entra, se estiver dentro
+da margem. Os dias que saíram da janela são descartados. De tempos em tempos os
+baldes são reconstruídos do zero (pega exclusões, correções e atrasos maiores
+que a margem), com a parte antiga já agregada por dia/peça no banco. Uma thread atualiza o resultado periodicamente e a rota devolve
+o último resultado pronto, sem consultar o banco.
+
+Cada oficina tem o seu relatório e a sua thread (RelatoriosPorOficina), criados
+no primeiro pedido dela; as consultas rodam com usar_oficina (filtro de oficinas.py).
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from database import usar_oficina
+from models import Peca, Fornecedor, MovimentoEstoque, TipoMovimento, fornecedor_peca
+
+JANELA_DIAS = 30
+LEAD_TIME_DIAS = 7            # prazo típico de entrega do fornecedor
+COBERTURA_ALVO_DIAS = 30      # estoque desejado após a compra chegar
+INTERVALO_ATUALIZACAO_S = 300
+RECONSTRUIR_A_CADA = 12       # atualizações incrementais entre reconstruções completas
+MARGEM_IDS = 1000             # ids abaixo do último visto relidos a cada atualização
+
+
+def _dia(valor):
+    # func.date() devolve date no Postgres e texto no SQLite
+    return str(valor)[:10]
+
+
+def calcular(estoques, consumo_por_peca, fornecedores_por_peca, janela_dias,
+             lead_time_dias=LEAD_TIME_DIAS, cobertura_alvo_dias=COBERTURA_ALVO_DIAS):
+    """Monta o relatório a partir dos agregados (sem acesso ao banco)."""
+    grupos = {}
+    for id_peca, (sku, descricao, estoque) in estoques.items():
+        consumo = consumo_por_peca.get(id_peca, 0)
+        media = consumo / janela_dias
+        ponto_pedido = media * lead_time_dias
+        alerta = media > 0 and estoque <= ponto_pedido
+        sugestao = max(0, math.ceil(media * (lead_time_dias + cobertura_alvo_dias) - estoque))
+        item = {
+            "id_peca": id_peca,
+            "sku": sku,
+            "descricao": descricao,
+            "estoque_atual": estoque,
+            "consumo_janela": consumo,
+            "media_diaria": round(media, 3),
+            "dias_cobertura": round(estoque / media, 1) if media else None,
+            "ponto_pedido": math.ceil(ponto_pedido),
+            "sugestao_compra": sugestao,
+            "alerta": alerta,
+        }
+        for fornecedor in fornecedores_por_peca.get(id_peca) or [(None, "Sem fornecedor")]:
+            grupo = grupos.setdefault(fornecedor[0], {
+                "id_fornecedor": fornecedor[0],
+                "nome_razao": fornecedor[1],
+                "itens": [],
+            })
+            grupo["itens"].append(item)
+
+    resultado = []
+    for grupo in grupos.values():
+        # menor cobertura primeiro; peças paradas (sem consumo) por último
+        grupo["itens"].sort(key=lambda i: (i["dias_cobertura"] is None, i["dias_cobertura"] or 0))
+        grupo["total_sugerido"] = sum(i["sugestao_compra"] for i in grupo["itens"])
+        resultado.append(grupo)
+    resultado.sort(key=lambda g: (g["id_fornecedor"] is None, -g["total_sugerido"]))
+    return resultado
+
+
+def carregar_cadastro(db):
+    """Estoque atual e fornecedores de todas as peças (duas consultas simples)."""
+    estoques = {
+        r.id_peca: (r.sku, r.descricao, r.estoque_atual)
+        for r in db.execute(select(Peca.id_peca, Peca.sku, Peca.descricao, Peca.estoque_atual))
+    }
+    fornecedores = defaultdict(list)
+    for r in db.execute(
+        select(fornecedor_peca.c.id_peca, Fornecedor.id_fornecedor, Fornecedor.nome_razao)
+        .join(Fornecedor, Fornecedor.id_fornecedor == fornecedor_peca.c.id_fornecedor)
+    ):
+        fornecedores[r.id_peca].append((r.id_fornecedor, r.nome_razao))
+    return estoques, fornecedores
+
+
+def consumo_direto(db, janela_dias, agora=None):
+    """Consumo por peça na janela, agregado num único SELECT (janelas fora do cache)."""
+    inicio = (agora or datetime.now()) - timedelta(days=janela_dias)
+    return dict(db.execute(
+        select(MovimentoEstoque.id_peca, func.sum(MovimentoEstoque.qtd))
+        .where(MovimentoEstoque.tipo == TipoMovimento.saida, MovimentoEstoque.data >= inicio)
+        .group_by(MovimentoEstoque.id_peca)
+    ).all())
+
+
+def montar_resposta(grupos, janela_dias, gerado_em, somente_alertas=False):
+    if somente_alertas:
+        filtrados = []
+        for g in grupos:
+            itens = [i for i in g["itens"] if i["alerta"]]
+            if itens:
+                filtrados.append({**g, "itens": itens,
+                                  "total_sugerido": sum(i["sugestao_compra"] for i in itens)})
+        grupos = filtrados
+    return {
+        "gerado_em": gerado_em.isoformat(),
+        "janela_dias": janela_dias,
+        "fornecedores": grupos,
+    }
+
+
+def relatorio_direto(db, janela_dias, somente_alertas=False):
+    """Relatório sob demanda para uma janela diferente da mantida em cache."""
+    agora = datetime.now()
+    estoques, fornecedores = carregar_cadastro(db)
+    grupos = calcular(estoques, consumo_direto(db, janela_dias, agora), fornecedores, janela_dias)
+    return montar_resposta(grupos, janela_dias, agora, somente_alertas)
+
+
+class RelatorioReposicao:
+    """Consumo diário em memória + último relatório pronto, atualizados incrementalmente."""
+
+    def __init__(self, session_factory, janela_dias=JANELA_DIAS,
+                 intervalo_s=INTERVALO_ATUALIZACAO_S, reconstruir_a_cada=RECONSTRUIR_A_CADA,
+                 id_oficina=None):
+        self.session_factory = session_factory
+        self.id_oficina = id_oficina
+        self.janela_dias = janela_dias
+        self.intervalo_s = intervalo_s
+        self.reconstruir_a_cada = reconstruir_a_cada
+        self._lock = threading.Lock()
+        self._baldes = defaultdict(lambda: defaultdict(int))  # "YYYY-MM-DD" -> id_peca -> qtd
+        self._ultimo_id = 0
+        self._contados = set()  # ids acima de _ultimo_id - MARGEM_IDS já somados nos baldes
+        self._atualizacoes = 0
+        self._resultado = None
+        self._gerado_em = None
+        self._thread = None
+
+    def _saidas(self, agora):
+        return (
+            MovimentoEstoque.tipo == TipoMovimento.saida,
+            MovimentoEstoque.data >= agora - timedelta(days=self.janela_dias),
+        )
+
+    def _buscar_agregado(self, db, agora, ate_id):
+        """Saídas com id_movimento <= ate_id, agregadas por dia/peça (reconstrução)."""
+        dia = func.date(MovimentoEstoque.data)
+        return db.execute(
+            select(dia.label("dia"), MovimentoEstoque.id_peca, func.sum(MovimentoEstoque.qtd).label("qtd"))
+            .where(*self._saidas(agora), MovimentoEstoque.id_movimento <= ate_id)
+            .group_by(dia, MovimentoEstoque.id_peca)
+        ).all()
+
+    def _buscar_recentes(self, db, agora, acima_de):
+        """Saídas com id_movimento > acima_de, uma por linha (para descartar as já contadas)."""
+        return db.execute(
+            select(MovimentoEstoque.id_movimento, MovimentoEstoque.data,
+                   MovimentoEstoque.id_peca, MovimentoEstoque.qtd)
+            .where(*self._saidas(agora), MovimentoEstoque.id_movimento > acima_de)
+        ).all()
+
+    def atualizar(self, db):
+        agora = datetime.now()
+        with self._lock:
+            if self._atualizacoes % self.reconstruir_a_cada == 0:
+                self._baldes.clear()
+                self._contados.clear()
+                teto = db.execute(select(func.max(MovimentoEstoque.id_movimento))).scalar() or 0
+                piso = max(0, teto - MARGEM_IDS)
+                for r in self._buscar_agregado(db, agora, piso):
+                    self._baldes[_dia(r.dia)][r.id_peca] += int(r.qtd)
+                self._ultimo_id = piso
+            else:
+                piso = max(0, self._ultimo_id - MARGEM_IDS)
+            for r in self._buscar_recentes(db, agora, piso):
+                self._ultimo_id = max(self._ultimo_id, r.id_movimento)
+                if r.id_movimento in self._contados:
+                    continue
+                self._contados.add(r.id_movimento)
+                self._baldes[_dia(r.data)][r.id_peca] += int(r.qtd)
+            limite = self._ultimo_id - MARGEM_IDS  # abaixo disso não é relido: não precisa lembrar
+            self._contados = {i for i in self._contados if i > limite}
+
+            primeiro_dia = _dia((agora - timedelta(days=self.janela_dias)).date())
+            for dia in [d for d in self._baldes if d < primeiro_dia]:
+                del self._baldes[dia]
+
+            consumo = defaultdict(int)
+            for por_peca in self._baldes.values():
+                for id_peca, qtd in por_peca.items():
+                    consumo[id_peca] += qtd
+
+            estoques, fornecedores = carregar_cadastro(db)
+            self._resultado = calcular(estoques, consumo, fornecedores, self.janela_dias)
+            self._gerado_em = agora
+            self._atualizacoes += 1
+
+    def resultado(self, somente_alertas=False):
+        """Último relatório pronto (calcula na hora só se ainda não houver nenhum)."""
+        if self._resultado is None:
+            with usar_oficina(self.id_oficina), self.session_factory() as db:
+                self.atualizar(db)
+            self.iniciar_agendador()
+        return montar_resposta(self._resultado, self.janela_dias, self._gerado_em, somente_alertas)
+
+    def iniciar_agendador(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._laco, name="reposicao", daemon=True)
+        self._thread.start()
+
+    def _laco(self):
+        while True:
+            time.sleep(self.intervalo_s)
+            try:
+                with usar_oficina(self.id_oficina), self.session_factory() as db:
+                    self.atualizar(db)
+            except Exception as e:  # não derruba a thread: tenta de novo no próximo ciclo
+                print(f"[reposicao] falha ao atualizar: {e}")
+
+
+class RelatoriosPorOficina:
+    """Um RelatorioReposicao por oficina, criado (com a sua thread) no primeiro pedido dela."""
+
+    def __init__(self, session_factory, **opcoes):
+        self.session_factory = session_factory
+        self.opcoes = opcoes
+        self.janela_dias = opcoes.get("janela_dias", JANELA_DIAS)
+        self._relatorios = {}
+        self._lock = threading.Lock()
+
+    def da_oficina(self, id_oficina):
+        with self._lock:
+            relatorio = self._relatorios.get(id_oficina)
+            if relatorio is None:
+                relatorio = self._relatorios[id_oficina] = RelatorioReposicao(
+                    self.session_factory, id_oficina=id_oficina, **self.opcoes)
+        return relatorio
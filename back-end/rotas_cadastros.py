@@ -0,0 +1,460 @@
+# back-end/rotas_cadastros.py
+"""
+Blueprint "cadastros": carga inicial, busca, listagens e cadastros, agendamentos,
+ordens de serviço e /api/eventos. É o que o front usa no dia a dia; não importa
+nada dos relatórios (numpy, pyarrow, jobs).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+
+from database import SessionLocal, db_sess, oficina_atual, usar_oficina
+from models import Cliente, Veiculo, Funcionario, Servico, Peca, OS, Agendamento, StatusAgendamento, Fornecedor
+import busca
+import consultas
+import eventos
+import importacao
+import ordens
+from consultas import (
+    dados_pecas, dados_funcionarios, dados_clientes, dados_veiculos,
+    dados_servicos, dados_agendamentos, dados_fornecedores, dados_movimentos,
+)
+
+bp = Blueprint("cadastros", __name__)
+
+# Nome do dataset == caminho da listagem, assim o front mapeia "/clientes" -> "clientes"
+DATASETS_BOOTSTRAP = {
+    "veiculos": dados_veiculos,
+    "clientes": dados_clientes,
+    "servicos": dados_servicos,
+    "pecas": dados_pecas,
+    "funcionarios": dados_funcionarios,
+    "fornecedores": dados_fornecedores,
+    "agendamentos": dados_agendamentos,
+    "movimentos-estoque": dados_movimentos,
+}
+# movimentos-estoque fica de fora por padrão: cresce sem limite
+BOOTSTRAP_PADRAO = (
+    "veiculos", "clientes", "servicos", "pecas",
+    "funcionarios", "fornecedores", "agendamentos",
+)
+
+def _carregar_dataset_isolado(nome, oficina):
+    # Session não é thread-safe: no modo paralelo cada dataset usa a sua;
+    # a thread do pool não herda a oficina da requisição
+    with usar_oficina(oficina), SessionLocal() as db:
+        return DATASETS_BOOTSTRAP[nome](db)
+
+# -------- Carga inicial do front em uma requisição --------
+# GET /api/bootstrap?datasets=clientes,servicos&paralelo=1
+@bp.get("/api/bootstrap")
+def bootstrap():
+    pedidos = request.args.get("datasets")
+    if pedidos:
+        nomes = list(dict.fromkeys(n.strip() for n in pedidos.split(",") if n.strip()))
+    else:
+        nomes = list(BOOTSTRAP_PADRAO)
+
+    invalidos = [n for n in nomes if n not in DATASETS_BOOTSTRAP]
+    if invalidos:
+        return jsonify({
+            "erro": f"datasets desconhecidos: {', '.join(invalidos)}",
+            "disponiveis": sorted(DATASETS_BOOTSTRAP)
+        }), 400
+
+    if request.args.get("paralelo", type=int) and len(nomes) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(nomes), 8)) as pool:
+            oficina = oficina_atual.get()
+            resultados = dict(zip(nomes, pool.map(_carregar_dataset_isolado, nomes, [oficina] * len(nomes))))
+    else:
+        # padrão: uma sessão e um checkout do pool para todos os datasets
+        with SessionLocal() as db:
+            resultados = {nome: DATASETS_BOOTSTRAP[nome](db) for nome in nomes}
+
+    return jsonify(resultados)
+
+# -------- Busca por nome/CPF/placa/SKU (índices trigram no Postgres, FTS5 no SQLite) --------
+# GET /api/busca?q=silva&tipos=cliente,veiculo&limite=20
+@bp.get("/api/busca")
+def buscar():
+    termo = (request.args.get("q") or "").strip()
+    if not termo:
+        return jsonify({"erro": "informe q"}), 400
+    tipos = request.args.get("tipos")
+    limite = request.args.get("limite", default=busca.LIMITE_PADRAO, type=int)
+    db = next(db_sess())
+    return jsonify(busca.buscar(
+        db, termo, limite=limite,
+        tipos=[t.strip() for t in tipos.split(",")] if tipos else None,
+    ))
+
+# -------- Listagens simples --------
+# Sem parâmetros: lista inteira. ?limite=100&offset=200&q=filtro: página
+# {"itens", "offset", "limite", "total"} (total só no offset 0), ver consultas._listar.
+# GET /api/veiculos?limite=100&offset=0&q=gol
+def _pagina():
+    return {
+        "termo": request.args.get("q"),
+        "limite": request.args.get("limite", type=int),
+        "offset": request.args.get("offset", default=0, type=int),
+    }
+
+@bp.get("/api/pecas")
+def listar_pecas():
+    db = next(db_sess())
+    return jsonify(dados_pecas(db, **_pagina()))
+
+@bp.get("/api/funcionarios")
+def listar_funcionarios():
+    db = next(db_sess())
+    return jsonify(dados_funcionarios(db, **_pagina()))
+
+@bp.get("/api/clientes")
+def listar_clientes():
+    db = next(db_sess())
+    return jsonify(dados_clientes(db, **_pagina()))
+
+@bp.get("/api/veiculos")
+def listar_veiculos():
+    db = next(db_sess())
+    return jsonify(dados_veiculos(db, **_pagina()))
+
+@bp.post("/api/veiculos")
+def criar_veiculo():
+    db = next(db_sess())
+    data = request.get_json(force=True)
+
+    placa = (data.get("placa") or "").strip().upper()
+    id_cliente = data.get("id_cliente")
+
+    if not placa or not id_cliente:
+        return jsonify({"erro": "placa e id_cliente são obrigatórios"}), 400
+
+    # Verifica se cliente existe
+    cliente = db.query(Cliente).get(id_cliente)
+    if not cliente:
+        return jsonify({"erro": "cliente não encontrado"}), 404
+
+    # Garante placa única
+    ja_existe = db.query(Veiculo).filter_by(placa=placa).first()
+    if ja_existe:
+        return jsonify({"erro": "já existe veículo com essa placa"}), 409
+
+    v = Veiculo(
+        placa=placa,
+        chassi=(data.get("chassi") or "").strip(),
+        km_atual=data.get("km_atual") or 0,
+        marca=(data.get("marca") or "").strip(),
+        modelo=(data.get("modelo") or "").strip(),
+        id_cliente=id_cliente,
+    )
+    db.add(v)
+    db.commit()
+    db.refresh(v)
+
+    return jsonify({
+        "id_veiculo": v.id_veiculo,
+        "placa": v.placa,
+        "marca": v.marca,
+        "modelo": v.modelo,
+        "km_atual": v.km_atual,
+        "cliente": {
+            "id": v.cliente.id_cliente,
+            "nome": v.cliente.nome_razao
+        }
+    }), 201
+
+
+@bp.get("/api/servicos")
+def listar_servicos():
+    db = next(db_sess())
+    return jsonify(dados_servicos(db, **_pagina()))
+
+
+# -------- Atualizações ao vivo (ver eventos.py) --------
+# GET /api/eventos?oficina=2  (text/event-stream; o EventSource reenvia Last-Event-ID ao reconectar)
+@bp.get("/api/eventos")
+def stream_eventos():
+    central = current_app.extensions.get("eventos")
+    if central is None:
+        return jsonify({"erro": "atualizações ao vivo desativadas"}), 404
+    ultimo_id = request.headers.get("Last-Event-ID") or request.args.get("ultimo_id")
+    try:
+        corpo = eventos.fluxo(central, ultimo_id, oficina_atual.get())
+    except eventos.ErroEventos as e:
+        # o EventSource não reconecta depois de um 503: o front fica no cache por TTL
+        return jsonify({"erro": e.mensagem}), e.status
+    return Response(
+        stream_with_context(corpo),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# -------- (3.2) Agendar serviço (evita conflito de horário) --------
+# GET /api/agendamentos
+@bp.get("/api/agendamentos")
+def listar_agendamentos():
+    db = next(db_sess())
+    return jsonify(dados_agendamentos(db, **_pagina()))
+
+
+# POST /api/agendamentos
+@bp.post("/api/agendamentos")
+def criar_agendamento():
+    db = next(db_sess())
+    payload = request.get_json(force=True) or {}
+
+    try:
+        id_cliente = int(payload["id_cliente"])
+        id_veiculo = int(payload["id_veiculo"])
+        id_servico = int(payload["id_servico"])
+        data_str   = payload["data_hora"]
+
+        # Normaliza datetime-local do HTML (YYYY-MM-DDTHH:MM)
+        if isinstance(data_str, str):
+            if len(data_str) == 16:            # 2025-12-22T18:30
+                data_str += ":00"
+            data_hora = datetime.fromisoformat(data_str)
+        else:
+            data_hora = data_str
+
+    except Exception:
+        return jsonify({
+            "erro": "JSON inválido. Campos obrigatórios: id_cliente, id_veiculo, id_servico, data_hora ISO"
+        }), 400
+
+    # Confere se o veículo pertence ao cliente
+    veic = db.query(Veiculo).get(id_veiculo)
+    if not veic or veic.id_cliente != id_cliente:
+        return jsonify({"erro": "veículo não pertence ao cliente informado"}), 400
+
+    # Conflito de horário (mesmo veículo, mesma data/hora, ignorando cancelados)
+    conflito = db.query(Agendamento).filter(
+        Agendamento.id_veiculo == id_veiculo,
+        Agendamento.data_hora == data_hora,
+        Agendamento.status != StatusAgendamento.cancelado
+    ).first()
+
+    if conflito:
+        return jsonify({"erro": "conflito de horário para este veículo"}), 409
+
+    novo = Agendamento(
+        id_cliente=id_cliente,
+        id_veiculo=id_veiculo,
+        id_servico=id_servico,
+        data_hora=data_hora
+    )
+    db.add(novo)
+    # lembretes (e-mail/SMS) vão para o outbox na mesma transação; o envio é do lembretes.py
+    despachante = current_app.extensions.get("lembretes")
+    if despachante is not None:
+        despachante.enfileirar(db, novo)
+    db.commit()
+    db.refresh(novo)
+
+    return jsonify({
+        "id_agendamento": novo.id_agendamento,
+        "status": novo.status.value
+    }), 201
+
+@bp.get("/api/clientes/<int:id_cliente>/veiculos")
+def listar_veiculos_de_cliente(id_cliente):
+    db = next(db_sess())
+
+    # garante que o cliente existe
+    cliente = db.query(Cliente).get(id_cliente)
+    if not cliente:
+        return jsonify({"erro": "cliente não encontrado"}), 404
+
+    veiculos = (
+        db.query(Veiculo)
+        .filter(Veiculo.id_cliente == id_cliente)
+        .order_by(Veiculo.placa)
+        .all()
+    )
+
+    return jsonify([
+        {
+            "id": v.id_veiculo,
+            "placa": v.placa,
+            "marca": v.marca,
+            "modelo": v.modelo,
+        }
+        for v in veiculos
+    ])
+
+# Listar fornecedores
+@bp.get("/api/fornecedores")
+def listar_fornecedores():
+    db = next(db_sess())
+    return jsonify(dados_fornecedores(db, **_pagina()))
+
+# Listar movimentos de estoque (com filtros opcionais)
+# /api/movimentos-estoque?os_id=1&id_peca=3&limite=100&offset=0&q=filtro
+@bp.get("/api/movimentos-estoque")
+def listar_movimentos():
+    db = next(db_sess())
+    return jsonify(dados_movimentos(
+        db,
+        os_id=request.args.get("os_id", type=int),
+        peca_id=request.args.get("id_peca", type=int),
+        **_pagina(),
+    ))
+
+# -------- Ordens de serviço (abertura, itens, pagamentos, status) --------
+# POST /api/os
+# {"id_veiculo": 1, "id_responsavel": 2, "km_entrada": 81000, "problema_relatado": "...",
+#  "itens_servico": [{"id_servico": 1, "qtd": 1, "valor_unit": 120}],
+#  "itens_peca": [{"id_peca": 3, "qtd": 2, "valor_unit": 60}],
+#  "pagamentos": [{"forma": "Pix", "valor": 100}]}
+@bp.post("/api/os")
+def criar_os():
+    db = next(db_sess())
+    dados = request.get_json(force=True) or {}
+    try:
+        os_nova = ordens.criar_os(db, dados)
+        db.commit()
+    except ordens.ErroOS as e:
+        db.rollback()
+        return jsonify({"erro": e.mensagem}), e.status
+    return jsonify(consultas.dados_os(db, os_nova.id_os)), 201
+
+@bp.get("/api/os/<int:id_os>")
+def detalhar_os(id_os):
+    db = next(db_sess())
+    data = consultas.dados_os(db, id_os)
+    if data is None:
+        return jsonify({"erro": "OS não encontrada"}), 404
+    return jsonify(data)
+
+# POST /api/os/5/itens  {"itens_servico": [...], "itens_peca": [...]}
+# POST /api/os/5/pagamentos  {"pagamentos": [{"forma": "Pix", "valor": 50}]}
+@bp.post("/api/os/<int:id_os>/itens")
+@bp.post("/api/os/<int:id_os>/pagamentos")
+def adicionar_itens_os(id_os):
+    db = next(db_sess())
+    dados = request.get_json(force=True) or {}
+    os_atual = db.get(OS, id_os)
+    if not os_atual:
+        return jsonify({"erro": "OS não encontrada"}), 404
+    so_pagamentos = request.path.endswith("/pagamentos")
+    try:
+        ordens.adicionar_itens(
+            db, os_atual,
+            itens_servico=[] if so_pagamentos else dados.get("itens_servico") or [],
+            itens_peca=[] if so_pagamentos else dados.get("itens_peca") or [],
+            pagamentos=dados.get("pagamentos") or [],
+        )
+        db.commit()
+    except ordens.ErroOS as e:
+        db.rollback()
+        return jsonify({"erro": e.mensagem}), e.status
+    return jsonify(consultas.dados_os(db, id_os)), 201
+
+# PATCH /api/os/5/status  {"status": "em_execucao"}
+@bp.patch("/api/os/<int:id_os>/status")
+def mudar_status_os(id_os):
+    db = next(db_sess())
+    dados = request.get_json(force=True) or {}
+    os_atual = db.get(OS, id_os)
+    if not os_atual:
+        return jsonify({"erro": "OS não encontrada"}), 404
+    try:
+        ordens.mudar_status(os_atual, dados.get("status"))
+        db.commit()
+    except ordens.ErroOS as e:
+        db.rollback()
+        return jsonify({"erro": e.mensagem}), e.status
+    return jsonify({"id_os": id_os, "status": os_atual.status.value})
+
+# Fechamento em lote (ex.: fim do dia): um único UPDATE ... WHERE id_os IN (...)
+# POST /api/os/status  {"ids": [1, 2, 3], "status": "finalizado"}
+@bp.post("/api/os/status")
+def mudar_status_os_em_lote():
+    db = next(db_sess())
+    dados = request.get_json(force=True) or {}
+    try:
+        atualizadas, ignoradas = ordens.mudar_status_em_lote(db, dados.get("ids") or [], dados.get("status"))
+        db.commit()
+    except (TypeError, ValueError):
+        db.rollback()
+        return jsonify({"erro": "ids deve ser uma lista de inteiros"}), 400
+    except ordens.ErroOS as e:
+        db.rollback()
+        return jsonify({"erro": e.mensagem}), e.status
+    return jsonify({
+        "status": dados.get("status"),
+        "atualizadas": atualizadas,
+        "ignoradas": ignoradas,
+    })
+
+@bp.post("/api/clientes")
+def criar_cliente():
+    db = next(db_sess())
+    dados = request.get_json()
+    cli = Cliente(
+        nome_razao=dados["nome_razao"],
+        cpf_cnpj=dados["cpf_cnpj"],
+        telefone=dados["telefone"],
+        email=dados.get("email")
+    )
+    db.add(cli)
+    db.commit()
+    db.refresh(cli)
+    return jsonify({"id_cliente": cli.id_cliente}), 201
+
+@bp.post("/api/funcionarios")
+def criar_funcionario():
+    db = next(db_sess())
+    d = request.get_json()
+    f = Funcionario(nome=d["nome"], funcao=d.get("funcao"))
+    db.add(f); db.commit(); db.refresh(f)
+    return jsonify({"id_funcionario": f.id_funcionario}), 201
+
+@bp.post("/api/servicos")
+def criar_servico():
+    db = next(db_sess())
+    d = request.get_json()
+    s = Servico(descricao=d["descricao"], preco_padrao=d.get("preco_padrao"))
+    db.add(s); db.commit(); db.refresh(s)
+    return jsonify({"id_servico": s.id_servico}), 201
+
+@bp.post("/api/pecas")
+def criar_peca():
+    db = next(db_sess())
+    d = request.get_json()
+    p = Peca(
+        sku=d["sku"], descricao=d["descricao"],
+        origem=d["origem"], estoque_atual=d.get("estoque_atual", 0)
+    )
+    db.add(p); db.commit(); db.refresh(p)
+    return jsonify({"id_peca": p.id_peca}), 201
+
+# Importação em massa do catálogo / tabela de preços (ver importacao.py)
+# POST /api/pecas/importar?id_fornecedor=3   corpo: CSV puro ou multipart com o campo "arquivo"
+@bp.post("/api/pecas/importar")
+def importar_pecas():
+    db = next(db_sess())
+    enviado = request.files.get("arquivo")
+    stream = enviado.stream if enviado else request.stream
+    try:
+        relatorio = importacao.importar(
+            db, importacao.abrir_texto(stream),
+            id_fornecedor=request.args.get("id_fornecedor", type=int),
+        )
+    except importacao.ErroImportacao as e:
+        db.rollback()
+        return jsonify({"erro": e.mensagem}), e.status
+    except UnicodeDecodeError:
+        db.rollback()
+        return jsonify({"erro": "o arquivo deve estar em UTF-8"}), 400
+    return jsonify(relatorio)
+
+@bp.post("/api/fornecedores")
+def criar_fornecedor():
+    db = next(db_sess())
+    d = request.get_json()
+    f = Fornecedor(nome_razao=d["nome_razao"], cpf_cnpj=d.get("cpf_cnpj"))
+    db.add(f); db.commit(); db.refresh(f)
+    return jsonify({"id_fornecedor": f.id_fornecedor}), 201
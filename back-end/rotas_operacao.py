@@ -0,0 +1,49 @@
+# back-end/rotas_operacao.py
+"""
+Blueprint "operacao": saúde (balanceador/monitoramento) e diagnóstico. Sempre
+registrado por create_app, quaisquer que sejam os outros blueprints.
+"""
+from flask import Blueprint, current_app, jsonify, request
+
+from database import get_engine
+import consultas_lentas
+import saude
+
+bp = Blueprint("operacao", __name__)
+
+# -------- Saúde (balanceador de carga / monitoramento), ver saude.py --------
+@bp.get('/api/health/live')
+def health_live():
+    return jsonify({"status": "ok"})
+
+@bp.get('/api/health/ready')
+def health_ready():
+    pronto, corpo = saude.prontidao(get_engine())
+    return jsonify(corpo), (200 if pronto else 503)
+
+# compatibilidade: formato antigo {"app": true, "db": true}
+@bp.get('/api/health')
+def health_check():
+    ok, _, _ = saude.verificar_banco(get_engine())
+    return jsonify({"app": True, "db": ok})
+
+# -------- Diagnóstico: consultas lentas (ver consultas_lentas.py) --------
+def _negar_consultas_lentas():
+    if consultas_lentas.registro is None:
+        return jsonify({"erro": "registro de consultas lentas desativado"}), 404
+    informado = request.args.get("token") or request.headers.get("X-Debug-Token")
+    if not consultas_lentas.autorizado(current_app.extensions.get("consultas_lentas"), informado):
+        return jsonify({"erro": "token de diagnóstico inválido (consultas_lentas.token)"}), 403
+    return None
+
+@bp.get('/api/debug/slow-queries')
+def listar_consultas_lentas():
+    return _negar_consultas_lentas() or jsonify(consultas_lentas.registro.dados())
+
+@bp.delete('/api/debug/slow-queries')
+def limpar_consultas_lentas():
+    erro = _negar_consultas_lentas()
+    if erro:
+        return erro
+    consultas_lentas.registro.limpar()
+    return jsonify({"ok": True})
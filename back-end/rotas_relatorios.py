@@ -0,0 +1,271 @@
+# back-end/rotas_relatorios.py
+"""
+Blueprint "relatorios": /api/relatorios/*, /api/reports/*, exportação,
+jobs e consulta ao arquivo. Worker que só atende cadastros pode subir sem ele
+(create_app(blueprints=("cadastros",))) e não carrega numpy/pyarrow/jobs.
+"""
+import os
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request, jsonify, send_file, stream_with_context
+
+from database import SessionLocal, db_sess, engine_da_oficina, oficina_atual
+import carga_trabalho
+import consultas
+import exportacao
+import jobs
+import particionamento
+import reposicao
+
+bp = Blueprint("relatorios", __name__)
+
+# -------- (3.1) Peças danificadas por veículo + origem --------
+# GET /api/relatorios/pecas-danificadas?veiculo_id=123
+@bp.get("/api/relatorios/pecas-danificadas")
+def pecas_danificadas_por_veiculo():
+    veiculo_id = request.args.get("veiculo_id", type=int)
+    if not veiculo_id:
+        return jsonify({"erro": "informe veiculo_id"}), 400
+    db = next(db_sess())
+
+    data = consultas.dados_pecas_danificadas(db, veiculo_id)
+    if data is None:
+        return jsonify({"erro": "veículo não encontrado"}), 404
+    return jsonify(data)
+
+# -------- (3.3) Histórico de manutenção por veículo --------
+
+@bp.get("/api/relatorios/historico-veiculo")
+@bp.get("/api/relatorios/historico-veiculo-completo")
+def relatorio_veiculo_completo():
+    veiculo_id = request.args.get("veiculo_id", type=int)
+    if not veiculo_id:
+        return jsonify({"erro": "informe veiculo_id"}), 400
+
+    db = next(db_sess())
+
+    data = consultas.dados_historico_veiculo(db, veiculo_id)
+    if data is None:
+        return jsonify({"erro": "veículo não encontrado"}), 404
+    return jsonify(data)
+
+@bp.get('/api/reports/customer-lifetime-value')
+def report_customer_lifetime_value():
+    db = next(db_sess())
+
+    # Optional filter: return only a single customer if requested
+    cliente_id = request.args.get('id_cliente', type=int)
+    return jsonify(consultas.dados_customer_lifetime_value(db, cliente_id))
+
+
+@bp.get('/api/reports/top-services-by-revenue')
+def report_top_services_by_revenue():
+    db = next(db_sess())
+    return jsonify(consultas.dados_top_services_by_revenue(db))
+
+
+@bp.get('/api/reports/parts-usage-frequency')
+def report_parts_usage_frequency():
+    db = next(db_sess())
+    return jsonify(consultas.dados_parts_usage_frequency(db))
+
+# GET /api/reports/contas-a-receber?agrupar=os|cliente&pagina=1&por_pagina=50&id_cliente=&data_base=2025-01-31
+@bp.get('/api/reports/contas-a-receber')
+def report_contas_a_receber():
+    agrupar = request.args.get('agrupar', 'os')
+    if agrupar not in ('os', 'cliente'):
+        return jsonify({"erro": "agrupar deve ser 'os' ou 'cliente'"}), 400
+    data_base = request.args.get('data_base')
+    try:
+        data_base = datetime.fromisoformat(data_base) if data_base else None
+    except ValueError:
+        return jsonify({"erro": "data_base deve estar em ISO (YYYY-MM-DD)"}), 400
+
+    db = next(db_sess())
+    return jsonify(consultas.dados_contas_a_receber(
+        db,
+        agrupar=agrupar,
+        pagina=request.args.get('pagina', default=1, type=int),
+        por_pagina=request.args.get('por_pagina', default=50, type=int),
+        cliente_id=request.args.get('id_cliente', type=int),
+        data_base=data_base,
+    ))
+
+# Reposição: consumo médio na janela, dias de cobertura e sugestão de compra por fornecedor.
+# A janela padrão vem pronta da memória (atualizada em segundo plano); outras são calculadas na hora.
+# GET /api/reports/reposicao?somente_alertas=1&janela_dias=30
+@bp.record_once
+def _instalar_reposicao(estado):
+    estado.app.extensions["reposicao"] = reposicao.RelatoriosPorOficina(SessionLocal)
+
+@bp.get('/api/reports/reposicao')
+def report_reposicao():
+    somente_alertas = request.args.get('somente_alertas') in ('1', 'true')
+    janela_dias = request.args.get('janela_dias', default=reposicao.JANELA_DIAS, type=int)
+    if janela_dias <= 0 or janela_dias > 365:
+        return jsonify({"erro": "janela_dias deve estar entre 1 e 365"}), 400
+    relatorios = current_app.extensions["reposicao"]
+    if janela_dias == relatorios.janela_dias:
+        return jsonify(relatorios.da_oficina(oficina_atual.get()).resultado(somente_alertas))
+    db = next(db_sess())
+    return jsonify(reposicao.relatorio_direto(db, janela_dias, somente_alertas))
+
+# Previsão de manutenção por km para a frota inteira (ou de um cliente), ver analytics_frota.py
+# GET /api/relatorios/previsao-manutencao?id_cliente=10&situacao=vencido|proximo|ok|sem_historico&limite=500
+@bp.get('/api/relatorios/previsao-manutencao')
+def relatorio_previsao_manutencao():
+    import analytics_frota  # numpy: carregado só na primeira previsão
+    situacao = request.args.get('situacao')
+    if situacao and situacao not in analytics_frota.SITUACOES:
+        return jsonify({"erro": f"situacao deve ser uma de: {', '.join(analytics_frota.SITUACOES)}"}), 400
+    db = next(db_sess())
+    return jsonify(analytics_frota.dados_previsao_manutencao(
+        db,
+        cliente_id=request.args.get('id_cliente', type=int),
+        situacao=situacao,
+        limite=max(1, min(request.args.get('limite', default=500, type=int), 5000)),
+    ))
+
+# Carga por mecânico (OS por status, receita, backlog) + agendamentos por dia; cache de alguns segundos
+# GET /api/reports/carga-trabalho?inicio=2025-01-01&fim=2025-02-01&agenda_inicio=2025-01-20&agenda_dias=14
+@bp.get('/api/reports/carga-trabalho')
+def report_carga_trabalho():
+    try:
+        datas = {
+            campo: datetime.fromisoformat(request.args[campo]) if request.args.get(campo) else None
+            for campo in ('inicio', 'fim', 'agenda_inicio')
+        }
+    except ValueError:
+        return jsonify({"erro": "datas devem estar em ISO (YYYY-MM-DD)"}), 400
+    agenda_dias = request.args.get('agenda_dias', default=carga_trabalho.DIAS_AGENDA, type=int)
+    if not 1 <= agenda_dias <= 92:
+        return jsonify({"erro": "agenda_dias deve estar entre 1 e 92"}), 400
+    db = next(db_sess())
+    return jsonify(carga_trabalho.dados_carga_trabalho(
+        db,
+        inicio=datas['inicio'],
+        fim=datas['fim'],
+        agenda_inicio=datas['agenda_inicio'].date() if datas['agenda_inicio'] else None,
+        agenda_dias=agenda_dias,
+    ))
+
+# -------- Exportação CSV / Parquet (ver exportacao.py) --------
+# GET /api/export/movimentos-estoque?formato=csv&data_inicio=2025-01-01&data_fim=2025-02-01&id_peca=&id_os=
+# GET /api/export/pagamentos?formato=parquet
+# GET /api/export/customer-lifetime-value  (e os outros /api/reports/*)
+@bp.get("/api/export/<nome>")
+def exportar(nome):
+    formato = request.args.get("formato", "csv")
+    try:
+        exportacao.validar(nome, formato)
+        filtros = {
+            "data_inicio": request.args.get("data_inicio"),
+            "data_fim": request.args.get("data_fim"),
+            "id_peca": request.args.get("id_peca", type=int),
+            "id_os": request.args.get("id_os", type=int),
+            "id_oficina": oficina_atual.get(),
+        }
+        for campo in ("data_inicio", "data_fim"):
+            if filtros[campo]:
+                filtros[campo] = datetime.fromisoformat(filtros[campo])
+    except exportacao.ErroExportacao as e:
+        return jsonify({"erro": e.mensagem}), e.status
+    except ValueError:
+        return jsonify({"erro": "data_inicio/data_fim devem estar em ISO (YYYY-MM-DD)"}), 400
+
+    nome_arquivo = f"{nome}-{datetime.now():%Y%m%d-%H%M%S}.{formato}"
+    cabecalhos = {"Content-Disposition": f"attachment; filename={nome_arquivo}"}
+
+    if nome in exportacao.RELATORIOS:
+        db = next(db_sess())
+        if formato == "csv":
+            return Response(exportacao.csv_relatorio(db, nome), mimetype="text/csv", headers=cabecalhos)
+        return Response(exportacao.parquet_relatorio(db, nome),
+                        mimetype="application/vnd.apache.parquet", headers=cabecalhos)
+
+    engine = engine_da_oficina(filtros["id_oficina"])
+    if formato == "csv":
+        # enviado em pedaços conforme o cursor avança: memória constante
+        return Response(stream_with_context(exportacao.csv_tabela(engine, nome, **filtros)),
+                        mimetype="text/csv", headers=cabecalhos)
+
+    caminho = exportacao.parquet_tabela(engine, nome, **filtros)
+    cabecalhos["Content-Length"] = str(os.path.getsize(caminho))
+    return Response(exportacao.ler_e_apagar(caminho),
+                    mimetype="application/vnd.apache.parquet", headers=cabecalhos)
+
+# -------- Jobs: relatórios pesados em processos separados (ver jobs.py) --------
+# POST /api/jobs  {"tipo": "customer-lifetime-value", "parametros": {"cliente_id": 3}}
+@bp.post("/api/jobs")
+def criar_job():
+    db = next(db_sess())
+    dados = request.get_json(force=True) or {}
+    try:
+        job = jobs.submeter(db, dados.get("tipo"), dados.get("parametros"))
+    except jobs.ErroJob as e:
+        db.rollback()
+        resposta = jsonify({"erro": e.mensagem})
+        if e.status == 429:
+            resposta.headers["Retry-After"] = "10"
+        return resposta, e.status
+    return jsonify(jobs.serializar_job(job)), 202
+
+# GET /api/jobs?status=executando
+@bp.get("/api/jobs")
+def listar_jobs():
+    db = next(db_sess())
+    try:
+        return jsonify([jobs.serializar_job(j) for j in jobs.listar(db, request.args.get("status"))])
+    except jobs.ErroJob as e:
+        return jsonify({"erro": e.mensagem}), e.status
+
+@bp.get("/api/jobs/<int:id_job>")
+def obter_job(id_job):
+    db = next(db_sess())
+    try:
+        return jsonify(jobs.serializar_job(jobs.obter(db, id_job)))
+    except jobs.ErroJob as e:
+        return jsonify({"erro": e.mensagem}), e.status
+
+@bp.get("/api/jobs/<int:id_job>/resultado")
+def baixar_resultado_job(id_job):
+    db = next(db_sess())
+    try:
+        job = jobs.obter(db, id_job)
+    except jobs.ErroJob as e:
+        return jsonify({"erro": e.mensagem}), e.status
+    if job.status != jobs.StatusJob.concluido or not job.arquivo or not os.path.exists(job.arquivo):
+        return jsonify({"erro": f"resultado indisponível (job {job.status.value})"}), 409
+    return send_file(job.arquivo, mimetype="application/json",
+                     as_attachment=True, download_name=f"job-{job.id_job}-{job.tipo}.json")
+
+@bp.delete("/api/jobs/<int:id_job>")
+def cancelar_job(id_job):
+    db = next(db_sess())
+    try:
+        job = jobs.cancelar(db, id_job)
+    except jobs.ErroJob as e:
+        return jsonify({"erro": e.mensagem}), e.status
+    return jsonify(jobs.serializar_job(job))
+
+# -------- Arquivo de meses fechados (ver particionamento.py) --------
+# GET /api/arquivo/pagamento?de=2023-01&ate=2023-06&id_os=10&limite=1000
+# GET /api/arquivo/movimento_estoque?de=2023-01&id_peca=7
+@bp.get('/api/arquivo/<tabela>')
+def consultar_arquivo(tabela):
+    limite = request.args.get('limite', default=particionamento.LIMITE_CONSULTA, type=int)
+    if limite <= 0 or limite > 10 * particionamento.LIMITE_CONSULTA:
+        return jsonify({"erro": f"limite deve estar entre 1 e {10 * particionamento.LIMITE_CONSULTA}"}), 400
+    try:
+        linhas, truncado = particionamento.consultar_arquivo(
+            tabela,
+            de=request.args.get('de'),
+            ate=request.args.get('ate'),
+            id_os=request.args.get('id_os', type=int),
+            id_peca=request.args.get('id_peca', type=int),
+            id_oficina=oficina_atual.get(),
+            limite=limite,
+        )
+    except particionamento.ErroParticionamento as e:
+        return jsonify({"erro": e.mensagem}), e.status
+    return jsonify({"tabela": tabela, "linhas": linhas, "truncado": truncado})
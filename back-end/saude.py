@@ -0,0 +1,85 @@
+# back-end/saude.py
+"""
+Checagens de saúde para o balanceador de carga.
+
+- live: o processo responde (não toca no banco).
+- ready: ida e volta ao banco (SELECT 1) com tempo limite + ocupação do pool.
+  Fica "não pronto" se o banco não responder em TIMEOUT_S ou se o pool estiver
+  acima de LIMIAR_SATURACAO da capacidade (pool_size + max_overflow): o
+  balanceador tira a instância da rotação antes de as requisições começarem a
+  esperar por conexão.
+
+A ida ao banco roda numa thread própria: se a conexão travar, a checagem
+responde no tempo limite em vez de prender a requisição. Enquanto uma checagem
+travada não termina, as próximas respondem "não pronto" sem abrir outra.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from sqlalchemy import text
+
+TIMEOUT_S = 1.0
+LIMIAR_SATURACAO = 0.9
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="saude")
+_lock = threading.Lock()
+_pendente = None
+
+
+def estado_pool(engine):
+    pool = engine.pool
+    estado = {"classe": type(pool).__name__}
+    if not hasattr(pool, "checkedout"):
+        return estado  # NullPool/StaticPool: nada a medir
+    tamanho = pool.size()
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    capacidade = tamanho + max(max_overflow, 0)
+    estado.update({
+        "size": tamanho,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": max_overflow,
+        "capacidade": capacidade,
+        "ocupacao": round(pool.checkedout() / capacidade, 3) if capacidade > 0 else None,
+    })
+    return estado
+
+
+def _ping(engine):
+    inicio = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return (time.perf_counter() - inicio) * 1000
+
+
+def verificar_banco(engine, timeout_s=TIMEOUT_S):
+    """(ok, latência em ms ou None, erro ou None)."""
+    global _pendente
+    with _lock:
+        if _pendente is not None and not _pendente.done():
+            return False, None, "checagem anterior ainda sem resposta do banco"
+        _pendente = _executor.submit(_ping, engine)
+        futuro = _pendente
+    try:
+        return True, round(futuro.result(timeout=timeout_s), 2), None
+    except TimeoutError:
+        return False, None, f"banco não respondeu em {timeout_s}s"
+    except Exception as e:
+        return False, None, f"{type(e).__name__}: {e}"
+
+
+def prontidao(engine, timeout_s=TIMEOUT_S, limiar=LIMIAR_SATURACAO):
+    """Corpo da resposta de /api/health/ready e se a instância está pronta."""
+    ok_banco, latencia, erro = verificar_banco(engine, timeout_s)
+    pool = estado_pool(engine)
+    saturado = pool.get("ocupacao") is not None and pool["ocupacao"] >= limiar
+    pronto = ok_banco and not saturado
+    motivo = erro or ("pool de conexões saturado" if saturado else None)
+    return pronto, {
+        "status": "pronto" if pronto else "indisponivel",
+        "motivo": motivo,
+        "db": {"ok": ok_banco, "latencia_ms": latencia},
+        "pool": pool,
+    }
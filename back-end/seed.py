@@ -6,16 +6,19 @@ upsert operations that work with Postgres (ON CONFLICT) and SQLite.
 """
 
 from datetime import datetime, timedelta
+from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import insert as pg_insert
-from database import SessionLocal, Base, engine, DATABASE_URL
+from database import SessionLocal, Base, get_engine, get_url, oficina_corrente
 from sqlalchemy.exc import OperationalError
 from models import (
-    Cliente, Servico, Peca, Funcionario, Veiculo, Fornecedor,
+    Oficina, Cliente, Servico, Peca, Funcionario, Veiculo, Fornecedor,
     OS, ItemPeca, ItemServico, Pagamento, Agendamento, MovimentoEstoque,
     StatusOS, StatusAgendamento
 )
+import totais_os  # noqa: F401 - registra a manutenção dos totais da OS no flush
 
-is_postgres = engine.dialect.name == "postgresql"
+def _postgres(db):
+    return db.get_bind().dialect.name == "postgresql"
 
 def mask_url(url: str) -> str:
     try:
@@ -24,21 +27,28 @@ def mask_url(url: str) -> str:
     except Exception:
         return url
 
-print(f"[seed.py] Engine dialect: {engine.dialect.name} | DB: {mask_url(DATABASE_URL)}")
+def upsert_oficina(db, id_oficina, nome):
+    # id fixo: é a oficina "padrao" do local_config.json, dona de tudo que o seed cria
+    if not db.get(Oficina, id_oficina):
+        db.add(Oficina(id_oficina=id_oficina, nome=nome))
+        db.flush()
+        if _postgres(db):
+            db.execute(text("SELECT setval(pg_get_serial_sequence('oficina', 'id_oficina'), "
+                            "(SELECT max(id_oficina) FROM oficina))"))
 
 def upsert_cliente(db, nome, cpf, telefone='(00) 00000-0000', email=None):
-    if is_postgres:
+    if _postgres(db):
         stmt = pg_insert(Cliente.__table__).values(
             nome_razao=nome, cpf_cnpj=cpf, telefone=telefone, email=email
         )
-        stmt = stmt.on_conflict_do_nothing(index_elements=['cpf_cnpj'])
+        stmt = stmt.on_conflict_do_nothing(index_elements=['id_oficina', 'cpf_cnpj'])
         db.execute(stmt)
     else:
         if not db.query(Cliente).filter_by(cpf_cnpj=cpf).first():
             db.add(Cliente(nome_razao=nome, cpf_cnpj=cpf, telefone=telefone, email=email))
 
 def upsert_servico(db, desc, preco):
-    if is_postgres:
+    if _postgres(db):
         stmt = pg_insert(Servico.__table__).values(descricao=desc, preco_padrao=preco)
         stmt = stmt.on_conflict_do_nothing(index_elements=['descricao'])
         db.execute(stmt)
@@ -47,9 +57,9 @@ def upsert_servico(db, desc, preco):
             db.add(Servico(descricao=desc, preco_padrao=preco))
 
 def upsert_peca(db, sku, descricao, origem, estoque=0):
-    if is_postgres:
+    if _postgres(db):
         stmt = pg_insert(Peca.__table__).values(sku=sku, descricao=descricao, origem=origem, estoque_atual=estoque)
-        stmt = stmt.on_conflict_do_nothing(index_elements=['sku'])
+        stmt = stmt.on_conflict_do_nothing(index_elements=['id_oficina', 'sku'])
         db.execute(stmt)
     else:
         if not db.query(Peca).filter_by(sku=sku).first():
@@ -61,7 +71,7 @@ def upsert_funcionario(db, nome, funcao):
 
 def upsert_fornecedor(db, nome, cpf=None):
     if cpf:
-        if is_postgres:
+        if _postgres(db):
             stmt = pg_insert(Fornecedor.__table__).values(nome_razao=nome, cpf_cnpj=cpf)
             stmt = stmt.on_conflict_do_nothing(index_elements=['cpf_cnpj'])
             db.execute(stmt)
@@ -73,9 +83,9 @@ def upsert_fornecedor(db, nome, cpf=None):
             db.add(Fornecedor(nome_razao=nome))
 
 def upsert_veiculo(db, placa, marca, modelo, km_atual, id_cliente):
-    if is_postgres:
+    if _postgres(db):
         stmt = pg_insert(Veiculo.__table__).values(placa=placa, marca=marca, modelo=modelo, km_atual=km_atual, id_cliente=id_cliente)
-        stmt = stmt.on_conflict_do_nothing(index_elements=['placa'])
+        stmt = stmt.on_conflict_do_nothing(index_elements=['id_oficina', 'placa'])
         db.execute(stmt)
     else:
         if not db.query(Veiculo).filter_by(placa=placa).first():
@@ -83,6 +93,7 @@ def upsert_veiculo(db, placa, marca, modelo, km_atual, id_cliente):
 
 def reset_tables():
     try:
+        engine = get_engine()
         Base.metadata.drop_all(bind=engine)
         Base.metadata.create_all(bind=engine)
         print("[seed.py] Tables reset OK")
@@ -93,6 +104,8 @@ def reset_tables():
 def seed():
     try:
         with SessionLocal() as db:
+            upsert_oficina(db, oficina_corrente(), "Matriz")
+
             # CLIENTES
             clientes = [
                 ("João da Silva", "123.456.789-00"),
@@ -313,6 +326,7 @@ def seed():
                     km_entrada=80000 + i * 1500,
                     problema_relatado=f"Revisão periódica #{i}",
                     status=status,
+                    data_abertura=agora - timedelta(days=i * 4),  # espalha pelas faixas de atraso
                 )
                 db.add(os_inst)
                 db.flush()  # garante que id_os é gerado
@@ -329,6 +343,7 @@ def seed():
 
                 # 2-3 peças por OS, usando peças de ID 1 a 25 em rodízio
                 num_pecas = 2 if i % 3 == 0 else 3  # alterna entre 2 e 3 peças
+                total_pecas = 0.0
                 for j in range(num_pecas):
                     item_peca = ItemPeca(
                         id_os=os_inst.id_os,
@@ -337,17 +352,16 @@ def seed():
                         valor_unit=60.0 + ((i + j) % 4) * 10,
                     )
                     db.add(item_peca)
+                    # total das peças calculado aqui mesmo, sem reconsultar ItemPeca
+                    total_pecas += item_peca.qtd * item_peca.valor_unit
 
-                # Calcula total de peças
-                db.flush()  # garante que as peças foram inseridas
-                total_pecas = sum(float(p.qtd * p.valor_unit) for p in db.query(ItemPeca).filter_by(id_os=os_inst.id_os).all())
-                
-                # 1 pagamento por OS (simples)
+                # 1 pagamento por OS (simples); OS abertas só pagaram um sinal de 50%
+                total_os = float(item_serv.valor_unit or 0) + total_pecas
                 pagamento = Pagamento(
                     id_os=os_inst.id_os,
                     data=agora - timedelta(days=i),
                     forma="Dinheiro" if i % 2 == 0 else "Cartão",
-                    valor=float(item_serv.valor_unit or 0) + total_pecas,
+                    valor=total_os / 2 if status == StatusOS.aberto else total_os,
                 )
                 db.add(pagamento)
 
@@ -397,5 +411,6 @@ def seed():
 
 
 if __name__ == '__main__':
+    print(f"[seed.py] Engine dialect: {get_engine().dialect.name} | DB: {mask_url(get_url())}")
     reset_tables()
     seed()
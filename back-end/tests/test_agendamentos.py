@@ -0,0 +1,36 @@
+# back-end/tests/test_agendamentos.py
+
+
+def _agendamento(dados_seed, **extra):
+    return {
+        "id_cliente": dados_seed["id_cliente"],
+        "id_veiculo": dados_seed["id_veiculo"],
+        "id_servico": dados_seed["id_servico"],
+        "data_hora": "2031-03-10T09:30",
+        **extra,
+    }
+
+
+def test_cria_agendamento_pendente(cliente, dados_seed):
+    resposta = cliente.post("/api/agendamentos", json=_agendamento(dados_seed))
+    assert resposta.status_code == 201
+    assert resposta.get_json()["status"] == "pendente"
+    ids = {a["id_agendamento"] for a in cliente.get("/api/agendamentos").get_json()}
+    assert resposta.get_json()["id_agendamento"] in ids
+
+
+def test_mesmo_horario_para_o_mesmo_veiculo_conflita(cliente, dados_seed):
+    assert cliente.post("/api/agendamentos", json=_agendamento(dados_seed)).status_code == 201
+    resposta = cliente.post("/api/agendamentos", json=_agendamento(dados_seed))
+    assert resposta.status_code == 409
+
+
+def test_veiculo_de_outro_cliente_e_recusado(cliente, dados_seed):
+    resposta = cliente.post("/api/agendamentos", json=_agendamento(dados_seed, id_cliente=999999))
+    assert resposta.status_code == 400
+
+
+def test_payload_incompleto(cliente):
+    resposta = cliente.post("/api/agendamentos", json={"id_cliente": 1})
+    assert resposta.status_code == 400
+    assert "erro" in resposta.get_json()
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import create_app
+
+AQUI = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rodar(codigo):
+    """Roda `codigo` num interpretador novo (import frio) e devolve o stdout."""
+    ambiente = {**os.environ, "DATABASE_URL": "sqlite://"}
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=AQUI, env=ambiente,
+                           capture_output=True, text=True, check=True)
+    return saida.stdout.split()
+
+
+def test_import_app_so_carrega_o_flask():
+    assert _rodar(
+        "import sys, app; print(*(m in sys.modules for m in ('sqlalchemy', 'models', 'rotas_cadastros')))"
+    ) == ["False", "False", "False"]
+
+
+def test_create_app_cadastros_nao_cria_engine_nem_carrega_relatorios():
+    assert _rodar(
+        "import sys, app, database\n"
+        "app.create_app({}, blueprints=('cadastros',))\n"
+        "print(database._engine is None, "
+        "*(m in sys.modules for m in ('rotas_relatorios', 'numpy', 'pyarrow', 'jobs')))"
+    ) == ["True", "False", "False", "False", "False"]
+
+
+def test_blueprint_cadastros_sem_relatorios(conexao):
+    c = create_app(blueprints=("cadastros",)).test_client()
+    assert c.get("/api/servicos").status_code == 200
+    assert c.get("/api/health/live").status_code == 200
+    assert c.get("/api/reports/top-services-by-revenue").status_code == 404
+
+
+def test_blueprint_desconhecido():
+    with pytest.raises(ValueError, match="financeiro"):
+        create_app(blueprints=("cadastros", "financeiro"))
+
+
+def test_requisicao_devolve_a_conexao_ao_pool(tmp_path):
+    # sem o teardown, `next(db_sess())` segura a conexão até o coletor de lixo passar
+    assert _rodar(
+        "import gc, os\n"
+        f"os.environ['DATABASE_URL'] = 'sqlite:///{tmp_path}/pool.db'\n"
+        "gc.disable()\n"
+        "import app, database, seed\n"
+        "seed.reset_tables()\n"
+        "c = app.create_app({}).test_client()\n"
+        "print(*(c.get(r).status_code for r in ('/api/servicos', '/api/clientes', '/api/agendamentos')))\n"
+        "print(database.get_engine().pool.checkedout())"
+    )[-4:] == ["200", "200", "200", "0"]
+
+
+def test_consultas_lentas_exigem_token(monkeypatch):
+    import consultas_lentas
+    import database
+
+    monkeypatch.setattr(consultas_lentas, "registro", consultas_lentas.RegistroConsultasLentas())
+    sem_token = create_app({**database.get_config(), "consultas_lentas": {}}, blueprints=()).test_client()
+    assert sem_token.get("/api/debug/slow-queries").status_code == 403
+    assert sem_token.delete("/api/debug/slow-queries").status_code == 403
+
+    c = create_app({**database.get_config(), "consultas_lentas": {"token": "segredo"}},
+                   blueprints=()).test_client()
+    assert c.get("/api/debug/slow-queries?token=errado").status_code == 403
+    assert c.get("/api/debug/slow-queries", headers={"X-Debug-Token": "segredo"}).status_code == 200
+    assert c.delete("/api/debug/slow-queries?token=segredo").status_code == 200
+    assert consultas_lentas.RegistroConsultasLentas().explain_analyze is False
+
+
+def test_create_app_nao_acumula_ganchos_de_engine():
+    import gc
+
+    import app as modulo_app
+    import database
+
+    create_app(database.get_config(), blueprints=())
+    gc.collect()
+    ganchos, apps = list(database._ao_criar), len(modulo_app._apps)
+    for _ in range(3):
+        create_app(database.get_config(), blueprints=())
+    assert database._ao_criar == ganchos
+    gc.collect()
+    assert len(modulo_app._apps) == apps  # apps descartados não recebem os engines novos
+
+
+def test_perfil_exige_token():
+    import database
+
+    sem_token = create_app({**database.get_config(), "perfil": {"ativo": True}}, blueprints=()).test_client()
+    assert "X-Perfil-Id" not in sem_token.get("/api/health/live?__profile=1").headers
+    assert sem_token.get("/api/debug/perfis").status_code == 403
+
+    c = create_app({**database.get_config(), "perfil": {"ativo": True, "token": "segredo"}},
+                   blueprints=()).test_client()
+    assert "X-Perfil-Id" in c.get("/api/health/live", headers={"X-Perfil": "segredo"}).headers
+    assert c.get("/api/debug/perfis?token=segredo").status_code == 200
@@ -0,0 +1,85 @@
+# back-end/tests/test_cadastros.py
+import eventos
+from database import SessionLocal
+from models import Peca
+
+
+def test_listagens_trazem_o_seed(cliente, dados_seed):
+    for rota in ("/api/clientes", "/api/veiculos", "/api/pecas", "/api/servicos",
+                 "/api/funcionarios", "/api/fornecedores", "/api/agendamentos"):
+        resposta = cliente.get(rota)
+        assert resposta.status_code == 200, rota
+        assert resposta.get_json(), rota
+    assert len(cliente.get("/api/clientes").get_json()) == dados_seed["total_clientes"]
+
+
+def test_bootstrap_devolve_os_datasets_pedidos(cliente):
+    dados = cliente.get("/api/bootstrap?datasets=clientes,pecas").get_json()
+    assert set(dados) == {"clientes", "pecas"}
+
+
+def test_criar_peca_grava_no_banco(cliente, db):
+    resposta = cliente.post("/api/pecas", json={
+        "sku": "TESTE-001", "descricao": "Peça de teste", "origem": "nacional", "estoque_atual": 7,
+    })
+    assert resposta.status_code == 201
+    peca = db.get(Peca, resposta.get_json()["id_peca"])
+    assert (peca.sku, peca.estoque_atual) == ("TESTE-001", 7)
+
+
+def test_rollback_entre_testes_descarta_o_cadastro_anterior(cliente):
+    # roda depois de test_criar_peca_grava_no_banco: a peça dele não pode ter sobrado
+    skus = {p["sku"] for p in cliente.get("/api/pecas").get_json()}
+    assert "TESTE-001" not in skus
+
+
+def test_veiculos_de_cliente(cliente, dados_seed):
+    resposta = cliente.get(f"/api/clientes/{dados_seed['id_cliente']}/veiculos")
+    assert resposta.status_code == 200
+    assert dados_seed["id_veiculo"] in {v["id"] for v in resposta.get_json()}
+    assert cliente.get("/api/clientes/999999/veiculos").status_code == 404
+
+
+def test_paginas_cobrem_a_listagem_inteira(cliente):
+    completa = cliente.get("/api/veiculos").get_json()
+    primeira = cliente.get("/api/veiculos?limite=3").get_json()
+    assert primeira["total"] == len(completa)
+    paginas = primeira["itens"]
+    for offset in range(3, len(completa), 3):
+        pagina = cliente.get(f"/api/veiculos?limite=3&offset={offset}").get_json()
+        assert pagina["total"] is None  # COUNT só na primeira página
+        paginas += pagina["itens"]
+    assert [v["id_veiculo"] for v in paginas] == [v["id_veiculo"] for v in completa]
+
+
+def test_filtro_q_no_servidor(cliente, dados_seed):
+    veiculo = next(v for v in cliente.get("/api/veiculos").get_json() if v["id_veiculo"] == dados_seed["id_veiculo"])
+    pagina = cliente.get(f"/api/veiculos?limite=50&q={veiculo['placa'].lower()}").get_json()
+    assert pagina["total"] >= 1
+    assert all(veiculo["placa"].lower() in v["placa"].lower() for v in pagina["itens"])
+    por_cliente = cliente.get(f"/api/veiculos?q={veiculo['cliente']['nome']}").get_json()
+    assert dados_seed["id_veiculo"] in {v["id_veiculo"] for v in por_cliente}
+    assert cliente.get("/api/movimentos-estoque?limite=5&q=nao-existe-xyz").get_json()["total"] == 0
+
+
+def test_eventos_recusa_acima_do_limite_de_assinantes(app, cliente):
+    central, anterior = eventos.Central(SessionLocal, max_assinantes=1), app.extensions.get("eventos")
+    app.extensions["eventos"] = central
+    try:
+        aberto = eventos.fluxo(central)
+        assert next(aberto).startswith("retry:")
+        assert cliente.get("/api/eventos").status_code == 503
+        aberto.close()  # a aba fechou: a vaga volta
+        assert central.conectados() == 0
+    finally:
+        app.extensions["eventos"] = anterior
+
+
+def test_busca_de_veiculo_por_modelo_em_todos_os_dialetos(db, dados_seed):
+    import busca
+    from models import Veiculo
+
+    veiculo = db.get(Veiculo, dados_seed["id_veiculo"])
+    for buscar in (busca._buscar_fts5, busca._buscar_like):  # _buscar_like usa o predicado do Postgres
+        ids = [r["id"] for r in buscar(db, veiculo.modelo, 20, ["veiculo"])]
+        assert veiculo.id_veiculo in ids, buscar.__name__
@@ -0,0 +1,54 @@
+# back-end/tests/test_database.py
+import threading
+
+from sqlalchemy import text
+
+import database
+
+
+def test_sqlite_em_arquivo_espera_o_lock_de_escrita(tmp_path):
+    # BEGIN deferred: ler e depois escrever com outra transação na frente falha na hora
+    engine = database.criar_engine(f"sqlite:///{tmp_path}/lock.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+    falhas = []
+
+    def escrever():
+        for _ in range(20):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text("SELECT count(*) FROM t")).scalar()
+                    conn.execute(text("INSERT INTO t VALUES (1)"))
+            except Exception as e:
+                falhas.append(e)
+
+    threads = [threading.Thread(target=escrever) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    try:
+        assert falhas == []
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 80
+    finally:
+        engine.dispose()
+
+
+def test_explain_roda_no_engine_da_consulta(monkeypatch, tmp_path):
+    import consultas_lentas
+
+    registro = consultas_lentas.RegistroConsultasLentas(limiar_ms=0, explain_primeiras=5)
+    monkeypatch.setattr(consultas_lentas, "registro", registro)
+    # em arquivo: em memória o EXPLAIN dividiria a única conexão (StaticPool) com o teste
+    principal, da_filial = (database.criar_engine(f"sqlite:///{tmp_path}/{nome}.db")
+                            for nome in ("principal", "filial"))
+    for engine in (principal, da_filial):
+        consultas_lentas.instrumentar(engine)  # o último instrumentado não "ganha" os EXPLAIN
+    with principal.begin() as conn:
+        conn.execute(text("CREATE TABLE so_no_principal (x INTEGER)"))
+        conn.execute(text("SELECT x FROM so_no_principal WHERE x = 1"))
+    registro._executor.submit(lambda: None).result()  # espera os EXPLAIN enfileirados
+
+    (resumo,) = [r for r in registro.dados()["resumo"] if r["sql"].startswith("SELECT x")]
+    assert resumo["planos"] and all("erro" not in p for p in resumo["planos"])
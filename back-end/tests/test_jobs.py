@@ -0,0 +1,36 @@
+# back-end/tests/test_jobs.py
+from datetime import datetime, timedelta
+
+import jobs
+from database import usar_oficina
+from models import Job, StatusJob
+
+
+def _job(db, status, batimento, dono="outro-host:123:abc"):
+    job = Job(tipo="parts-usage-frequency", parametros="{}", status=status, dono=dono, batimento=batimento)
+    db.add(job)
+    db.flush()
+    return job
+
+
+def test_so_recupera_jobs_cujo_dono_parou(db):
+    agora = datetime.now()
+    vivo = _job(db, StatusJob.executando, agora - timedelta(seconds=5))  # outro worker, ativo
+    morto = _job(db, StatusJob.pendente, agora - timedelta(seconds=jobs.ORFAO_S + 1))
+    antigo = _job(db, StatusJob.executando, None, dono=None)             # de antes do dono/batimento
+    pronto = _job(db, StatusJob.concluido, None)
+
+    assert jobs.recuperar_orfaos(db, agora) == 2
+    db.expire_all()
+    assert vivo.status == StatusJob.executando
+    assert morto.status == antigo.status == StatusJob.erro
+    assert pronto.status == StatusJob.concluido
+
+
+def test_fila_conta_pendentes_de_todas_as_oficinas(db, dados_seed):
+    antes = jobs.pendentes(db)
+    _job(db, StatusJob.pendente, datetime.now())
+    with usar_oficina(2):
+        _job(db, StatusJob.pendente, datetime.now())
+    _job(db, StatusJob.executando, datetime.now())
+    assert jobs.pendentes(db) == antes + 2
@@ -0,0 +1,80 @@
+# back-end/tests/test_lembretes.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+import lembretes
+from app import create_app
+from models import Agendamento, Cliente, Lembrete, StatusAgendamento, StatusLembrete
+
+
+@pytest.fixture
+def smtp():
+    with lembretes.SMTPLocal(rejeitar={"recusado@exemplo.com"}) as servidor:
+        yield servidor
+
+
+@pytest.fixture
+def config_lembretes(smtp):
+    return {"smtp": {"host": smtp.host, "port": smtp.port, "remetente": "oficina@exemplo.com"},
+            "backoff_s": 60, "max_tentativas": 2}
+
+
+def _lembrete(db, dados_seed, destino, status=StatusAgendamento.pendente):
+    agendamento = Agendamento(id_cliente=dados_seed["id_cliente"], id_veiculo=dados_seed["id_veiculo"],
+                              id_servico=dados_seed["id_servico"], status=status,
+                              data_hora=datetime.now() + timedelta(days=2))
+    lembrete = Lembrete(agendamento=agendamento, canal="email", destino=destino, assunto="Lembrete",
+                        mensagem="amanhã às 9h", proxima_tentativa=datetime.now() - timedelta(seconds=1))
+    db.add(lembrete)
+    db.commit()
+    return lembrete
+
+
+def test_agendamento_grava_lembrete_no_outbox(db, dados_seed, config_lembretes, smtp):
+    db.get(Cliente, dados_seed["id_cliente"]).email = "cliente@exemplo.com"
+    db.commit()
+    c = create_app({**database.get_config(), "lembretes": config_lembretes}).test_client()
+    resposta = c.post("/api/agendamentos", json={
+        "id_cliente": dados_seed["id_cliente"], "id_veiculo": dados_seed["id_veiculo"],
+        "id_servico": dados_seed["id_servico"], "data_hora": "2031-03-10T09:30",
+    })
+    assert resposta.status_code == 201
+
+    lembrete = db.query(Lembrete).filter_by(id_agendamento=resposta.get_json()["id_agendamento"]).one()
+    assert (lembrete.destino, lembrete.status) == ("cliente@exemplo.com", StatusLembrete.pendente)
+    assert lembrete.proxima_tentativa == datetime(2031, 3, 9, 9, 30)  # 24 h antes
+    assert smtp.recebidas == []  # a requisição não envia nada
+
+
+def test_despachante_envia_em_lote_e_reenvia_com_backoff(db, dados_seed, config_lembretes, smtp):
+    despachante = lembretes.instalar(config_lembretes)
+    ok = _lembrete(db, dados_seed, "cliente@exemplo.com")
+    recusado = _lembrete(db, dados_seed, "recusado@exemplo.com")
+    cancelado = _lembrete(db, dados_seed, "cliente@exemplo.com", status=StatusAgendamento.cancelado)
+
+    assert despachante.despachar_lote() == {"enviados": 1, "falhas": 1, "cancelados": 1}
+    assert [destinos for destinos, _ in smtp.recebidas] == [["cliente@exemplo.com"]]
+    db.expire_all()
+    assert ok.status == StatusLembrete.enviado and ok.enviado_em is not None
+    assert cancelado.status == StatusLembrete.cancelado
+    assert recusado.status == StatusLembrete.pendente and recusado.tentativas == 1
+    assert recusado.proxima_tentativa > datetime.now() + timedelta(seconds=40)
+    # nada vencido: o lote seguinte sai vazio
+    assert despachante.despachar_lote() == {"enviados": 0, "falhas": 0, "cancelados": 0}
+
+    recusado.proxima_tentativa = datetime.now() - timedelta(seconds=1)
+    db.commit()
+    despachante.despachar_lote()
+    db.expire_all()
+    assert recusado.status == StatusLembrete.erro and recusado.tentativas == 2
+    assert "550" in recusado.erro
+
+
+def test_smtp_fora_do_ar_devolve_o_lote_para_a_fila(db, dados_seed):
+    despachante = lembretes.instalar({"smtp": {"host": "127.0.0.1", "port": 1, "timeout": 1}})
+    lembrete = _lembrete(db, dados_seed, "cliente@exemplo.com")
+    assert despachante.despachar_lote()["falhas"] == 1
+    db.expire_all()
+    assert lembrete.status == StatusLembrete.pendente and lembrete.tentativas == 1
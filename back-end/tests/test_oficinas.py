@@ -0,0 +1,76 @@
+# back-end/tests/test_oficinas.py
+import os
+import subprocess
+import sys
+
+import pytest
+
+import database
+import oficinas
+from models import Cliente
+
+
+@pytest.fixture
+def filial(db):
+    oficina = oficinas.criar(db, "Filial Teste")
+    yield {"X-Oficina": str(oficina.id_oficina)}
+    oficinas._ativas.invalidar()
+
+
+def test_cada_oficina_so_ve_os_seus_dados(cliente, db, filial, dados_seed):
+    # mesmo CPF de um cliente da matriz: a unicidade é por oficina
+    cpf = db.get(Cliente, dados_seed["id_cliente"]).cpf_cnpj
+    resposta = cliente.post("/api/clientes", headers=filial, json={
+        "nome_razao": "Cliente da Filial", "cpf_cnpj": cpf, "telefone": "(61) 0000-0000",
+    })
+    assert resposta.status_code == 201
+
+    da_filial = cliente.get("/api/clientes", headers=filial).get_json()
+    assert [c["nome_razao"] for c in da_filial] == ["Cliente da Filial"]
+    da_matriz = cliente.get("/api/clientes").get_json()
+    assert len(da_matriz) == dados_seed["total_clientes"]
+    assert cliente.get("/api/pecas", headers=filial).get_json() == []
+    assert cliente.get("/api/busca?q=silva", headers=filial).get_json() == []
+
+
+def test_registro_de_outra_oficina_nao_existe(cliente, filial, dados_seed):
+    assert cliente.get(f"/api/clientes/{dados_seed['id_cliente']}/veiculos", headers=filial).status_code == 404
+    assert cliente.get(f"/api/os/{dados_seed['id_os_aberta']}", headers=filial).status_code == 404
+    # UPDATE em lote do ORM também é filtrado
+    resposta = cliente.post("/api/os/status", headers=filial,
+                            json={"ids": [dados_seed["id_os_aberta"]], "status": "cancelado"})
+    assert resposta.get_json()["atualizadas"] == []
+
+
+def test_cabecalho_invalido(cliente):
+    assert cliente.get("/api/clientes", headers={"X-Oficina": "matriz"}).status_code == 400
+    assert cliente.get("/api/clientes", headers={"X-Oficina": "999"}).status_code == 404
+
+
+def test_rota_leva_a_oficina_para_outro_banco(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "_rotas", {7: {"url": f"sqlite:///{tmp_path}/filial7.db"}})
+    monkeypatch.setattr(database, "_engines_rota", {})
+    filial = database.engine_da_oficina(7)
+    try:
+        assert filial is not database.get_engine()
+        assert filial.url.database.endswith("filial7.db")
+        assert database.engine_da_oficina(1) is database.get_engine()
+        # class_(): a sessão sem o bind fixo que os fixtures põem na SessionLocal
+        with database.usar_oficina(7), database.SessionLocal.class_() as sessao:
+            assert sessao.get_bind() is filial
+    finally:
+        filial.dispose()
+
+
+def test_filtro_vale_sem_importar_oficinas():
+    # worker de jobs.py com spawn (Windows/macOS): só importa jobs e o que ele usa
+    codigo = (
+        "import sys, jobs, models\n"
+        "from sqlalchemy import event\n"
+        "from sqlalchemy.orm import Session\n"
+        "print('oficinas' in sys.modules, event.contains(Session, 'do_orm_execute', models._filtrar_por_oficina))"
+    )
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=os.path.dirname(os.path.dirname(__file__)),
+                           env={**os.environ, "DATABASE_URL": "sqlite://"},
+                           capture_output=True, text=True, check=True)
+    assert saida.stdout.split() == ["False", "True"]
@@ -0,0 +1,81 @@
+# back-end/tests/test_ordens.py
+from decimal import Decimal
+
+from models import OS, Peca
+
+
+def _os(dados_seed, **extra):
+    return {
+        "id_veiculo": dados_seed["id_veiculo"],
+        "id_responsavel": dados_seed["id_funcionario"],
+        "problema_relatado": "barulho na suspensão",
+        **extra,
+    }
+
+
+def test_abrir_os_baixa_estoque_e_calcula_totais(cliente, db, dados_seed):
+    resposta = cliente.post("/api/os", json=_os(
+        dados_seed,
+        itens_servico=[{"id_servico": dados_seed["id_servico"], "qtd": 1, "valor_unit": 100}],
+        itens_peca=[{"id_peca": dados_seed["id_peca"], "qtd": 2, "valor_unit": 30}],
+        pagamentos=[{"forma": "Pix", "valor": 50}],
+    ))
+    assert resposta.status_code == 201
+    corpo = resposta.get_json()
+    assert Decimal(corpo["total_servicos"]) == 100
+    assert Decimal(corpo["total_pecas"]) == 60
+    assert Decimal(corpo["saldo"]) == 110
+    assert db.get(Peca, dados_seed["id_peca"]).estoque_atual == dados_seed["estoque_peca"] - 2
+
+    movimentos = cliente.get(f"/api/movimentos-estoque?os_id={corpo['id_os']}").get_json()
+    assert [(m["tipo"], m["qtd"]) for m in movimentos] == [("saida", 2)]
+
+
+def test_estoque_insuficiente_desfaz_a_os_inteira(cliente, db, dados_seed):
+    antes = db.query(OS).count()
+    resposta = cliente.post("/api/os", json=_os(
+        dados_seed, itens_peca=[{"id_peca": dados_seed["id_peca"], "qtd": 10**6, "valor_unit": 1}],
+    ))
+    assert resposta.status_code == 409
+    assert db.query(OS).count() == antes
+    assert db.get(Peca, dados_seed["id_peca"]).estoque_atual == dados_seed["estoque_peca"]
+
+
+def test_pagamento_atualiza_saldo(cliente, dados_seed):
+    id_os = dados_seed["id_os_aberta"]
+    saldo = Decimal(cliente.get(f"/api/os/{id_os}").get_json()["saldo"])
+    resposta = cliente.post(f"/api/os/{id_os}/pagamentos", json={"pagamentos": [{"forma": "Dinheiro", "valor": 10}]})
+    assert resposta.status_code == 201
+    assert Decimal(resposta.get_json()["saldo"]) == saldo - 10
+
+
+def test_transicoes_de_status(cliente, dados_seed):
+    id_os = dados_seed["id_os_aberta"]
+    assert cliente.patch(f"/api/os/{id_os}/status", json={"status": "finalizado"}).status_code == 409
+    assert cliente.patch(f"/api/os/{id_os}/status", json={"status": "em_execucao"}).status_code == 200
+    assert cliente.patch(f"/api/os/{id_os}/status", json={"status": "finalizado"}).status_code == 200
+    resposta = cliente.post(f"/api/os/{id_os}/itens", json={
+        "itens_servico": [{"id_servico": dados_seed["id_servico"], "qtd": 1, "valor_unit": 1}],
+    })
+    assert resposta.status_code == 409
+
+
+def test_status_em_lote_separa_ignoradas(cliente, dados_seed):
+    ids = [dados_seed["id_os_aberta"], dados_seed["id_os_finalizada"]]
+    corpo = cliente.post("/api/os/status", json={"ids": ids, "status": "cancelado"}).get_json()
+    assert corpo["atualizadas"] == [dados_seed["id_os_aberta"]]
+    assert corpo["ignoradas"] == [dados_seed["id_os_finalizada"]]
+
+
+def test_os_inexistente(cliente):
+    assert cliente.get("/api/os/999999").status_code == 404
+
+
+def test_payload_malformado_e_400(cliente, dados_seed):
+    for extra in ({"km_entrada": "abc"}, {"km_entrada": -5}, {"km_entrada": 1.5},
+                  {"itens_servico": [1]}, {"itens_peca": "x"}, {"pagamentos": [None]}):
+        resposta = cliente.post("/api/os", json=_os(dados_seed, **extra))
+        assert resposta.status_code == 400, extra
+        assert "erro" in resposta.get_json()
+    # texto numérico é aceito como quilometragem
+    assert cliente.post("/api/os", json=_os(dados_seed, km_entrada="90000")).status_code == 201
@@ -0,0 +1,96 @@
+# back-end/tests/test_relatorios.py
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.mark.parametrize("rota", [
+    "/api/reports/customer-lifetime-value",
+    "/api/reports/top-services-by-revenue",
+    "/api/reports/parts-usage-frequency",
+    "/api/reports/contas-a-receber",
+    "/api/reports/reposicao?janela_dias=60",
+    "/api/reports/carga-trabalho",
+    "/api/relatorios/previsao-manutencao",
+])
+def test_relatorios_respondem(cliente, rota):
+    assert cliente.get(rota).status_code == 200
+
+
+def test_lifetime_value_soma_os_pagamentos_do_cliente(cliente, dados_seed):
+    id_cliente = dados_seed["id_cliente"]
+    url = f"/api/reports/customer-lifetime-value?id_cliente={id_cliente}"
+    antes = Decimal(cliente.get(url).get_json()[0]["total_pago"])
+    id_os = cliente.post("/api/os", json={
+        "id_veiculo": dados_seed["id_veiculo"], "id_responsavel": dados_seed["id_funcionario"],
+    }).get_json()["id_os"]
+    cliente.post(f"/api/os/{id_os}/pagamentos", json={"pagamentos": [{"forma": "Pix", "valor": 75}]})
+    assert Decimal(cliente.get(url).get_json()[0]["total_pago"]) == antes + 75
+
+
+def test_carga_trabalho_reflete_nova_os(cliente, dados_seed):
+    def total_os():
+        funcionarios = cliente.get("/api/reports/carga-trabalho").get_json()["funcionarios"]
+        return next(f["total_os"] for f in funcionarios if f["id_funcionario"] == dados_seed["id_funcionario"])
+
+    antes = total_os()
+    cliente.post("/api/os", json={
+        "id_veiculo": dados_seed["id_veiculo"], "id_responsavel": dados_seed["id_funcionario"],
+    })
+    assert total_os() == antes + 1
+
+
+def test_parametros_invalidos(cliente):
+    assert cliente.get("/api/reports/reposicao?janela_dias=0").status_code == 400
+    assert cliente.get("/api/relatorios/previsao-manutencao?situacao=xx").status_code == 400
+
+
+@pytest.mark.parametrize("agrupar", ["os", "cliente"])
+def test_contas_a_receber_total_alem_da_ultima_pagina(cliente, agrupar):
+    url = f"/api/reports/contas-a-receber?agrupar={agrupar}&por_pagina=1"
+    total = cliente.get(url).get_json()["total"]
+    assert total > 0
+    alem = cliente.get(f"{url}&pagina={total + 1}").get_json()
+    assert alem["itens"] == [] and alem["total"] == total
+
+
+def test_reposicao_conta_saida_confirmada_fora_de_ordem(db, dados_seed):
+    from datetime import datetime
+
+    import reposicao
+    from database import SessionLocal
+    from models import MovimentoEstoque, TipoMovimento
+
+    def consumo():
+        itens = [i for g in relatorio._resultado for i in g["itens"] if i["id_peca"] == dados_seed["id_peca"]]
+        return itens[0]["consumo_janela"]
+
+    def saida(id_movimento, qtd):
+        db.add(MovimentoEstoque(id_movimento=id_movimento, id_peca=dados_seed["id_peca"], qtd=qtd,
+                                tipo=TipoMovimento.saida, data=datetime.now()))
+        db.commit()
+
+    relatorio = reposicao.RelatorioReposicao(SessionLocal)
+    relatorio.atualizar(db)
+    antes = consumo()
+    topo = relatorio._ultimo_id
+    saida(topo + 10, 3)
+    relatorio.atualizar(db)
+    saida(topo + 5, 2)  # id menor, confirmado depois (transações concorrentes no Postgres)
+    relatorio.atualizar(db)
+    relatorio.atualizar(db)  # relido dentro da margem, mas não contado de novo
+    assert consumo() == antes + 5
+
+
+def test_polling_de_job_nao_gasta_o_limite_da_submissao(conexao):
+    import database
+    from app import create_app
+
+    c = create_app({**database.get_config(), "limites": {"ativo": True}}, blueprints=("relatorios",)).test_client()
+    for _ in range(10):  # mais que a rajada de POST /api/jobs
+        assert c.get("/api/jobs/999999").status_code == 404
+    assert c.post("/api/jobs", json={"tipo": "inexistente"}).status_code == 400
+    for _ in range(5):
+        c.post("/api/jobs", json={"tipo": "inexistente"})
+    assert c.post("/api/jobs", json={"tipo": "inexistente"}).status_code == 429
+    assert c.get("/api/jobs/999999").status_code == 404
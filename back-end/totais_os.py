@@ -0,0 +1,138 @@
+# back-end/totais_os.py
+"""
+Totais desnormalizados da OS: total_servicos, total_pecas, total_pago e saldo.
+
+- Escritas pelo ORM (session.add/delete de ItemServico, ItemPeca, Pagamento) são
+  capturadas por listeners de Session e as OS afetadas são recalculadas no mesmo
+  flush, dentro da mesma transação.
+- Inserções em massa (session.execute(insert(...), [...])) não passam pelo flush:
+  quem as faz chama recalcular_totais(db, ids) antes do commit.
+
+OS arquivadas (particionamento.py) não são recalculadas: os pagamentos delas
+já saíram da tabela quente e os totais gravados são os definitivos.
+
+Ferramenta de recálculo (bancos antigos ou dados alterados por SQL manual):
+    python totais_os.py                 # todas as OS, em lotes
+    python totais_os.py --os 10 11 12   # só essas
+"""
+import argparse
+from itertools import chain
+
+from sqlalchemy import event, false, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from models import OS, ItemServico, ItemPeca, Pagamento
+
+_CHAVE_PENDENTES = "totais_os_pendentes"
+_CLASSES_FILHAS = (ItemServico, ItemPeca, Pagamento)
+
+_os = OS.__table__
+_serv = ItemServico.__table__
+_peca = ItemPeca.__table__
+_pag = Pagamento.__table__
+
+
+def _somas_correlacionadas():
+    total_servicos = (
+        select(func.coalesce(func.sum(_serv.c.valor_unit * _serv.c.qtd), 0))
+        .where(_serv.c.id_os == _os.c.id_os)
+        .scalar_subquery()
+    )
+    total_pecas = (
+        select(func.coalesce(func.sum(_peca.c.valor_unit * _peca.c.qtd), 0))
+        .where(_peca.c.id_os == _os.c.id_os)
+        .scalar_subquery()
+    )
+    total_pago = (
+        select(func.coalesce(func.sum(_pag.c.valor), 0))
+        .where(_pag.c.id_os == _os.c.id_os)
+        .scalar_subquery()
+    )
+    return total_servicos, total_pecas, total_pago
+
+
+def _executar_recalculo(conn, filtro):
+    total_servicos, total_pecas, total_pago = _somas_correlacionadas()
+    filtro = filtro & (_os.c.arquivada == false())
+    conn.execute(
+        update(_os)
+        .where(filtro)
+        .values(total_servicos=total_servicos, total_pecas=total_pecas, total_pago=total_pago)
+    )
+    # o SET enxerga os valores antigos da linha, então o saldo sai num segundo UPDATE
+    conn.execute(
+        update(_os)
+        .where(filtro)
+        .values(saldo=_os.c.total_servicos + _os.c.total_pecas - _os.c.total_pago)
+    )
+
+
+def recalcular_totais(db, ids_os):
+    """Recalcula os totais das OS informadas na transação corrente de `db`."""
+    ids = sorted({int(i) for i in ids_os if i is not None})
+    if not ids:
+        return
+    _executar_recalculo(db.connection(), _os.c.id_os.in_(ids))
+    _expirar_totais(db, ids)
+
+
+def recalcular_todas(db, lote=5000):
+    """Recalcula todas as OS em faixas de id_os, com commit por lote. Retorna quantas OS."""
+    maximo = db.execute(select(func.max(_os.c.id_os))).scalar() or 0
+    total = 0
+    for inicio in range(0, maximo, lote):
+        fim = inicio + lote
+        filtro = (_os.c.id_os > inicio) & (_os.c.id_os <= fim)
+        _executar_recalculo(db.connection(), filtro)
+        total += db.execute(select(func.count()).select_from(_os).where(filtro)).scalar()
+        db.commit()
+    return total
+
+
+def _expirar_totais(db, ids):
+    # objetos OS já carregados na sessão passam a reler os totais do banco
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, OS) and obj.id_os in ids:
+            db.expire(obj, ["total_servicos", "total_pecas", "total_pago", "saldo"])
+
+
+# -------- listeners: mantêm os totais em dia para escritas via ORM --------
+@event.listens_for(Session, "after_flush")
+def _coletar_os_afetadas(session, flush_context):
+    pendentes = session.info.setdefault(_CHAVE_PENDENTES, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, _CLASSES_FILHAS):
+            continue
+        historico = inspect(obj).attrs.id_os.history
+        pendentes.update(historico.added or ())
+        pendentes.update(historico.unchanged or ())
+        pendentes.update(historico.deleted or ())  # item trocado de OS: a antiga também muda
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _aplicar_recalculo(session, flush_context):
+    pendentes = session.info.pop(_CHAVE_PENDENTES, None)
+    if pendentes:
+        recalcular_totais(session, pendentes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendentes(session):
+    session.info.pop(_CHAVE_PENDENTES, None)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Recalcula os totais desnormalizados das OS.")
+    parser.add_argument("--os", type=int, nargs="+", help="ids de OS (padrão: todas)")
+    parser.add_argument("--lote", type=int, default=5000, help="OS por transação (padrão 5000)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.os:
+            recalcular_totais(db, args.os)
+            db.commit()
+            print(f"[totais_os.py] {len(set(args.os))} OS recalculadas")
+        else:
+            print(f"[totais_os.py] {recalcular_todas(db, args.lote)} OS recalculadas")
@@ -10,15 +10,65 @@ const API = (function(){
   return "/api";
 })();
 
+// Oficina (filial) da tela: ?oficina=2 na URL ou a última escolhida. Vai no cabeçalho
+// X-Oficina de toda chamada; sem ela o servidor usa a oficina padrão.
+const OFICINA = (function(){
+  try{
+    const daUrl = new URLSearchParams(window.location.search).get("oficina");
+    if(daUrl) localStorage.setItem("oficina", daUrl);
+    return daUrl || localStorage.getItem("oficina") || "";
+  }catch(e){ return ""; }
+})();
+
+function _cabecalhos(extra) {
+  return OFICINA ? { ...extra, "X-Oficina": OFICINA } : { ...extra };
+}
+
+// Respostas pré-carregadas por apiBootstrap(), servidas por apiGet sem ir à rede.
+// Expiram sozinhas e são descartadas em qualquer POST (os dados podem ter mudado).
+const BOOTSTRAP_TTL_MS = 60000;
+const _bootstrapCache = new Map();
+
+async function apiBootstrap(datasets) {
+  const qs = datasets && datasets.length ? `?datasets=${datasets.join(",")}` : "";
+  const r = await fetch(`${API}/bootstrap${qs}`, { headers: _cabecalhos() });
+  if (!r.ok) throw new Error(`GET /bootstrap -> ${r.status}`);
+  const data = await r.json();
+  const expira = Date.now() + BOOTSTRAP_TTL_MS;
+  for (const [nome, valor] of Object.entries(data)) {
+    _bootstrapCache.set(`/${nome}`, { valor, expira });
+  }
+  return data;
+}
+
 async function apiGet(path) {
-  const r = await fetch(`${API}${path}`);
+  const cache = _bootstrapCache.get(path);
+  if (cache) {
+    if (cache.expira > Date.now() || _aoVivo(path)) return cache.valor;
+    _bootstrapCache.delete(path);
+  }
+  const r = await fetch(`${API}${path}`, { headers: _cabecalhos() });
+  if (!r.ok) throw new Error(`GET ${path} -> ${r.status}`);
+  const valor = await r.json();
+  if (_aoVivo(path)) _bootstrapCache.set(path, { valor, expira: Date.now() + BOOTSTRAP_TTL_MS });
+  return valor;
+}
+// Página de uma listagem: {itens, offset, limite, total} (total só no offset 0).
+// Não passa pelo cache: cada página/filtro é uma consulta pequena no servidor.
+async function apiPagina(path, params) {
+  const qs = new URLSearchParams();
+  for (const [k, v] of Object.entries(params || {})) {
+    if (v !== undefined && v !== null && v !== "") qs.set(k, v);
+  }
+  const r = await fetch(`${API}${path}?${qs}`, { headers: _cabecalhos() });
   if (!r.ok) throw new Error(`GET ${path} -> ${r.status}`);
   return r.json();
 }
 async function apiPost(path, body) {
+  _bootstrapCache.clear();
   const r = await fetch(`${API}${path}`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: _cabecalhos({ "Content-Type": "application/json" }),
     body: JSON.stringify(body)
   });
   const text = await r.text();
@@ -26,3 +76,50 @@ async function apiPost(path, body) {
   if (!r.ok) throw Object.assign(new Error(`POST ${path} -> ${r.status}`), { data });
   return data;
 }
+
+// Atualizações ao vivo (GET /api/eventos, Server-Sent Events). Com a conexão aberta,
+// estas listagens não expiram do cache: o servidor manda só as linhas alteradas e elas
+// são aplicadas aqui. Cada delta dispara "api:<dataset>" na window para a tela redesenhar.
+const DATASETS_AO_VIVO = {
+  "agendamentos": { chave: "id_agendamento", ordem: (a, b) => (b.data_hora || "").localeCompare(a.data_hora || "") },
+  "pecas": { chave: "id_peca", ordem: (a, b) => (a.descricao || "").localeCompare(b.descricao || "") },
+  "movimentos-estoque": { chave: "id_movimento", ordem: (a, b) => (b.data || "").localeCompare(a.data || "") },
+};
+let _eventosAbertos = false;
+
+function _aoVivo(path) {
+  return _eventosAbertos && Object.prototype.hasOwnProperty.call(DATASETS_AO_VIVO, path.slice(1));
+}
+
+function _aplicarDelta(nome, { itens, removidos }) {
+  const { chave, ordem } = DATASETS_AO_VIVO[nome];
+  const cache = _bootstrapCache.get(`/${nome}`);
+  if (cache) {
+    const porId = new Map(cache.valor.map(item => [item[chave], item]));
+    for (const id of removidos) porId.delete(id);
+    for (const item of itens) porId.set(item[chave], item);
+    cache.valor = [...porId.values()].sort(ordem);
+  }
+  window.dispatchEvent(new CustomEvent(`api:${nome}`, { detail: { itens, removidos } }));
+}
+
+function apiEventos() {
+  if (typeof EventSource === "undefined") return null;  // sem SSE: segue com o cache por TTL
+  // EventSource não manda cabeçalhos: a oficina vai na query string
+  const fonte = new EventSource(`${API}/eventos${OFICINA ? `?oficina=${encodeURIComponent(OFICINA)}` : ""}`);
+  fonte.onopen = () => { _eventosAbertos = true; };
+  // o EventSource reconecta sozinho (com Last-Event-ID); até lá o cache volta a expirar.
+  // Servidor cheio (503) encerra a fonte de vez: a página segue só com o cache por TTL
+  fonte.onerror = () => { _eventosAbertos = false; };
+  for (const nome of Object.keys(DATASETS_AO_VIVO)) {
+    fonte.addEventListener(nome, ev => _aplicarDelta(nome, JSON.parse(ev.data)));
+  }
+  // eventos perdidos (servidor reiniciado, cliente lento): descarta e relê essas listagens
+  fonte.addEventListener("recarregar", ev => {
+    for (const nome of JSON.parse(ev.data).tipos) {
+      _bootstrapCache.delete(`/${nome}`);
+      window.dispatchEvent(new CustomEvent(`api:${nome}`, { detail: null }));
+    }
+  });
+  return fonte;
+}
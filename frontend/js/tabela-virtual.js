@@ -0,0 +1,168 @@
+// Tabela com rolagem virtual: só as linhas visíveis (mais uma folga) ficam no DOM e as
+// páginas vêm da API sob demanda (?limite=&offset=&q=, ver consultas._listar no back-end).
+// Com dezenas de milhares de veículos/movimentos a tela continua leve: o DOM tem algumas
+// dezenas de <tr> e a barra de rolagem é mantida por dois espaçadores (antes/depois).
+//
+//   const t = new TabelaVirtual(document.getElementById('mov-table'), {
+//     caminho: '/movimentos-estoque',
+//     colunas: ["ID", "Data", ...],
+//     linha: m => `<tr><td>${m.id_movimento}</td>...</tr>`,
+//     chave: 'id_movimento',
+//   });
+//   t.ligarFiltro(document.getElementById('busca-mov'));   // digitação -> ?q= com debounce
+//   t.recarregar();                                          // ex.: depois de um cadastro
+//
+// Precisa de apiPagina() (js/api.js).
+const TABELA_VIRTUAL_PAGINA = 100;      // linhas por requisição
+const TABELA_VIRTUAL_FOLGA = 10;        // linhas desenhadas além da área visível
+const TABELA_VIRTUAL_ALTURA = 420;      // px da área rolável
+const TABELA_VIRTUAL_DEBOUNCE_MS = 300;
+
+class TabelaVirtual {
+  constructor(container, { caminho, colunas, linha, chave, parametros = {},
+                           pagina = TABELA_VIRTUAL_PAGINA, altura = TABELA_VIRTUAL_ALTURA }) {
+    this.container = container;
+    this.caminho = caminho;
+    this.colunas = colunas;
+    this.linha = linha;
+    this.chave = chave;
+    this.parametros = parametros;
+    this.pagina = pagina;
+    this.alturaLinha = 36;  // estimativa até medir as primeiras linhas desenhadas
+    this._medida = false;
+    this.termo = "";
+    this._geracao = 0;      // muda a cada filtro/recarga: respostas antigas são descartadas
+    this._limpar();
+
+    container.innerHTML = `
+      <div class="tabela-virtual" style="max-height:${altura}px">
+        <table class="table table-sm align-middle mb-0">
+          <thead><tr>${colunas.map(h => `<th>${h}</th>`).join('')}</tr></thead>
+          <tbody></tbody>
+        </table>
+      </div>
+      <div class="tabela-virtual-rodape small text-muted mt-1"></div>`;
+    this.rolagem = container.querySelector('.tabela-virtual');
+    this.tbody = container.querySelector('tbody');
+    this.rodape = container.querySelector('.tabela-virtual-rodape');
+
+    let agendado = false;
+    this.rolagem.addEventListener('scroll', () => {
+      if (agendado) return;
+      agendado = true;
+      requestAnimationFrame(() => { agendado = false; this._desenhar(); });
+    }, { passive: true });
+  }
+
+  _limpar() {
+    this.total = null;
+    this._paginas = new Map();     // índice da página -> linhas
+    this._pedidas = new Set();     // páginas em andamento
+  }
+
+  // Relê do servidor mantendo o filtro e a posição de rolagem.
+  recarregar() {
+    this._geracao++;
+    this._limpar();
+    return this._carregar(0).then(() => this._desenhar());
+  }
+
+  filtrar(termo) {
+    termo = (termo || "").trim();
+    if (termo === this.termo && this.total !== null) return Promise.resolve();
+    this.termo = termo;
+    this.rolagem.scrollTop = 0;
+    return this.recarregar();
+  }
+
+  // Filtra enquanto digita, uma requisição por pausa de `atraso` ms; Enter filtra na hora.
+  ligarFiltro(input, atraso = TABELA_VIRTUAL_DEBOUNCE_MS) {
+    let timer = null;
+    input.addEventListener('input', () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => this.filtrar(input.value), atraso);
+    });
+    input.addEventListener('keydown', e => {
+      if (e.key === 'Enter') { e.preventDefault(); clearTimeout(timer); this.filtrar(input.value); }
+    });
+  }
+
+  // Delta de /api/eventos: troca as linhas já carregadas; novas ou removidas pedem recarga.
+  aplicarDelta(delta) {
+    if (!delta || delta.removidos.length) return this.recarregar();
+    const pendentes = new Map(delta.itens.map(item => [item[this.chave], item]));
+    for (const linhas of this._paginas.values()) {
+      linhas.forEach((item, i) => {
+        const novo = pendentes.get(item[this.chave]);
+        if (novo) { linhas[i] = novo; pendentes.delete(item[this.chave]); }
+      });
+    }
+    if (pendentes.size) return this.recarregar();
+    this._desenhar();
+  }
+
+  async _carregar(indice) {
+    if (this._paginas.has(indice) || this._pedidas.has(indice)) return;
+    const geracao = this._geracao;
+    this._pedidas.add(indice);
+    try {
+      const resp = await apiPagina(this.caminho, {
+        ...this.parametros, q: this.termo, offset: indice * this.pagina, limite: this.pagina,
+      });
+      if (geracao !== this._geracao) return;  // filtro mudou enquanto esperava
+      if (resp.total !== null) this.total = resp.total;
+      this._paginas.set(indice, resp.itens);
+    } catch (e) {
+      if (geracao === this._geracao) this.rodape.textContent = 'Erro ao carregar dados';
+      throw e;
+    } finally {
+      if (geracao === this._geracao) this._pedidas.delete(indice);
+    }
+  }
+
+  _desenhar() {
+    const total = this.total || 0;
+    const h = this.alturaLinha;
+    const inicio = Math.max(0, Math.floor(this.rolagem.scrollTop / h) - TABELA_VIRTUAL_FOLGA);
+    const visiveis = Math.ceil(this.rolagem.clientHeight / h) + 2 * TABELA_VIRTUAL_FOLGA;
+    const fim = Math.min(total, inicio + visiveis);
+
+    // páginas que faltam para a janela visível: busca e redesenha quando chegarem
+    const geracao = this._geracao;
+    for (let p = Math.floor(inicio / this.pagina); p <= Math.floor(Math.max(fim - 1, 0) / this.pagina); p++) {
+      if (!this._paginas.has(p) && p * this.pagina < total) {
+        this._carregar(p).then(() => { if (geracao === this._geracao) this._desenhar(); }).catch(() => {});
+      }
+    }
+
+    const colunas = this.colunas.length;
+    const linhas = [];
+    for (let i = inicio; i < fim; i++) {
+      const item = (this._paginas.get(Math.floor(i / this.pagina)) || [])[i % this.pagina];
+      linhas.push(item ? this.linha(item)
+                       : `<tr class="tabela-virtual-pendente"><td colspan="${colunas}">&nbsp;</td></tr>`);
+    }
+    const antes = inicio * h;
+    const depois = Math.max(0, (total - fim) * h);
+    this.tbody.innerHTML =
+      (antes ? `<tr class="tabela-virtual-espaco" style="height:${antes}px"><td colspan="${colunas}"></td></tr>` : '') +
+      (total ? linhas.join('') : `<tr><td colspan="${colunas}" class="text-muted">Nenhum registro</td></tr>`) +
+      (depois ? `<tr class="tabela-virtual-espaco" style="height:${depois}px"><td colspan="${colunas}"></td></tr>` : '');
+    this.rodape.textContent = total ? `${total} registro${total === 1 ? '' : 's'}` : '';
+    this._medir();
+  }
+
+  // passo real entre linhas (altura + border-spacing do .table), medido uma vez nas primeiras linhas com dados
+  _medir() {
+    if (this._medida) return;
+    const linhas = this.tbody.querySelectorAll('tr:not(.tabela-virtual-espaco):not(.tabela-virtual-pendente)');
+    if (linhas.length < 2) return;
+    const passo = linhas[1].offsetTop - linhas[0].offsetTop;
+    if (passo <= 0) return;  // seção escondida (d-none): mede quando aparecer
+    this._medida = true;
+    if (Math.abs(passo - this.alturaLinha) > 0.5) {
+      this.alturaLinha = passo;
+      this._desenhar();
+    }
+  }
+}